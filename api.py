@@ -0,0 +1,380 @@
+# api.py
+"""JSON HTTP API for the mobile client and campus kiosks (plain ASGI).
+
+    uvicorn api:app --workers 4          # or: python api.py --workers 4
+
+The same operations as the Streamlit pages, through ``services``, without a
+script rerun per request. Each worker process builds its own ``Runtime``
+(connection pool, ``WriteQueue``, cipher, chat client) at startup; SQLite in
+WAL mode lets the workers share the database. Database work runs in a
+thread so the event loop keeps serving other requests, and writes are still
+group-committed by the worker's writer.
+
+    GET  /health
+    POST /screenings     {"student_id"?, "phq9": [9 answers 0-3], "gad7": [7 answers 0-3]}
+    POST /chat           {"message"}
+    GET  /slots          ?date=YYYY-MM-DD
+    POST /bookings       {"student_id"?, "date"?, "time"?, "slot_id"?, "contact"?, "notes"?}
+    GET  /forum/posts    ?before=<post id>
+    POST /forum/posts    {"content"}
+    GET  /admin/summary  ?days=30, with "Authorization: Bearer $API_ADMIN_TOKEN"
+    GET  /metrics        this worker's metrics, Prometheus text format
+
+Errors come back as ``{"error": "..."}`` with a 4xx/5xx status. New forum
+posts are scanned by whichever process runs a ``forum_scan.ForumScanner``
+(the Streamlit app, or ``python forum_scan.py``); set ``API_FORUM_SCANNER=1``
+to run one in every API worker instead.
+"""
+import argparse
+import asyncio
+import datetime
+import hmac
+import json
+import logging
+import os
+import time
+import urllib.parse
+
+import chat_cache
+import forum
+import forum_scan
+import metrics
+import migrations
+import scheduler
+import services
+import storage
+
+log = logging.getLogger(__name__)
+
+DB_PATH = os.getenv("DB_PATH", "mental_platform.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", storage.DEFAULT_POOL_SIZE))
+STORAGE_MODE = os.getenv("STORAGE_MODE", storage.DEFAULT_STORAGE_MODE)
+FERNET_KEY = os.getenv("FERNET_KEY")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+ADMIN_TOKEN = os.getenv("API_ADMIN_TOKEN")  # admin routes are off unless this is set
+FORUM_SCANNER = os.getenv("API_FORUM_SCANNER", "0") == "1"
+CHAT_CACHE_SIZE = int(os.getenv("CHAT_CACHE_SIZE", chat_cache.DEFAULT_MAX_ENTRIES))
+CHAT_CACHE_TTL = int(os.getenv("CHAT_CACHE_TTL", chat_cache.DEFAULT_TTL))  # seconds
+MAX_BODY_BYTES = 64 * 1024
+MAX_POST_CHARS = 5000
+DEFAULT_TIME = "10:00"  # preferred time of a booking that names neither a slot nor a time
+ADMIN_WINDOW_DAYS = 30
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Runtime:
+    """Objects shared by every request in one worker process."""
+
+    def __init__(self):
+        self.pool = storage.ConnectionPool(DB_PATH, max_size=DB_POOL_SIZE, mode=STORAGE_MODE)
+        with self.pool.connection() as conn:
+            migrations.migrate(conn)
+        self.writer = storage.WriteQueue(self.pool)
+        self.feed = forum.FeedCache(self.pool)
+        self.cache = storage.VersionedCache(self.pool)
+        import crypto_keys  # cryptography is only loaded when the server starts, not on import
+        self.cipher = crypto_keys.ContactCipher.from_env(FERNET_KEY)
+        self.replies = chat_cache.ResponseCache(CHAT_CACHE_SIZE, CHAT_CACHE_TTL, pool=self.pool) if OPENAI_API_KEY else None
+        self.scanner = forum_scan.ForumScanner(self.pool) if FORUM_SCANNER else None
+        self._chat = None
+
+    def chat(self):
+        # made on first use, so it belongs to the server's event loop
+        if self._chat is None:
+            import llm
+            self._chat = llm.ChatClient(OPENAI_API_KEY)
+        return self._chat
+
+    async def read(self, fn, *args):
+        """``fn(conn, *args)`` on a pooled connection, off the event loop."""
+        def run():
+            with self.pool.connection() as conn:
+                return fn(conn, *args)
+        return await asyncio.to_thread(run)
+
+    async def close(self):
+        if self._chat is not None:
+            await self._chat.aclose()
+        if self.scanner is not None:
+            await asyncio.to_thread(self.scanner.stop)
+        await asyncio.to_thread(self.writer.close)
+        if self.cipher is not None:
+            self.cipher.close()
+        self.pool.close()
+
+
+class Request:
+    def __init__(self, scope, receive):
+        self._receive = receive
+        self.query = dict(urllib.parse.parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+        self.headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+
+    async def json(self):
+        """The request body as a JSON object."""
+        body = bytearray()
+        while True:
+            message = await self._receive()
+            body += message.get("body", b"")
+            if len(body) > MAX_BODY_BYTES:
+                raise HTTPError(413, "request body too large")
+            if not message.get("more_body"):
+                break
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "request body must be JSON") from None
+        if not isinstance(data, dict):
+            raise HTTPError(400, "request body must be a JSON object")
+        return data
+
+
+# ---------- validation ----------
+_KIND_NAMES = {str: "a string", int: "an integer", list: "a list"}
+
+
+def _field(body, name, kind, required=True):
+    value = body.get(name)
+    if value is None:
+        if required:
+            raise HTTPError(400, f"missing field {name!r}")
+        return None
+    if not isinstance(value, kind) or isinstance(value, bool):
+        raise HTTPError(400, f"{name!r} must be {_KIND_NAMES[kind]}")
+    return value
+
+
+def _answers(body, name):
+    answers = _field(body, name, list)
+    if not all(isinstance(a, int) and not isinstance(a, bool) for a in answers):
+        raise HTTPError(400, f"{name!r} answers must be integers")
+    return answers
+
+
+def _date(text, name="date"):
+    try:
+        return datetime.date.fromisoformat(text or "")
+    except ValueError:
+        raise HTTPError(400, f"{name!r} must be a date like 2024-09-30") from None
+
+
+def _int_param(request, name, default, low, high):
+    try:
+        value = int(request.query.get(name, default))
+    except ValueError:
+        raise HTTPError(400, f"{name!r} must be an integer") from None
+    if not low <= value <= high:
+        raise HTTPError(400, f"{name!r} must be between {low} and {high}")
+    return value
+
+
+# ---------- routes ----------
+ROUTES = {}
+
+
+def route(method, path):
+    def register(handler):
+        ROUTES[method, path] = handler
+        return handler
+    return register
+
+
+@route("GET", "/health")
+async def health(rt, request):
+    return 200, {"ok": True}
+
+
+@route("POST", "/screenings")
+async def submit_screening(rt, request):
+    body = await request.json()
+    raw_id = _field(body, "student_id", str, required=False)
+    phq9, gad7 = _answers(body, "phq9"), _answers(body, "gad7")
+    try:
+        result = await asyncio.to_thread(services.submit_screening, rt.writer, raw_id, phq9, gad7)
+    except ValueError as e:
+        raise HTTPError(400, str(e)) from None
+    result["helpline"] = services.EMERGENCY_HELPLINE if result["urgent"] else None
+    return 201, result
+
+
+@route("POST", "/chat")
+async def chat(rt, request):
+    message = _field(await request.json(), "message", str).strip()
+    if not message:
+        raise HTTPError(400, "'message' is empty")
+    escalate = services.is_crisis(message)
+    # crisis messages never touch the cache: they always get a fresh, escalating reply
+    reply = await asyncio.to_thread(rt.replies.get, message) if rt.replies is not None and not escalate else None
+    source = "cache"
+    if reply is None and OPENAI_API_KEY:
+        started = time.perf_counter()
+        try:
+            reply, source = await rt.chat().complete(services.chat_prompt(message)), "llm"
+        except Exception:
+            log.warning("chat upstream failed; answering with the rule-based reply", exc_info=True)
+        else:
+            escalate = escalate or services.is_crisis(reply)
+            if not escalate:
+                await asyncio.to_thread(rt.replies.put, message, reply, time.perf_counter() - started)
+    if reply is None:
+        fallback = services.rule_based_response(message)
+        reply, escalate, source = fallback["message"], fallback["escalate"], "rules"
+    elif escalate:
+        metrics.CRISIS_ESCALATIONS.labels("api_chat").inc()
+    return 200, {"message": reply, "escalate": escalate, "source": source,
+                 "helpline": services.EMERGENCY_HELPLINE if escalate else None}
+
+
+@route("GET", "/slots")
+async def free_slots(rt, request):
+    rows = await rt.read(scheduler.free_slots, _date(request.query.get("date")))
+    return 200, {"slots": [{"id": id_, "counsellor": name, "starts_at": starts, "ends_at": ends}
+                           for id_, name, starts, ends in rows]}
+
+
+@route("POST", "/bookings")
+async def request_booking(rt, request):
+    body = await request.json()
+    slot_id = _field(body, "slot_id", int, required=False)
+    if slot_id is not None:
+        slot = await rt.read(lambda conn: conn.execute("SELECT starts_at FROM slots WHERE id=?", (slot_id,)).fetchone())
+        if slot is None:
+            raise HTTPError(404, f"no slot {slot_id}")
+        date, when = datetime.date.fromisoformat(slot[0][:10]), slot[0][11:]
+    else:
+        date = _date(_field(body, "date", str))
+        when = _field(body, "time", str, required=False) or DEFAULT_TIME
+        try:
+            when = datetime.time.fromisoformat(when).strftime("%H:%M")
+        except ValueError:
+            raise HTTPError(400, "'time' must be a time like 14:30") from None
+    result = await asyncio.to_thread(
+        services.request_booking, rt.writer, rt.cipher, _field(body, "student_id", str, required=False), date, when,
+        _field(body, "notes", str, required=False) or "", _field(body, "contact", str, required=False) or "", slot_id)
+    return 201, result
+
+
+@route("GET", "/forum/posts")
+async def forum_feed(rt, request):
+    before = _int_param(request, "before", 0, 0, 2 ** 63 - 1) or None
+    rows, cursor = await asyncio.to_thread(rt.feed.page, before)
+    return 200, {"posts": [{"id": id_, "anon_id": anon_id, "content": content, "timestamp": ts}
+                           for id_, anon_id, content, ts in rows],
+                 "next": cursor}
+
+
+@route("POST", "/forum/posts")
+async def create_post(rt, request):
+    content = _field(await request.json(), "content", str).strip()
+    if not content:
+        raise HTTPError(400, "'content' is empty")
+    if len(content) > MAX_POST_CHARS:
+        raise HTTPError(400, f"posts are limited to {MAX_POST_CHARS} characters")
+    result = await asyncio.to_thread(services.create_post, rt.writer, content)
+    if rt.scanner is not None:
+        rt.scanner.wake()
+    return 202, {**result, "status": "pending_review"}
+
+
+@route("GET", "/admin/summary")
+async def admin_summary(rt, request):
+    if not ADMIN_TOKEN:
+        raise HTTPError(403, "the admin API is disabled; set API_ADMIN_TOKEN to enable it")
+    if not hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {ADMIN_TOKEN}"):
+        raise HTTPError(401, "missing or wrong admin token")
+    days = _int_param(request, "days", ADMIN_WINDOW_DAYS, 1, 3660)
+    since = (datetime.datetime.utcnow().date() - datetime.timedelta(days=days)).isoformat()
+    return 200, await asyncio.to_thread(rt.cache.get, "admin summary", services.ADMIN_SUMMARY_TABLES,
+                                        services.admin_summary, since)
+
+
+@route("GET", "/metrics")
+async def prometheus(rt, request):
+    return 200, metrics.exposition()
+
+
+# ---------- ASGI ----------
+_runtime = None
+_runtime_lock = asyncio.Lock()
+
+
+async def get_runtime():
+    global _runtime
+    if _runtime is None:
+        async with _runtime_lock:
+            if _runtime is None:
+                _runtime = await asyncio.to_thread(Runtime)
+    return _runtime
+
+
+async def _lifespan(receive, send):
+    global _runtime
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                await get_runtime()
+            except Exception as e:
+                log.exception("API startup failed")
+                await send({"type": "lifespan.startup.failed", "message": repr(e)})
+                return
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if _runtime is not None:
+                await _runtime.close()
+                _runtime = None
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+    started = time.perf_counter()
+    path = scope["path"].rstrip("/") or "/"
+    try:
+        handler = ROUTES.get((scope["method"], path))
+        if handler is None:
+            known = any(p == path for _, p in ROUTES)
+            raise HTTPError(405 if known else 404, "method not allowed" if known else "not found")
+        status, payload = await handler(await get_runtime(), Request(scope, receive))
+    except HTTPError as e:
+        status, payload = e.status, {"error": e.message}
+    except Exception:
+        log.exception("%s %s failed", scope["method"], path)
+        status, payload = 500, {"error": "internal error"}
+    if isinstance(payload, str):
+        body, content_type = payload.encode(), metrics.CONTENT_TYPE
+    else:
+        body, content_type = json.dumps(payload, ensure_ascii=False).encode(), "application/json; charset=utf-8"
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", content_type.encode()),
+                            (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+    # unknown paths share one label so scanners can't blow up the label set
+    metrics.HTTP_REQUEST.labels(f"{scope['method']} {path}" if handler else "other", str(status)).observe(
+        time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="worker processes")
+    args = parser.parse_args(argv)
+    try:
+        import uvicorn
+    except ImportError:
+        parser.error("uvicorn is needed to serve the API: pip install uvicorn")
+    uvicorn.run("api:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
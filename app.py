@@ -1,965 +1,865 @@
-# app.py
-import streamlit as st
-import sqlite3
-import pandas as pd
-import altair as alt
-import os
-import datetime
-import json
-import random
-import hashlib
-from pathlib import Path
-
-# Optional OpenAI usage (only if OPENAI_API_KEY set)
-USE_OPENAI = bool(os.getenv("OPENAI_API_KEY"))
-if USE_OPENAI:
-    import openai
-
-# ---------- CONFIG ----------
-DB_PATH = "mental_platform.db"
-FERNET_KEY = os.getenv("FERNET_KEY")  # optional — base64 key from Fernet.generate_key()
-MOD_PASSWORD = os.getenv("MOD_PASSWORD", "modpass123")  # Change in deployment
-EMERGENCY_HELPLINE =  """Please reach out for immediate help. You are not alone.\n\n
-                📞 National Suicide Prevention Lifeline (India): 9152987821\n
-                📞 KIRAN Mental Health Helpline: 1800-599-0019\n\n
-                If you are in immediate danger, please call your local emergency services."""
-
-
-# Screening thresholds (PHQ-9)
-PHQ9_THRESHOLDS = {
-    "none_mild": range(0, 10),
-    "moderate": range(10, 15),
-    "moderately_severe": range(15, 20),
-    "severe": range(20, 100)
-}
-# GAD-7 thresholds
-GAD7_THRESHOLDS = {
-    "none_mild": range(0, 10),
-    "moderate": range(10, 15),
-    "severe": range(15, 100)
-}
-
-# ---------- UTILS ----------
-def get_conn():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    return conn
-
-def init_db():
-    conn = get_conn()
-    c = conn.cursor()
-    # Students table (anonymized)
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS screenings (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        anon_id TEXT,
-        phq9_score INTEGER,
-        gad7_score INTEGER,
-        meta JSON,
-        timestamp TEXT
-    )
-    """)
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS bookings (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        anon_id TEXT,
-        preferred_date TEXT,
-        preferred_time TEXT,
-        notes TEXT,
-        contact_encrypted TEXT,
-        status TEXT,
-        timestamp TEXT
-    )
-    """)
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS resources (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT,
-        type TEXT,
-        language TEXT,
-        url TEXT,
-        description TEXT
-    )
-    """)
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS posts (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        anon_id TEXT,
-        content TEXT,
-        flagged INTEGER DEFAULT 0,
-        approved INTEGER DEFAULT 0,
-        timestamp TEXT
-    )
-    """)
-    conn.commit()
-    conn.close()
-
-def seed_sample_resources():
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("SELECT count(*) FROM resources")
-    if c.fetchone()[0] == 0:
-        sample = [
-            ("Understanding Anxiety (Guide)", "article", "English", "https://example.edu/anxiety.html", "A simple guide to anxiety and coping."),
-            ("PHQ-9 Explained (Video)", "video", "Hindi", "https://example.edu/phq9_hi.mp4", "Short video on PHQ-9 meaning (regional language)"),
-            ("Relaxation Audio (10 min)", "audio", "Tamil", "https://example.edu/relax_ta.mp3", "A 10-minute guided relaxation"),
-            ("On-campus Counsellors", "article", "English", "", "List of counsellors and timings")
-        ]
-        c.executemany("INSERT INTO resources (title, type, language, url, description) VALUES (?, ?, ?, ?, ?)", sample)
-        conn.commit()
-    conn.close()
-
-def anonymize_id(raw_id: str):
-    # deterministic pseudonymization (not reversible)
-    h = hashlib.sha256(raw_id.encode()).hexdigest()[:8]
-    return f"anon_{h}"
-
-def encrypt_contact(plain: str):
-    if not FERNET_KEY:
-        return None
-    try:
-        f = Fernet(FERNET_KEY.encode())
-        return f.encrypt(plain.encode()).decode()
-    except Exception:
-        return None
-
-def decrypt_contact(token: str):
-    if not FERNET_KEY:
-        return None
-    try:
-        f = Fernet(FERNET_KEY.encode())
-        return f.decrypt(token.encode()).decode()
-    except InvalidToken:
-        return None
-    except Exception:
-        return None
-
-def score_phq9(answers):
-    return sum(int(x) for x in answers)
-
-def score_gad7(answers):
-    return sum(int(x) for x in answers)
-
-def risk_level_from_scores(phq9, gad7):
-    # Simple mapping
-    phq9_level = "none/mild"
-    for k, r in PHQ9_THRESHOLDS.items():
-        if phq9 in r:
-            phq9_level = k
-            break
-    gad7_level = "none/mild"
-    for k, r in GAD7_THRESHOLDS.items():
-        if gad7 in r:
-            gad7_level = k
-            break
-    return phq9_level, gad7_level
-
-def make_anon_tag():
-    return "anon_" + "".join(random.choice("0123456789ABCDEF") for i in range(6))
-
-# ---------- AI Chat helpers ----------
-def rule_based_response(user_text, last_screening=None):
-    """
-    Simple rule-based replies for fallback AI.
-    Escalation if suicidal keywords or high screening risk.
-    """
-    text = user_text.lower()
-    suicidal_keywords = ["suicide", "kill myself", "i want to die", "ending", "hurt myself"]
-    urgent = any(k in text for k in suicidal_keywords)
-    if urgent:
-        return {
-            "message": (
-                "I’m really sorry you’re feeling this way. If you are in immediate danger, please call your local emergency services now. "
-                + EMERGENCY_HELPLINE
-            ),
-            "escalate": True
-        }
-    # if last_screening:
-    #     phq9, gad7 = last_screening
-    #     if phq9 >= 15 or gad7 >= 15:
-    #         return {
-    #             "message": "I see your screening scores indicate moderate-to-severe symptoms. I recommend booking with a counsellor. Would you like to book an appointment now? You can also reach immediate support via the helpline.",
-    #             "escalate": False
-    #         }
-    # generic coping tips
-    tips = [
-        "Take slow deep breaths for a minute — breathe in for 4, hold 2, out for 6.",
-        "Try grounding: name 5 things you can see, 4 you can touch, 3 you can hear.",
-        "A short walk, even 5–10 minutes, can reduce stress.",
-        "If you're comfortable, talking to a trusted friend or a counsellor often helps."
-    ]
-    return {"message": random.choice(tips), "escalate": False}
-
-def call_openai_chat(prompt):
-    """
-    Example OpenAI call. Only used if OPENAI_API_KEY is set.
-    IMPORTANT: This function is a minimal example. For production, handle rate limits and errors robustly.
-    """
-    openai.api_key = os.getenv("OPENAI_API_KEY")
-    resp = openai.ChatCompletion.create(
-        model="gpt-4o-mini",  # replace with available model in your account
-        messages=[{"role":"system","content":"You are a supportive mental health first-aid assistant. Provide coping tips and encourage professional help when needed. Don't provide medical or legal advice."},
-                  {"role":"user","content":prompt}],
-        temperature=0.7,
-        max_tokens=400
-    )
-    return resp.choices[0].message.content.strip()
-
-# ---------- UI PAGES ----------
-
-
-def page_home():
-    st.title("Digital Psychological Intervention System — College Pilot")
-    st.markdown("""
-    This platform provides:
-    - *AI-guided first-aid chat* (optional OpenAI or rule-based fallback),
-    - *Screening (PHQ-9 / GAD-7)*,
-    - *Confidential appointment booking*,
-    - *Psychoeducational resource hub (regional languages)*,
-    - *Peer support forum*,
-    - *Admin dashboard* (anonymous analytics).
-    """)
-    st.info("This is a prototype. For emergencies see the helpline at the top-right or contact local emergency services.")
-    st.sidebar.markdown("## Quick actions\n- Take screening\n- Chat with First Aid\n- Book Counsellor")
-
-def page_screening():
-    st.header("1) Screening — PHQ-9 (depression) and GAD-7 (anxiety)")
-    with st.form("screen_form"):
-        st.write("Optional: enter a personal identifier (we will anonymize/encrypt it). Leave blank for anonymous.")
-        raw_id = st.text_input("Student ID / Roll no / Email (optional)")
-        st.markdown("### PHQ-9 questions (0=Not at all ... 3=Nearly every day)")
-        phq9_q = [
-            "Little interest or pleasure in doing things",
-            "Feeling down, depressed, or hopeless",
-            "Trouble falling or staying asleep",
-            "Feeling tired or little energy",
-            "Poor appetite or overeating",
-            "Feeling bad about yourself",
-            "Trouble concentrating",
-            "Moving or speaking slowly / restless",
-            "Thoughts of being better off dead or hurting yourself"
-        ]
-        phq9_answers = [st.selectbox(f"PHQ-9 Q{i+1}: {q}", ["0","1","2","3"], key=f"p{i}") for i,q in enumerate(phq9_q)]
-
-        st.markdown("### GAD-7 questions (0=Not at all ... 3=Nearly every day)")
-        gad7_q = [
-            "Feeling nervous, anxious or on edge",
-            "Not being able to stop worrying",
-            "Worrying too much about different things",
-            "Trouble relaxing",
-            "Being restless",
-            "Becoming easily annoyed",
-            "Feeling afraid as if something awful might happen"
-        ]
-        gad7_answers = [st.selectbox(f"GAD-7 Q{i+1}: {q}", ["0","1","2","3"], key=f"g{i}") for i,q in enumerate(gad7_q)]
-
-        submitted = st.form_submit_button("Submit screening")
-        if submitted:
-            anon = anonymize_id(raw_id) if raw_id else make_anon_tag()
-            phq9_score = score_phq9(phq9_answers)
-            gad7_score = score_gad7(gad7_answers)
-            level = risk_level_from_scores(phq9_score, gad7_score)
-            conn = get_conn()
-            c = conn.cursor()
-            meta = {"phq9_answers": phq9_answers, "gad7_answers": gad7_answers}
-            c.execute("INSERT INTO screenings (anon_id, phq9_score, gad7_score, meta, timestamp) VALUES (?, ?, ?, ?, ?)",
-                      (anon, phq9_score, gad7_score, json.dumps(meta), datetime.datetime.utcnow().isoformat()))
-            conn.commit()
-            conn.close()
-            st.success(f"Screening saved (anon id: {anon}). PHQ-9: {phq9_score}  |  GAD-7: {gad7_score}")
-            phq9_level, gad7_level = level
-            st.info(f"PHQ-9 level: *{phq9_level}, GAD-7 level: **{gad7_level}*")
-            # brief actionable suggestions
-            if phq9_score >= 15 or gad7_score >= 15 or int(phq9_answers[-1])>0:
-                st.warning("Your responses suggest moderate-to-severe symptoms or suicidal thoughts — we recommend contacting a professional immediately.")
-                st.write(EMERGENCY_HELPLINE)
-                if st.form_submit_button("Book counsellor now"):
-                    st.session_state.get("book_now", True)
-            else:
-                st.write("Here are some immediate coping suggestions:")
-                st.write("- Try breathing exercises, grounding, or a short walk.")
-                st.write("- If you'd like, talk to a counsellor. You can book an appointment below.")
-
-def page_first_aid_chat():
-    st.header("2) AI-guided First-Aid Chat (Supportive, not a replacement for professional care)")
-    st.markdown("*Privacy note:* Chat logs are only stored temporarily in your browser session and not saved to the DB by default for privacy.")
-    if "chat_history" not in st.session_state:
-        st.session_state.chat_history = []
-    # Optionally fetch recent screening to guide escalation
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("SELECT phq9_score, gad7_score FROM screenings ORDER BY id DESC LIMIT 1")
-    row = c.fetchone()
-    last_screening = (row[0], row[1]) if row else None
-
-    user_input = st.text_input("How can I help today? (type feelings, problems or 'help')", key="chat_input")
-    if st.button("Send"):
-        st.session_state.chat_history.append(("user", user_input))
-        if USE_OPENAI:
-            try:
-                prompt = f"User says: {user_input}\nProvide supportive, non-judgmental, practical coping tips. If suicidal or high-risk, instruct the user to seek emergency help and encourage booking. Keep brief."
-                ai_resp = call_openai_chat(prompt)
-                st.session_state.chat_history.append(("bot", ai_resp))
-            except Exception as e:
-                st.error("AI service error — falling back to rule-based response.")
-                rb = rule_based_response(user_input, last_screening)
-                st.session_state.chat_history.append(("bot", rb["message"]))
-                if rb.get("escalate"):
-                    st.warning(EMERGENCY_HELPLINE)
-        else:
-            rb = rule_based_response(user_input, last_screening)
-            st.session_state.chat_history.append(("bot", rb["message"]))
-            if rb.get("escalate"):
-                st.warning(EMERGENCY_HELPLINE)
-
-    # show chat
-    for role, msg in st.session_state.chat_history[::-1]:
-        if role == "bot":
-            st.markdown(f"*Support Bot:* {msg}")
-        else:
-            st.markdown(f"*You:* {msg}")
-
-def page_booking():
-    st.header("3) Confidential Booking System")
-    st.markdown("Book an appointment with an on-campus counsellor. Contact info is optional.")
-    with st.form("booking_form"):
-        raw_id = st.text_input("Student ID / Email (optional to help counsellor; will be anonymized/encrypted)")
-        preferred_date = st.date_input("Preferred date", min_value=datetime.date.today())
-        preferred_time = st.time_input("Preferred time", value=datetime.time(hour=10, minute=0))
-        contact = st.text_input("Contact (phone/email) — optional")
-        notes = st.text_area("Notes (brief) — optional")
-        submitted = st.form_submit_button("Request Booking")
-        if submitted:
-            anon = anonymize_id(raw_id) if raw_id else make_anon_tag()
-            contact_enc = encrypt_contact(contact) if contact else None
-            conn = get_conn()
-            c = conn.cursor()
-            c.execute("INSERT INTO bookings (anon_id, preferred_date, preferred_time, notes, contact_encrypted, status, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                      (anon, preferred_date.isoformat(), preferred_time.strftime("%H:%M"), notes, contact_enc, "requested", datetime.datetime.utcnow().isoformat()))
-            conn.commit()
-            conn.close()
-            st.success("Booking request saved. Counselors will follow up through provided contact (if given).")
-
-def page_resources():
-    st.title("🎧 Mental Health Resources Hub")
-
-    # Let user choose type
-    resource_type = st.radio("Choose Resource Type", ["Videos", "Audios", "Texts"])
-
-    # Display content based on type
-    if resource_type == "Videos":
-        st.subheader("🧘 Guided Meditation Video")
-        st.video("https://www.youtube.com/watch?v=1vx8iUvfyCY")  # Example meditation video
-
-    elif resource_type == "Audios":
-        st.subheader("🎵 Relaxing Audio")
-        st.audio("https://www.soundhelix.com/examples/mp3/SoundHelix-Song-1.mp3")
-
-    elif resource_type == "Texts":
-        st.subheader("📖 Wellness Guide")
-        st.write(
-           "Self-care means taking the time to do things that help you live well and improve both your physical health and mental health. "
-                 "This can help you manage stress, lower your risk of illness, and increase your energy. "
-                 "Even small acts of self-care in your daily life can have a big impact."
-        )
-        st.download_button(
-            "📥 Download Wellness Guide (TXT)",
-            data= """ Self-care means taking the time to do things that help you live well and improve both your physical health and mental health. This can help you manage stress, lower your risk of illness, and increase your energy. Even small acts of self-care in your daily life can have a big impact.
-
-Here are some self-care tips:
-
-⦁	Get regular exercise. Just 30 minutes of walking every day can boost your mood and improve your health.
-⦁	Small amounts of exercise add up, so do not be discouraged if you can not do 30 minutes at one time.
-⦁	Eat healthy, regular meals and stay hydrated.
-⦁	A balanced diet and plenty of water can improve your energy and focus throughout the day.
-⦁	Pay attention to your intake of caffeine and alcohol and how they affect your mood and well-being—for some, decreasing caffeine and alcohol consumption can be helpful.
-⦁	Make sleep a priority.
-⦁	Stick to a schedule, and make sure you are getting enough sleep.
-⦁	Blue light from devices and screens can make it harder to fall asleep, so reduce blue light exposure from your phone or computer before bedtime.
-⦁	Try a relaxing activity.
-⦁	Explore relaxation or wellness programs or apps, which may incorporate meditation, muscle relaxation, or breathing exercises.
-⦁	Schedule regular times for these and other healthy activities you enjoy, such as listening to music, reading, spending time in nature, and engaging in low-stress hobbies.
-⦁	Set goals and priorities.
-⦁	Decide what must get done now and what can wait. Learn to say NO to new tasks if you start to feel like you are taking on too much.
-⦁	Try to appreciate what you have accomplished at the end of the day.
-⦁	Practice gratitude.
-⦁	Remind yourself daily of things you are grateful for.
-⦁	Be specific.
-⦁	Write them down or replay them in your mind.
-⦁	Focus on positivity.
-⦁	Identify and challenge your negative and unhelpful thoughts.
-⦁	Stay connected.
-⦁	Reach out to friends or family members who can provide emotional support and practical help.
-⦁	Self-care looks different for everyone, and it is important to find what you need and enjoy.
-⦁	It may take trial and error to discover what works best for you.
-
-
-""",
-            file_name="wellness_guide.txt",
-        )
-
-    # Track how many resources are viewed/played
-    if "plays" not in st.session_state:
-        st.session_state["plays"] = 0
-
-    if st.button("✅ Mark as Viewed/Played"):
-        st.session_state["plays"] += 1
-        st.success(f"Thank you for using this resource 🙏 (Total used: {st.session_state['plays']})")
-
-# def page_resources():
-#     st.header("4) Psychoeducational Resource Hub")
-#     conn = get_conn()
-#     c = conn.cursor()
-#     c.execute("SELECT id, title, type, language, url, description FROM resources")
-#     rows = c.fetchall()
-#     df = pd.DataFrame(rows, columns=["id","title","type","language","url","description"])
-#     languages = ["All"] + sorted(df["language"].dropna().unique().tolist())
-#     lang = st.selectbox("Filter by language", languages)
-#     typ = st.selectbox("Filter by type", ["All","article","video","audio"])
-#     q = st.text_input("Search title/description")
-#     filt = df.copy()
-    
-#     if lang != "All":
-#         filt = filt[filt["language"]==lang]
-#     if typ != "All":
-#         filt = filt[filt["type"]==typ]
-#     if q:
-#         filt = filt[filt["title"].str.contains(q, case=False) | filt["description"].str.contains(q, case=False)]
-#     for _, r in filt.iterrows():
-#         st.subheader(r["title"])
-#         st.write(f"Type: {r['type']}  •  Language: {r['language']}")
-#         st.write(r["description"])
-#         if r["url"]:
-#             st.markdown(f"[Open resource]({r['url']})")
-
-def page_forum():
-    st.header("5) Peer Support Forum (Anonymous, Moderated)")
-    st.markdown("Post anonymously, get supportive replies from peers. Posts are moderated before being public.")
-    # new post form
-    with st.form("post_form"):
-        content = st.text_area("Write your post (be respectful; anonymous):", height=120)
-        submit = st.form_submit_button("Post")
-        if submit and content.strip():
-            anon = make_anon_tag()
-            conn = get_conn()
-            c = conn.cursor()
-            c.execute("INSERT INTO posts (anon_id, content, flagged, approved, timestamp) VALUES (?, ?, ?, ?, ?)",
-                      (anon, content.strip(), 0, 0, datetime.datetime.utcnow().isoformat()))
-            conn.commit()
-            conn.close()
-            st.success("Thanks — your post will be reviewed by moderators and published if appropriate.")
-
-    # show approved posts
-    conn = get_conn()
-    c = conn.cursor()
-
-    c.execute("SELECT anon_id, content, timestamp FROM posts WHERE approved=1 ORDER BY id DESC LIMIT 30")
-    for anon_id, content, ts in c.fetchall():
-        st.markdown(f"{anon_id}** • {ts[:19]}")
-        st.write(content)
-    st.markdown("---")
-    st.markdown("Flag an existing public post by its anon_id (for moderator review):")
-    flag_id = st.text_input("Anon id to flag (e.g., anon_AB12CD)")
-    if st.button("Flag post"):
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute("UPDATE posts SET flagged=1 WHERE anon_id=? AND approved=1", (flag_id,))
-        conn.commit()
-        st.success("Marked for moderation.")
-
-    st.markdown("*Moderator login* — click below to moderate (password-protected)")
-    if st.button("Moderator panel"):
-        pw = st.text_input("Moderator password", type="password")
-        if pw == MOD_PASSWORD:
-            st.session_state["moderator"] = True
-            st.success("Moderator logged in")
-        else:
-            st.error("Wrong password.")
-
-    if st.session_state.get("moderator"):
-        st.subheader("Moderation queue (new/unapproved posts)")
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute("SELECT id, anon_id, content, flagged, timestamp FROM posts WHERE approved=0 ORDER BY id DESC")
-        rows = c.fetchall()
-        for id_, anon_id, content, flagged, ts in rows:
-            st.markdown(f"{anon_id}** • {ts[:19]}")
-            st.write(content)
-            cols = st.columns([1,1,1])
-            if cols[0].button(f"Approve {id_}", key=f"ap_{id_}"):
-                conn = get_conn(); c = conn.cursor(); c.execute("UPDATE posts SET approved=1 WHERE id=?", (id_,)); conn.commit(); st.experimental_rerun()
-            if cols[1].button(f"Delete {id_}", key=f"del_{id_}"):
-                conn = get_conn(); c = conn.cursor(); c.execute("DELETE FROM posts WHERE id=?", (id_,)); conn.commit(); st.experimental_rerun()
-            if cols[2].button(f"Flag {id_}", key=f"flag_{id_}"):
-                conn = get_conn(); c = conn.cursor(); c.execute("UPDATE posts SET flagged=1 WHERE id=?", (id_,)); conn.commit(); st.experimental_rerun()
-
-
-def page_admin():
-    st.header("6) Admin Dashboard — Anonymous analytics")
-    st.markdown("Aggregated analytics only. No personal data is shown in cleartext.")
-    conn = get_conn(); c = conn.cursor()
-    # screenings aggregation
-    c.execute("SELECT phq9_score, gad7_score, timestamp FROM screenings")
-    rows = c.fetchall()
-    if rows:
-        df = pd.DataFrame(rows, columns=["phq9","gad7","ts"])
-        df["ts"] = pd.to_datetime(df["ts"])
-        df["date"] = df["ts"].dt.date
-        st.subheader("Screenings over time (avg scores per day)")
-        daily = df.groupby("date").mean().reset_index()
-        chart = alt.Chart(daily).transform_fold(["phq9","gad7"], as_=["measure","value"]).mark_line(point=True).encode(
-            x="date:T", y="value:Q", color="measure:N"
-        )
-        st.altair_chart(chart, use_container_width=True)
-        # distribution
-        st.subheader("Risk distribution (latest)")
-        latest = df.tail(200)
-        latest["phq9_level"] = latest["phq9"].apply(lambda x: ("severe" if x>=20 else "moderately_severe" if x>=15 else "moderate" if x>=10 else "none/mild"))
-        dist = latest["phq9_level"].value_counts().reset_index()
-        dist.columns = ["level","count"]
-        st.bar_chart(dist.set_index("level"))
-    else:
-        st.info("No screening data yet.")
-
-    st.subheader("Bookings")
-    c.execute("SELECT status, count(*) FROM bookings GROUP BY status")
-    b = c.fetchall()
-    if b:
-        dfb = pd.DataFrame(b, columns=["status","count"]).set_index("status")
-        st.table(dfb)
-    else:
-        st.info("No bookings yet.")
-
-    # export anonymized CSV
-    if st.button("Export anonymized CSV (screenings)"):
-        c.execute("SELECT anon_id, phq9_score, gad7_score, timestamp FROM screenings")
-        outrows = c.fetchall()
-        dfa = pd.DataFrame(outrows, columns=["anon_id","phq9","gad7","timestamp"])
-        csv = dfa.to_csv(index=False)
-        st.download_button("Download CSV", csv, file_name="screenings_anon.csv", mime="text/csv")
-
-
-# ---------- APP START ----------
-
-
-
-# def main():
-#     st.set_page_config(page_title="Digital Psychological Intervention System", layout="wide")
-#     init_db()
-#     seed_sample_resources()
-
-#     pages = {
-#         "Home": page_home,
-#         "Screening": page_screening,
-#         "First-aid Chat": page_first_aid_chat,
-#         "Booking": page_booking,
-#         "Resources": page_resources,
-#         "Peer Forum": page_forum,
-#         "Admin": page_admin
-#     }
-#     st.sidebar.title("Navigation")
-#     choice = st.sidebar.radio("Go to", list(pages.keys()))
-#     # emergency message
-#     st.sidebar.markdown("### Emergency / Helpline")
-#     st.sidebar.write(EMERGENCY_HELPLINE)
-
-#     # run selected page
-#     pages[choice]()
-
-# if _name_ == "_main_":
-#     main()
-
-
-import streamlit as st
-
-# Example placeholder functions for each page
-def page_home():
-    st.title("Digital Psychological Intervention System — College Pilot")
-    st.markdown("""
-    This platform provides:
-    - *AI-guided first-aid chat* (optional OpenAI or rule-based fallback),
-    - *Screening (PHQ-9 / GAD-7)*,
-    - *Confidential appointment booking*,
-    - *Psychoeducational resource hub (regional languages)*,
-    - *Peer support forum*,
-    - *Admin dashboard* (anonymous analytics).
-    """)
-    st.info("This is a prototype. For emergencies see the helpline at the top-right or contact local emergency services.")
-    st.sidebar.markdown("## Quick actions\n- Take screening\n- Chat with First Aid\n- Book Counsellor")
-
-
-def page_screening():
-    st.header("1) Screening — PHQ-9 (depression) and GAD-7 (anxiety)")
-    with st.form("screen_form"):
-        st.write("Optional: enter a personal identifier (we will anonymize/encrypt it). Leave blank for anonymous.")
-        raw_id = st.text_input("Student ID / Roll no / Email (optional)")
-        st.markdown("### PHQ-9 questions (0=Not at all ... 3=Nearly every day)")
-        phq9_q = [
-            "Little interest or pleasure in doing things",
-            "Feeling down, depressed, or hopeless",
-            "Trouble falling or staying asleep",
-            "Feeling tired or little energy",
-            "Poor appetite or overeating",
-            "Feeling bad about yourself",
-            "Trouble concentrating",
-            "Moving or speaking slowly / restless",
-            "Thoughts of being better off dead or hurting yourself"
-        ]
-        phq9_answers = [st.selectbox(f"PHQ-9 Q{i+1}: {q}", ["0","1","2","3"], key=f"p{i}") for i,q in enumerate(phq9_q)]
-
-        st.markdown("### GAD-7 questions (0=Not at all ... 3=Nearly every day)")
-        gad7_q = [
-            "Feeling nervous, anxious or on edge",
-            "Not being able to stop worrying",
-            "Worrying too much about different things",
-            "Trouble relaxing",
-            "Being restless",
-            "Becoming easily annoyed",
-            "Feeling afraid as if something awful might happen"
-        ]
-        gad7_answers = [st.selectbox(f"GAD-7 Q{i+1}: {q}", ["0","1","2","3"], key=f"g{i}") for i,q in enumerate(gad7_q)]
-
-        submitted = st.form_submit_button("Submit screening")
-        if submitted:
-            anon = anonymize_id(raw_id) if raw_id else make_anon_tag()
-            phq9_score = score_phq9(phq9_answers)
-            gad7_score = score_gad7(gad7_answers)
-            level = risk_level_from_scores(phq9_score, gad7_score)
-            conn = get_conn()
-            c = conn.cursor()
-            meta = {"phq9_answers": phq9_answers, "gad7_answers": gad7_answers}
-            c.execute("INSERT INTO screenings (anon_id, phq9_score, gad7_score, meta, timestamp) VALUES (?, ?, ?, ?, ?)",
-                      (anon, phq9_score, gad7_score, json.dumps(meta), datetime.datetime.utcnow().isoformat()))
-            conn.commit()
-            conn.close()
-            st.success(f"Screening saved (anon id: {anon}). PHQ-9: {phq9_score}  |  GAD-7: {gad7_score}")
-            phq9_level, gad7_level = level
-            st.info(f"PHQ-9 level: *{phq9_level}, GAD-7 level: **{gad7_level}*")
-            # brief actionable suggestions
-            if phq9_score >= 15 or gad7_score >= 15 or int(phq9_answers[-1])>0:
-                st.warning("Your responses suggest moderate-to-severe symptoms or suicidal thoughts — we recommend contacting a professional immediately.")
-                st.write(EMERGENCY_HELPLINE)
-                if st.form_submit_button("Book counsellor now"):
-                    st.session_state.get("book_now", True)
-            else:
-                st.write("Here are some immediate coping suggestions:")
-                st.write("- Try breathing exercises, grounding, or a short walk.")
-                st.write("- If you'd like, talk to a counsellor. You can book an appointment below.")
-
-def page_first_aid_chat():
-    st.header("2) AI-guided First-Aid Chat (Supportive, not a replacement for professional care)")
-    st.markdown("*Privacy note:* Chat logs are only stored temporarily in your browser session and not saved to the DB by default for privacy.")
-    if "chat_history" not in st.session_state:
-        st.session_state.chat_history = []
-    # Optionally fetch recent screening to guide escalation
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("SELECT phq9_score, gad7_score FROM screenings ORDER BY id DESC LIMIT 1")
-    row = c.fetchone()
-    last_screening = (row[0], row[1]) if row else None
-
-    user_input = st.text_input("How can I help today? (type feelings, problems or 'help')", key="chat_input")
-    if st.button("Send"):
-        st.session_state.chat_history.append(("user", user_input))
-        if USE_OPENAI:
-            try:
-                prompt = f"User says: {user_input}\nProvide supportive, non-judgmental, practical coping tips. If suicidal or high-risk, instruct the user to seek emergency help and encourage booking. Keep brief."
-                ai_resp = call_openai_chat(prompt)
-                st.session_state.chat_history.append(("bot", ai_resp))
-            except Exception as e:
-                st.error("AI service error — falling back to rule-based response.")
-                rb = rule_based_response(user_input, last_screening)
-                st.session_state.chat_history.append(("bot", rb["message"]))
-                if rb.get("escalate"):
-                    st.warning(EMERGENCY_HELPLINE)
-        else:
-            rb = rule_based_response(user_input, last_screening)
-            st.session_state.chat_history.append(("bot", rb["message"]))
-            if rb.get("escalate"):
-                st.warning(EMERGENCY_HELPLINE)
-
-    # show chat
-    for role, msg in st.session_state.chat_history[::-1]:
-        if role == "bot":
-            st.markdown(f"*Support Bot:* {msg}")
-        else:
-            st.markdown(f"*You:* {msg}")
-def page_booking():
-    st.header("3) Confidential Booking System")
-    st.markdown("Book an appointment with an on-campus counsellor. Contact info is optional.")
-    with st.form("booking_form"):
-        raw_id = st.text_input("Student ID / Email (optional to help counsellor; will be anonymized/encrypted)")
-        preferred_date = st.date_input("Preferred date", min_value=datetime.date.today())
-        preferred_time = st.time_input("Preferred time", value=datetime.time(hour=10, minute=0))
-        contact = st.text_input("Contact (phone/email) — optional")
-        notes = st.text_area("Notes (brief) — optional")
-        submitted = st.form_submit_button("Request Booking")
-        if submitted:
-            anon = anonymize_id(raw_id) if raw_id else make_anon_tag()
-            contact_enc = encrypt_contact(contact) if contact else None
-            conn = get_conn()
-            c = conn.cursor()
-            c.execute("INSERT INTO bookings (anon_id, preferred_date, preferred_time, notes, contact_encrypted, status, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                      (anon, preferred_date.isoformat(), preferred_time.strftime("%H:%M"), notes, contact_enc, "requested", datetime.datetime.utcnow().isoformat()))
-            conn.commit()
-            conn.close()
-            st.success("Booking request saved. Counselors will follow up through provided contact (if given).")
-def page_resources():
-    st.title("🎧 Mental Health Resources Hub")
-
-    # Let user choose type
-    resource_type = st.radio("Choose Resource Type", ["Videos", "Audios", "Texts"])
-
-    # Display content based on type
-    if resource_type == "Videos":
-        st.subheader("🧘 Guided Meditation Video")
-        st.video("https://www.youtube.com/watch?v=1vx8iUvfyCY")  # Example meditation video
-
-    elif resource_type == "Audios":
-        st.subheader("🎵 Relaxing Audio")
-        st.audio("https://www.soundhelix.com/examples/mp3/SoundHelix-Song-1.mp3")
-
-    elif resource_type == "Texts":
-        st.subheader("📖 Wellness Guide")
-        st.write(
-           "Self-care means taking the time to do things that help you live well and improve both your physical health and mental health. "
-                 "This can help you manage stress, lower your risk of illness, and increase your energy. "
-                 "Even small acts of self-care in your daily life can have a big impact."
-        )
-        st.download_button(
-            "📥 Download Wellness Guide (TXT)",
-            data= """ Self-care means taking the time to do things that help you live well and improve both your physical health and mental health. This can help you manage stress, lower your risk of illness, and increase your energy. Even small acts of self-care in your daily life can have a big impact.
-
-Here are some self-care tips:
-
-⦁	Get regular exercise. Just 30 minutes of walking every day can boost your mood and improve your health.
-⦁	Small amounts of exercise add up, so do not be discouraged if you can not do 30 minutes at one time.
-⦁	Eat healthy, regular meals and stay hydrated.
-⦁	A balanced diet and plenty of water can improve your energy and focus throughout the day.
-⦁	Pay attention to your intake of caffeine and alcohol and how they affect your mood and well-being—for some, decreasing caffeine and alcohol consumption can be helpful.
-⦁	Make sleep a priority.
-⦁	Stick to a schedule, and make sure you are getting enough sleep.
-⦁	Blue light from devices and screens can make it harder to fall asleep, so reduce blue light exposure from your phone or computer before bedtime.
-⦁	Try a relaxing activity.
-⦁	Explore relaxation or wellness programs or apps, which may incorporate meditation, muscle relaxation, or breathing exercises.
-⦁	Schedule regular times for these and other healthy activities you enjoy, such as listening to music, reading, spending time in nature, and engaging in low-stress hobbies.
-⦁	Set goals and priorities.
-⦁	Decide what must get done now and what can wait. Learn to say NO to new tasks if you start to feel like you are taking on too much.
-⦁	Try to appreciate what you have accomplished at the end of the day.
-⦁	Practice gratitude.
-⦁	Remind yourself daily of things you are grateful for.
-⦁	Be specific.
-⦁	Write them down or replay them in your mind.
-⦁	Focus on positivity.
-⦁	Identify and challenge your negative and unhelpful thoughts.
-⦁	Stay connected.
-⦁	Reach out to friends or family members who can provide emotional support and practical help.
-⦁	Self-care looks different for everyone, and it is important to find what you need and enjoy.
-⦁	It may take trial and error to discover what works best for you.
-
-
-""",
-            file_name="wellness_guide.txt",
-        )
-
-    # Track how many resources are viewed/played
-    if "plays" not in st.session_state:
-        st.session_state["plays"] = 0
-
-    if st.button("✅ Mark as Viewed/Played"):
-        st.session_state["plays"] += 1
-        st.success(f"Thank you for using this resource 🙏 (Total used: {st.session_state['plays']})")
-
-def page_forum():
-    st.header("5) Peer Support Forum (Anonymous, Moderated)")
-    st.markdown("Post anonymously, get supportive replies from peers. Posts are moderated before being public.")
-    # new post form
-    with st.form("post_form"):
-        content = st.text_area("Write your post (be respectful; anonymous):", height=120)
-        submit = st.form_submit_button("Post")
-        if submit and content.strip():
-            anon = make_anon_tag()
-            conn = get_conn()
-            c = conn.cursor()
-            c.execute("INSERT INTO posts (anon_id, content, flagged, approved, timestamp) VALUES (?, ?, ?, ?, ?)",
-                      (anon, content.strip(), 0, 0, datetime.datetime.utcnow().isoformat()))
-            conn.commit()
-            conn.close()
-            st.success("Thanks — your post will be reviewed by moderators and published if appropriate.")
-
-    # show approved posts
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("SELECT anon_id, content, timestamp FROM posts WHERE approved=1 ORDER BY id DESC LIMIT 30")
-    for anon_id, content, ts in c.fetchall():
-        st.markdown(f"{anon_id}** • {ts[:19]}")
-        st.write(content)
-    st.markdown("---")
-    st.markdown("Flag an existing public post by its anon_id (for moderator review):")
-    flag_id = st.text_input("Anon id to flag (e.g., anon_AB12CD)")
-    if st.button("Flag post"):
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute("UPDATE posts SET flagged=1 WHERE anon_id=? AND approved=1", (flag_id,))
-        conn.commit()
-        st.success("Marked for moderation.")
-
-    st.markdown("*Moderator login* — click below to moderate (password-protected)")
-    if st.button("Moderator panel"):
-        pw = st.text_input("Moderator password", type="password")
-        if pw == MOD_PASSWORD:
-            st.session_state["moderator"] = True
-            st.success("Moderator logged in")
-        else:
-            st.error("Wrong password.")
-
-    if st.session_state.get("moderator"):
-        st.subheader("Moderation queue (new/unapproved posts)")
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute("SELECT id, anon_id, content, flagged, timestamp FROM posts WHERE approved=0 ORDER BY id DESC")
-        rows = c.fetchall()
-        for id_, anon_id, content, flagged, ts in rows:
-            st.markdown(f"{anon_id}** • {ts[:19]}")
-            st.write(content)
-            cols = st.columns([1,1,1])
-            if cols[0].button(f"Approve {id_}", key=f"ap_{id_}"):
-                conn = get_conn(); c = conn.cursor(); c.execute("UPDATE posts SET approved=1 WHERE id=?", (id_,)); conn.commit(); st.experimental_rerun()
-            if cols[1].button(f"Delete {id_}", key=f"del_{id_}"):
-                conn = get_conn(); c = conn.cursor(); c.execute("DELETE FROM posts WHERE id=?", (id_,)); conn.commit(); st.experimental_rerun()
-            if cols[2].button(f"Flag {id_}", key=f"flag_{id_}"):
-                conn = get_conn(); c = conn.cursor(); c.execute("UPDATE posts SET flagged=1 WHERE id=?", (id_,)); conn.commit(); st.experimental_rerun()
-
-def page_admin():
-    st.header("6) Admin Dashboard — Anonymous analytics")
-    st.markdown("Aggregated analytics only. No personal data is shown in cleartext.")
-    conn = get_conn(); c = conn.cursor()
-    # screenings aggregation
-    c.execute("SELECT phq9_score, gad7_score, timestamp FROM screenings")
-    rows = c.fetchall()
-    if rows:
-        df = pd.DataFrame(rows, columns=["phq9","gad7","ts"])
-        df["ts"] = pd.to_datetime(df["ts"])
-        df["date"] = df["ts"].dt.date
-        st.subheader("Screenings over time (avg scores per day)")
-        daily = df.groupby("date").mean().reset_index()
-        chart = alt.Chart(daily).transform_fold(["phq9","gad7"], as_=["measure","value"]).mark_line(point=True).encode(
-            x="date:T", y="value:Q", color="measure:N"
-        )
-        st.altair_chart(chart, use_container_width=True)
-        # distribution
-        st.subheader("Risk distribution (latest)")
-        latest = df.tail(200)
-        latest["phq9_level"] = latest["phq9"].apply(lambda x: ("severe" if x>=20 else "moderately_severe" if x>=15 else "moderate" if x>=10 else "none/mild"))
-        dist = latest["phq9_level"].value_counts().reset_index()
-        dist.columns = ["level","count"]
-        st.bar_chart(dist.set_index("level"))
-    else:
-        st.info("No screening data yet.")
-
-    st.subheader("Bookings")
-    c.execute("SELECT status, count(*) FROM bookings GROUP BY status")
-    b = c.fetchall()
-    if b:
-        dfb = pd.DataFrame(b, columns=["status","count"]).set_index("status")
-        st.table(dfb)
-    else:
-        st.info("No bookings yet.")
-
-    # export anonymized CSV
-    if st.button("Export anonymized CSV (screenings)"):
-        c.execute("SELECT anon_id, phq9_score, gad7_score, timestamp FROM screenings")
-        outrows = c.fetchall()
-        dfa = pd.DataFrame(outrows, columns=["anon_id","phq9","gad7","timestamp"])
-        csv = dfa.to_csv(index=False)
-        st.download_button("Download CSV", csv, file_name="screenings_anon.csv", mime="text/csv")
-
-#Main App----
-
-
-def main():
-    st.set_page_config(page_title="Digital Psychological Intervention System", layout="wide")
-
-    # Define pages
-    pages = {
-        "Home": page_home,
-        "Screening": page_screening,
-        "First-aid Chat": page_first_aid_chat,
-        "Booking": page_booking,
-        "Resources": page_resources,
-        "Peer Forum": page_forum,
-        "Admin": page_admin
-    }
-
-    # Session state to store selected page
-    if "current_page" not in st.session_state:
-        st.session_state.current_page = "Home"
-
-    # -------------------------
-    # HOME PAGE WITH DASHBOARD CARDS
-    # -------------------------
-    if st.session_state.current_page == "Home":
-        st.title("💻 Digital Psychological Intervention System")
-        st.subheader("Choose a section to continue:")
-
-        # Define card colors
-        card_styles = {
-            "Screening": "#FFB74D",       # Orange
-            "First-aid Chat": "#4DB6AC",   # Teal
-            "Booking": "#64B5F6",          # Blue
-            "Resources": "#81C784",        # Green
-            "Peer Forum": "#BA68C8",       # Purple
-            "Admin": "#E57373"             # Red
-        }
-
-        # Create cards in columns
-        features = list(pages.keys())[1:]  # exclude Home
-        cols = st.columns(3, gap="large")
-        for i, feature in enumerate(features):
-            with cols[i % 3]:
-                # Card as clickable button with color
-                if st.button(feature, key=feature, use_container_width=True):
-                    st.session_state.current_page = feature
-
-                # Display the styled card visually
-                st.markdown(
-                    f"""
-                    <div style="
-                        background-color:{card_styles[feature]};
-                        padding:40px 20px;
-                        border-radius:20px;
-                        text-align:center;
-                        font-size:20px;
-                        font-weight:bold;
-                        color:white;
-                        cursor:pointer;
-                    ">
-                        {feature}
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
-                st.write("")  # spacing
-
-    # -------------------------
-    # RUN SELECTED PAGE
-    # -------------------------
-    if st.session_state.current_page != "Home":
-        pages[st.session_state.current_page]()
-
-        # Back to Home button
-        if st.button("⬅ Back to Home"):
-            st.session_state.current_page = "Home"
-
-
-if __name__ == "__main__":
-    main()
-
-
-
-
-
-
-
-
-
-
+# app.py
+import streamlit as st
+import os
+import datetime
+import io
+import itertools
+import tempfile
+import time
+from pathlib import Path
+
+import bookings
+import catalog
+import chat_cache
+import crisis
+import engagement
+import exporter
+import forum
+import forum_scan
+import importer
+import metrics
+import migrations
+import scheduler
+import search
+import services
+import storage
+from scoring import band_labels
+from services import EMERGENCY_HELPLINE, is_crisis, rule_based_response
+
+# Optional OpenAI usage (only if OPENAI_API_KEY set)
+USE_OPENAI = bool(os.getenv("OPENAI_API_KEY"))
+
+# pandas, altair, llm and crypto_keys are imported by the pages and accessors
+# that use them, so a cold start only pays for what the first page renders
+# (python bench.py coldstart)
+
+# ---------- CONFIG ----------
+DB_PATH = "mental_platform.db"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", storage.DEFAULT_POOL_SIZE))
+STORAGE_MODE = os.getenv("STORAGE_MODE", storage.DEFAULT_STORAGE_MODE)  # "wal" or "rollback"
+FERNET_KEY = os.getenv("FERNET_KEY")  # optional — comma-separated Fernet keys, newest first (python crypto_keys.py --generate)
+CHAT_STREAMING = os.getenv("CHAT_STREAMING", "1") != "0"  # render LLM replies token by token
+CHAT_CACHE_SIZE = int(os.getenv("CHAT_CACHE_SIZE", chat_cache.DEFAULT_MAX_ENTRIES))
+CHAT_CACHE_TTL = int(os.getenv("CHAT_CACHE_TTL", chat_cache.DEFAULT_TTL))  # seconds
+CRISIS_SCAN_OVERLAP = 32  # chars of already-scanned reply re-checked with each streamed piece
+RISK_WINDOW_DAYS = 30  # admin risk distribution covers this many recent days
+ENGAGEMENT_WINDOW_DAYS = 30  # admin resource engagement covers this many recent days
+WRITE_ACK_TIMEOUT = 10  # seconds a page waits for the writer to commit its insert
+FORUM_SCAN_INTERVAL = float(os.getenv("FORUM_SCAN_INTERVAL", forum_scan.DEFAULT_INTERVAL))  # seconds
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # Prometheus scrape port for this process; 0 = off
+ANY_SLOT = "Any time — a counsellor will assign one"
+MOD_QUEUE_PAGE_SIZE = 50  # posts per moderation queue page, highest risk first
+MOD_PASSWORD = os.getenv("MOD_PASSWORD", "modpass123")  # Change in deployment
+COUNSELLOR_PASSWORD = os.getenv("COUNSELLOR_PASSWORD", "counsel123")  # Change in deployment
+ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "admin123")  # Change in deployment
+
+
+# ---------- UTILS ----------
+@st.cache_resource
+def get_pool():
+    # One pool per process, shared by every Streamlit session
+    pool = storage.ConnectionPool(DB_PATH, max_size=DB_POOL_SIZE, mode=STORAGE_MODE)
+    init_db(pool)
+    return pool
+
+@st.cache_resource
+def get_writer():
+    # Single writer thread that group-commits inserts from all sessions
+    return storage.WriteQueue(get_pool())
+
+@st.cache_resource
+def get_scanner():
+    # Background risk triage of new forum posts, one thread per process
+    return forum_scan.ForumScanner(get_pool(), interval=FORUM_SCAN_INTERVAL)
+
+@st.cache_resource
+def get_feed():
+    # Public forum feed pages, shared by all sessions; moderators' approve/delete invalidates it
+    return forum.FeedCache(get_pool())
+
+@st.cache_resource
+def get_engagement():
+    # Buffers resource plays/downloads from all sessions and flushes them in batches
+    return engagement.EngagementLog(get_writer())
+
+@st.cache_resource
+def get_catalog():
+    # Resource listings and facet counts, loaded once per process; admin changes invalidate it
+    return catalog.ResourceCatalog(get_pool())
+
+@st.cache_resource
+def get_cipher():
+    # Contact encryption keys, parsed once per process; None when FERNET_KEY is unset
+    import crypto_keys
+    return crypto_keys.ContactCipher.from_env(FERNET_KEY)
+
+@st.cache_resource
+def get_metrics_server():
+    # GET /metrics for Prometheus, one listener per process; None when METRICS_PORT is unset
+    return metrics.serve(METRICS_PORT) if METRICS_PORT else None
+
+def get_conn():
+    """Borrow a pooled connection: ``with get_conn() as conn: ...``"""
+    return get_pool().connection()
+
+def init_db(pool):
+    # Creates/upgrades the schema; a no-op once the DB is at the latest version
+    with pool.connection() as conn:
+        migrations.migrate(conn)
+
+def decrypt_contacts(tokens):
+    # one call for a whole booking list; None where there is no contact or no key opens it
+    cipher = get_cipher()
+    return cipher.decrypt_many(tokens) if cipher else [None] * len(tokens)
+
+# ---------- Cached reads ----------
+@st.cache_resource
+def get_query_cache():
+    # Query results and the frames/charts built from them, shared by all sessions until their tables change
+    return storage.VersionedCache(get_pool())
+
+def latest_screening(conn):
+    row = conn.execute(services.LATEST_SCREENING_SQL).fetchone()
+    return (row[0], row[1]) if row else None
+
+def screening_trends(conn, since):
+    """Daily average scores chart and the PHQ-9 band counts since ``since``; None before any screening."""
+    # one pre-aggregated row per day, maintained on insert
+    cur = conn.execute(services.TRENDS_SQL)
+    cols = [d[0] for d in cur.description]
+    rows = cur.fetchall()
+    if not rows:
+        return None
+    import altair as alt
+    import pandas as pd
+    daily = pd.DataFrame(rows, columns=cols)
+    daily["date"] = pd.to_datetime(daily["day"])
+    daily["phq9"] = daily["phq9_sum"] / daily["n"]
+    daily["gad7"] = daily["gad7_sum"] / daily["n"]
+    chart = alt.Chart(daily[["date","phq9","gad7"]]).transform_fold(["phq9","gad7"], as_=["measure","value"]).mark_line(point=True).encode(
+        x="date:T", y="value:Q", color="measure:N"
+    )
+    recent = daily[daily["day"] >= since]
+    levels = band_labels("phq9")
+    dist = pd.DataFrame({"level": levels, "count": [int(recent[f"phq9_{l}"].sum()) for l in levels]})
+    return chart, dist.set_index("level")
+
+def engagement_report(conn, since):
+    """Per-resource totals table and per-day chart since ``since``; None before any play or download."""
+    by_resource = engagement.totals_by_resource(conn, since)
+    if not by_resource:
+        return None
+    import altair as alt
+    import pandas as pd
+    daily = pd.DataFrame(engagement.totals_by_day(conn, since), columns=["day", "event", "count"])
+    daily["day"] = pd.to_datetime(daily["day"])
+    return (pd.DataFrame([r[1:] for r in by_resource], columns=["resource", "plays", "downloads"]),
+            alt.Chart(daily).mark_bar().encode(x="day:T", y="count:Q", color="event:N"))
+
+# ---------- AI Chat helpers ----------
+@st.cache_resource
+def get_chat_service():
+    # One HTTP connection pool, rate limiter and circuit breaker shared by all sessions
+    import llm
+    return llm.ChatService(os.getenv("OPENAI_API_KEY"))
+
+@st.cache_resource
+def get_response_cache():
+    # Replies to repeated (non-crisis) messages, shared by all sessions and kept across restarts
+    return chat_cache.ResponseCache(max_entries=CHAT_CACHE_SIZE, ttl=CHAT_CACHE_TTL, pool=get_pool())
+
+def call_openai_chat(prompt):
+    """
+    Chat completion through the shared client. Only used if OPENAI_API_KEY is set.
+    Raises llm.UpstreamUnavailable when the upstream is failing, slow or rate limited.
+    """
+    return get_chat_service().complete(prompt)
+
+def stream_openai_chat(prompt, user_input):
+    """
+    Render the reply while it is generated; returns the full text.
+    The helpline banner goes up as soon as the user's message, or the reply so
+    far, looks like a crisis — not after generation finishes.
+    """
+    banner = st.empty()
+    escalated = is_crisis(user_input)
+    if escalated:
+        metrics.CRISIS_ESCALATIONS.labels("chat_stream").inc()
+        banner.warning(EMERGENCY_HELPLINE)
+    try:
+        stream = get_chat_service().stream(prompt)
+        first = next(stream, "")  # upstream failures surface here, before anything is rendered
+    except Exception:
+        banner.empty()  # the caller's fallback shows its own banner
+        raise
+
+    def pieces():
+        nonlocal escalated
+        scanned = 0
+        for piece in itertools.chain([first], stream):
+            yield piece
+            if not escalated:
+                # re-scan a little overlap so a keyword split across pieces is still caught
+                escalated = is_crisis(stream.text[max(0, scanned - CRISIS_SCAN_OVERLAP):])
+                scanned = len(stream.text)
+                if escalated:
+                    metrics.CRISIS_ESCALATIONS.labels("chat_stream").inc()
+                    banner.warning(EMERGENCY_HELPLINE)
+
+    st.markdown("*Support Bot:*")
+    text = st.write_stream(pieces())
+    if stream.ttft is not None:
+        st.caption(f"First words after {stream.ttft * 1000:.0f} ms")
+    return text
+
+# ---------- UI PAGES ----------
+
+
+def page_home():
+    st.title("Digital Psychological Intervention System — College Pilot")
+    st.markdown("""
+    This platform provides:
+    - *AI-guided first-aid chat* (optional OpenAI or rule-based fallback),
+    - *Screening (PHQ-9 / GAD-7)*,
+    - *Confidential appointment booking*,
+    - *Psychoeducational resource hub (regional languages)*,
+    - *Peer support forum*,
+    - *Admin dashboard* (anonymous analytics).
+    """)
+    st.info("This is a prototype. For emergencies see the helpline at the top-right or contact local emergency services.")
+    st.sidebar.markdown("## Quick actions\n- Take screening\n- Chat with First Aid\n- Book Counsellor")
+
+
+def page_screening():
+    st.header("1) Screening — PHQ-9 (depression) and GAD-7 (anxiety)")
+    with st.form("screen_form"):
+        st.write("Optional: enter a personal identifier (we will anonymize/encrypt it). Leave blank for anonymous.")
+        raw_id = st.text_input("Student ID / Roll no / Email (optional)")
+        st.markdown("### PHQ-9 questions (0=Not at all ... 3=Nearly every day)")
+        phq9_q = [
+            "Little interest or pleasure in doing things",
+            "Feeling down, depressed, or hopeless",
+            "Trouble falling or staying asleep",
+            "Feeling tired or little energy",
+            "Poor appetite or overeating",
+            "Feeling bad about yourself",
+            "Trouble concentrating",
+            "Moving or speaking slowly / restless",
+            "Thoughts of being better off dead or hurting yourself"
+        ]
+        phq9_answers = [st.selectbox(f"PHQ-9 Q{i+1}: {q}", ["0","1","2","3"], key=f"p{i}") for i,q in enumerate(phq9_q)]
+
+        st.markdown("### GAD-7 questions (0=Not at all ... 3=Nearly every day)")
+        gad7_q = [
+            "Feeling nervous, anxious or on edge",
+            "Not being able to stop worrying",
+            "Worrying too much about different things",
+            "Trouble relaxing",
+            "Being restless",
+            "Becoming easily annoyed",
+            "Feeling afraid as if something awful might happen"
+        ]
+        gad7_answers = [st.selectbox(f"GAD-7 Q{i+1}: {q}", ["0","1","2","3"], key=f"g{i}") for i,q in enumerate(gad7_q)]
+
+        submitted = st.form_submit_button("Submit screening")
+        if submitted:
+            result = services.submit_screening(get_writer(), raw_id, phq9_answers, gad7_answers, WRITE_ACK_TIMEOUT)
+            st.success(f"Screening saved (anon id: {result['anon_id']}). PHQ-9: {result['phq9']}  |  GAD-7: {result['gad7']}")
+            st.info(f"PHQ-9 level: *{result['phq9_level']}, GAD-7 level: **{result['gad7_level']}*")
+            # brief actionable suggestions
+            if result["urgent"]:
+                st.warning("Your responses suggest moderate-to-severe symptoms or suicidal thoughts — we recommend contacting a professional immediately.")
+                st.write(EMERGENCY_HELPLINE)
+                if st.form_submit_button("Book counsellor now"):
+                    st.session_state.get("book_now", True)
+            else:
+                st.write("Here are some immediate coping suggestions:")
+                st.write("- Try breathing exercises, grounding, or a short walk.")
+                st.write("- If you'd like, talk to a counsellor. You can book an appointment below.")
+
+def page_first_aid_chat():
+    st.header("2) AI-guided First-Aid Chat (Supportive, not a replacement for professional care)")
+    st.markdown("*Privacy note:* Chat logs are only stored temporarily in your browser session and not saved to the DB by default for privacy.")
+    if "chat_history" not in st.session_state:
+        st.session_state.chat_history = []
+    # Optionally fetch recent screening to guide escalation
+    last_screening = get_query_cache().get("latest screening", ("screenings",), latest_screening)
+
+    user_input = st.text_input("How can I help today? (type feelings, problems or 'help')", key="chat_input")
+    streamed = False
+    if st.button("Send"):
+        st.session_state.chat_history.append(("user", user_input))
+        crisis = is_crisis(user_input)
+        # crisis messages never touch the cache: they always get a fresh, escalating reply
+        cached = get_response_cache().get(user_input) if USE_OPENAI and not crisis else None
+        if cached is not None:
+            st.session_state.chat_history.append(("bot", cached))
+        elif USE_OPENAI:
+            try:
+                prompt = services.chat_prompt(user_input)
+                started = time.perf_counter()
+                if CHAT_STREAMING:
+                    ai_resp = stream_openai_chat(prompt, user_input)
+                    streamed = True
+                else:
+                    ai_resp = call_openai_chat(prompt)
+                st.session_state.chat_history.append(("bot", ai_resp))
+                # a reply that itself reads as a crisis is never cached either: a cache hit shows no banner
+                escalated = crisis or is_crisis(ai_resp)
+                if escalated and not streamed:  # the streamed reply put its banner up as it arrived
+                    metrics.CRISIS_ESCALATIONS.labels("chat").inc()
+                    st.warning(EMERGENCY_HELPLINE)
+                if not escalated:
+                    get_response_cache().put(user_input, ai_resp, latency=time.perf_counter() - started)
+            except Exception as e:
+                st.error("AI service error — falling back to rule-based response.")
+                rb = rule_based_response(user_input, last_screening)
+                st.session_state.chat_history.append(("bot", rb["message"]))
+                if rb.get("escalate"):
+                    st.warning(EMERGENCY_HELPLINE)
+        else:
+            rb = rule_based_response(user_input, last_screening)
+            st.session_state.chat_history.append(("bot", rb["message"]))
+            if rb.get("escalate"):
+                st.warning(EMERGENCY_HELPLINE)
+
+    # show chat (the reply streamed above is already on screen)
+    history = st.session_state.chat_history[:-1] if streamed else st.session_state.chat_history
+    for role, msg in history[::-1]:
+        if role == "bot":
+            st.markdown(f"*Support Bot:* {msg}")
+        else:
+            st.markdown(f"*You:* {msg}")
+def page_booking():
+    st.header("3) Confidential Booking System")
+    st.markdown("Book an appointment with an on-campus counsellor. Contact info is optional.")
+    preferred_date = st.date_input("Preferred date", min_value=datetime.datetime.utcnow().date())
+    with get_conn() as conn:
+        free = scheduler.free_slots(conn, preferred_date)
+    slot_ids = {f"{starts[11:]}–{ends[11:]} with {name}": slot_id for slot_id, name, starts, ends in free}
+    with st.form("booking_form"):
+        raw_id = st.text_input("Student ID / Email (optional to help counsellor; will be anonymized/encrypted)")
+        slot = st.selectbox("Available slots", [ANY_SLOT] + list(slot_ids),
+                            help=None if slot_ids else "No open slots that day; a counsellor will assign a time.")
+        preferred_time = st.time_input("Preferred time (if no slot is chosen)", value=datetime.time(hour=10, minute=0))
+        contact = st.text_input("Contact (phone/email) — optional")
+        notes = st.text_area("Notes (brief) — optional")
+        submitted = st.form_submit_button("Request Booking")
+        if submitted:
+            slot_id = slot_ids.get(slot)
+            when = slot.split("–")[0] if slot_id else preferred_time.strftime("%H:%M")
+            result = services.request_booking(get_writer(), get_cipher(), raw_id, preferred_date, when, notes, contact,
+                                              slot_id, WRITE_ACK_TIMEOUT)
+            if result["claimed"]:
+                st.success(f"Booked: {preferred_date:%d %b} at {slot}.")
+            elif slot_id:
+                st.warning("Someone took that slot a moment ago. Your request is saved and a counsellor will assign you the nearest free time.")
+            else:
+                st.success("Booking request saved. Counselors will follow up through provided contact (if given).")
+
+    with st.expander("Counsellor worklist"):
+        pw = st.text_input("Counsellor password", type="password", key="counsellor_pw")
+        if pw and pw != COUNSELLOR_PASSWORD:
+            st.error("Wrong password.")
+        elif pw:
+            with get_conn() as conn:
+                staff = scheduler.counsellors(conn)
+            if not staff:
+                st.info("No counsellors yet; add them on the Admin page.")
+            else:
+                staff_ids = {name: id_ for id_, name, _ in staff}
+                who = st.selectbox("Counsellor", list(staff_ids), key="worklist_counsellor")
+                day = st.date_input("Day", value=datetime.datetime.utcnow().date(), key="worklist_day")
+                counsellor_worklist(staff_ids[who], day)
+
+def counsellor_worklist(counsellor_id, day):
+    notice = st.session_state.pop("worklist_notice", None)
+    if notice:
+        st.info(notice)
+    since = datetime.datetime.combine(day, datetime.time())
+    with get_conn() as conn:
+        rows = bookings.worklist(conn, counsellor_id, since.strftime(scheduler.TIME_FORMAT),
+                                 (since + datetime.timedelta(days=1)).strftime(scheduler.TIME_FORMAT))
+    # what the counsellor is shown; status actions are checked against it
+    st.session_state["worklist_rows"] = rows
+    if not rows:
+        st.write("No booked slots this day.")
+        return
+    contacts = decrypt_contacts([r[5] for r in rows])
+    if get_cipher() is None:
+        st.warning("FERNET_KEY is not set, so contact details cannot be shown.")
+    import pandas as pd
+    table = pd.DataFrame([
+        {"select": False, "time": f"{starts[11:]}–{ends[11:]}", "student": anon_id, "contact": contact or "",
+         "notes": notes, "status": status}
+        for (_, starts, ends, anon_id, notes, _, status), contact in zip(rows, contacts)])
+    editor_key = f"worklist_editor_{counsellor_id}_{day}_{st.session_state.get('worklist_no', 0)}"
+    with st.form("worklist"):
+        st.data_editor(table, hide_index=True, use_container_width=True,
+                       disabled=[c for c in table.columns if c != "select"],
+                       column_config={"select": st.column_config.CheckboxColumn("✔")}, key=editor_key)
+        cols = st.columns(4)
+        for col, (status, label) in zip(cols, [("confirmed", "Confirm"), ("completed", "Completed"),
+                                               ("no_show", "No-show"), ("cancelled", "Cancel")]):
+            col.form_submit_button(label, on_click=apply_booking_status, args=(status, editor_key))
+
+def apply_booking_status(status, editor_key):
+    # form callback: runs before the page re-renders, against the rows the counsellor was shown
+    rows = st.session_state.get("worklist_rows", [])
+    edits = st.session_state.get(editor_key, {}).get("edited_rows", {})
+    picked = [(row[0], row[6]) for i, row in enumerate(rows) if (edits.get(i) or edits.get(str(i)) or {}).get("select")]
+    if not picked:
+        st.session_state["worklist_notice"] = "Select at least one booking first."
+        return
+    done, skipped = bookings.transition(get_pool(), status, picked)
+    label = status.replace("_", "-")
+    notice = f"Marked {len(done)} booking(s) {label}."
+    if skipped:
+        notice += f" Skipped {len(skipped)} that can't be marked {label} from their current status."
+    st.session_state["worklist_notice"] = notice
+    st.session_state["worklist_no"] = st.session_state.get("worklist_no", 0) + 1
+
+def page_resources():
+    st.title("🎧 Mental Health Resources Hub")
+
+    query = st.text_input("🔍 Search resources", placeholder="e.g. anxiety, sleep, relax*")
+    if query.strip():
+        with get_conn() as conn:
+            rows = search.search_resources(conn, query)
+        if not rows:
+            st.caption("No matching resources.")
+        for _, title, typ, language, url, snippet in rows:
+            st.subheader(title)
+            st.caption(f"{typ} • {language}")
+            st.markdown(snippet)
+            if url:
+                st.markdown(f"[Open resource]({url})")
+        st.markdown("---")
+
+    facets = get_catalog().facets()
+    languages = sorted(facets["language"])
+    choice = st.selectbox("Language", ["All languages"] + languages, key="res_language")
+    lang = None if choice == "All languages" else choice
+    st.caption(" · ".join(f"{l}: {facets['language'][l]}" for l in languages))
+    # Let user choose type
+    types = {"Videos": "video", "Audios": "audio", "Texts": "article"}
+    counts = [facets["language_type"][(lang, t)] if lang else facets["type"][t] for t in types.values()]
+    resource_type = st.radio("Choose Resource Type", list(types), horizontal=True, key="res_type",
+                             captions=[f"{n} available" for n in counts])
+    typ = types[resource_type]
+
+    listing = get_catalog().listing(lang, typ)
+    if not listing:
+        st.info("No resources of this type yet.")
+    for r in listing:
+        st.subheader(r.title)
+        st.caption(r.language)
+        if r.description:
+            st.write(r.description)
+        path = catalog.resolve_path(r)
+        if r.type == "video" and (path or r.url):
+            st.video(path or r.url)
+        elif r.type == "audio" and (path or r.url):
+            st.audio(path or r.url)
+        elif path:
+            # read from the file on disk; Streamlit keeps one copy however many sessions show it
+            with open(path, "rb") as fh:
+                st.download_button(f"📥 Download {r.title}", fh, file_name=os.path.basename(path), key=f"dl_{r.id}",
+                                   on_click=get_engagement().record, args=(r.id, "download"))
+        if r.url and r.type == "article":
+            st.markdown(f"[Open resource]({r.url})")
+
+        # Track how many resources are viewed/played
+        if st.button("✅ Mark as Viewed/Played", key=f"play_{r.id}"):
+            get_engagement().record(r.id, "play")
+            st.session_state["plays"] = st.session_state.get("plays", 0) + 1
+            st.success(f"Thank you for using this resource 🙏 (Total used: {st.session_state['plays']})")
+
+def page_forum():
+    st.header("5) Peer Support Forum (Anonymous, Moderated)")
+    st.markdown("Post anonymously, get supportive replies from peers. Posts are moderated before being public.")
+    # new post form
+    with st.form("post_form"):
+        content = st.text_area("Write your post (be respectful; anonymous):", height=120)
+        submit = st.form_submit_button("Post")
+        if submit and content.strip():
+            services.create_post(get_writer(), content, WRITE_ACK_TIMEOUT)
+            get_scanner().wake()
+            st.success("Thanks — your post will be reviewed by moderators and published if appropriate.")
+
+    query = st.text_input("🔍 Search posts", placeholder='words, "a phrase" or a prefix like anx*')
+    if query.strip():
+        with get_conn() as conn:
+            rows = search.search_posts(conn, query)
+        st.caption(f"{len(rows)} matching post(s), best match first")
+        for _, anon_id, snippet, ts in rows:
+            st.markdown(f"{anon_id}** • {ts[:19]}")
+            st.markdown(snippet)
+    else:
+        # show approved posts, newest first; "load more" extends the feed a page at a time
+        pages = st.session_state.setdefault("feed_pages", 1)
+        rows, next_cursor = get_feed().pages(pages)
+        for _, anon_id, content, ts in rows:
+            st.markdown(f"{anon_id}** • {ts[:19]}")
+            st.write(content)
+        if next_cursor is not None:
+            st.button("Load more posts", on_click=lambda: st.session_state.update(feed_pages=pages + 1))
+    st.markdown("---")
+    st.markdown("Flag an existing public post by its anon_id (for moderator review):")
+    flag_id = st.text_input("Anon id to flag (e.g., anon_AB12CD)")
+    if st.button("Flag post"):
+        with get_pool().transaction() as conn:
+            conn.execute(forum.FLAG_AUTHOR_SQL, (flag_id,))
+        st.success("Marked for moderation.")
+
+    st.markdown("*Moderator login* — click below to moderate (password-protected)")
+    if st.button("Moderator panel"):
+        pw = st.text_input("Moderator password", type="password")
+        if pw == MOD_PASSWORD:
+            st.session_state["moderator"] = True
+            st.success("Moderator logged in")
+        else:
+            st.error("Wrong password.")
+
+    if st.session_state.get("moderator"):
+        st.subheader("Moderation queue (new/unapproved posts, highest risk first)")
+        notice = st.session_state.pop("mod_notice", None)
+        if notice:
+            st.info(notice)
+        mod_query = st.text_input("🔍 Search the queue", key="mod_search", on_change=reset_mod_queue)
+        # keep the page as shown: bulk actions are checked against the versions the moderator saw
+        if "mod_page" not in st.session_state:
+            with get_conn() as conn:
+                if mod_query.strip():
+                    st.session_state["mod_page"] = (search.search_queue(conn, mod_query, MOD_QUEUE_PAGE_SIZE), None)
+                else:
+                    st.session_state["mod_page"] = forum.queue_page(
+                        conn, st.session_state.get("mod_cursor"), MOD_QUEUE_PAGE_SIZE)
+        rows, next_cursor = st.session_state["mod_page"]
+        nav = st.columns([1, 1, 1, 3])
+        nav[0].button("Refresh queue", on_click=reset_mod_queue, args=(st.session_state.get("mod_cursor"),))
+        if st.session_state.get("mod_cursor") is not None:
+            nav[1].button("First page", on_click=reset_mod_queue)
+        if next_cursor is not None:
+            nav[2].button("Next page", on_click=reset_mod_queue, args=(next_cursor,))
+        if not rows:
+            st.write("Nothing waiting for review.")
+            return
+        import pandas as pd
+        table = pd.DataFrame([
+            {"select": False, "id": id_, "version": version, "risk": risk_badge(risk, categories),
+             "flagged": bool(flagged), "anon_id": anon_id, "posted": ts[:19], "content": content}
+            for id_, version, anon_id, content, flagged, risk, categories, ts in rows])
+        page_no = st.session_state.get("mod_page_no", 0)
+        select_all = st.checkbox("Select all on this page", key=f"mod_all_{page_no}")
+        table["select"] = select_all
+        editor_key = f"mod_editor_{page_no}_{select_all}"
+        with st.form("mod_queue"):
+            st.data_editor(
+                table, hide_index=True, use_container_width=True,
+                disabled=[c for c in table.columns if c != "select"],
+                column_config={"id": None, "version": None, "select": st.column_config.CheckboxColumn("✔")},
+                key=editor_key)
+            cols = st.columns(3)
+            for col, (action, label) in zip(cols, [("approve", "Approve selected"), ("delete", "Delete selected"),
+                                                    ("flag", "Flag selected")]):
+                col.form_submit_button(label, on_click=apply_moderation, args=(action, editor_key, select_all))
+
+def risk_badge(risk, categories):
+    if risk is None:
+        return "⏳ not scanned yet"
+    if risk >= forum_scan.FLAG_THRESHOLD:
+        return f"🔴 {risk:.2f} {categories}"
+    if risk > 0:
+        return f"🟠 {risk:.2f} {categories}"
+    return "🟢 none"
+
+def apply_moderation(action, editor_key, select_all):
+    # form callback: runs before the page re-renders, against the page the moderator was shown
+    rows, _ = st.session_state["mod_page"]
+    edits = st.session_state.get(editor_key, {}).get("edited_rows", {})
+    picked = [(id_, version) for i, (id_, version, *_) in enumerate(rows)
+              if (edits.get(i) or edits.get(str(i)) or {}).get("select", select_all)]
+    if not picked:
+        st.session_state["mod_notice"] = "Select at least one post first."
+        return
+    done, conflicts = forum.moderate(get_pool(), action, picked)
+    if done and action != "flag":
+        get_feed().invalidate()
+    notice = f"{dict(approve='Approved', delete='Deleted', flag='Flagged')[action]} {len(done)} post(s)."
+    if conflicts:
+        notice += f" Skipped {len(conflicts)} that another moderator changed first."
+    st.session_state["mod_notice"] = notice
+    reset_mod_queue(st.session_state.get("mod_cursor"))
+
+def reset_mod_queue(cursor=None):
+    # re-read the moderation queue at ``cursor`` on the next run, with fresh selections
+    st.session_state["mod_cursor"] = cursor
+    st.session_state.pop("mod_page", None)
+    st.session_state["mod_page_no"] = st.session_state.get("mod_page_no", 0) + 1
+
+def page_admin():
+    import crypto_keys
+    import pandas as pd
+    st.header("6) Admin Dashboard — Anonymous analytics")
+    st.markdown("Aggregated analytics only. No personal data is shown in cleartext.")
+    # analytics are open; anything that changes data (schedules, imports, resources, keys) needs the password
+    pw = st.text_input("Admin password (needed to make changes)", type="password", key="admin_pw")
+    if pw and pw != ADMIN_PASSWORD:
+        st.error("Wrong password.")
+    unlocked = pw == ADMIN_PASSWORD
+    since = (datetime.datetime.utcnow().date() - datetime.timedelta(days=RISK_WINDOW_DAYS)).isoformat()
+    trends = get_query_cache().get("screening trends", ("screenings",), screening_trends, since)
+    if trends:
+        chart, dist = trends
+        st.subheader("Screenings over time (avg scores per day)")
+        st.altair_chart(chart, use_container_width=True)
+        # distribution
+        st.subheader(f"Risk distribution (last {RISK_WINDOW_DAYS} days)")
+        st.bar_chart(dist)
+    else:
+        st.info("No screening data yet.")
+
+    st.subheader("Bookings")
+    # per-status counts kept current by triggers on every booking change
+    with get_conn() as conn:
+        counts = bookings.status_counts(conn)
+    if any(counts.values()):
+        dfb = pd.DataFrame(list(counts.items()), columns=["status","count"]).set_index("status")
+        st.table(dfb)
+    else:
+        st.info("No bookings yet.")
+    cipher = get_cipher()
+    if cipher is not None:
+        job = st.session_state.get("rotation_job")
+        if job is None and cipher.key_count > 1:
+            st.caption(f"{cipher.key_count} contact keys configured; the first one encrypts new bookings.")
+            if unlocked and st.button("Re-encrypt booking contacts with the newest key"):
+                job = st.session_state["rotation_job"] = crypto_keys.RotationJob(get_pool(), cipher)
+        if job is not None:
+            progress = job.stats()
+            if progress["error"]:
+                st.error(f"Key rotation failed: {progress['error']}")
+            elif progress["running"]:
+                st.info(f"Re-encrypting booking contacts… {progress['rotated']:,} done so far.")
+            else:
+                st.success(f"Re-encrypted {progress['rotated']:,} booking contacts; the older keys can now be "
+                           "removed from FERNET_KEY.")
+            if progress["unreadable"]:
+                st.warning(f"{progress['unreadable']:,} contacts could not be opened with any configured key.")
+
+    st.subheader("Counsellor schedule")
+    cols = st.columns(2)
+    if unlocked:
+        with cols[0].form("add_counsellor", clear_on_submit=True):
+            name = st.text_input("Counsellor name")
+            if st.form_submit_button("Add counsellor") and name.strip():
+                scheduler.add_counsellor(get_pool(), name.strip())
+                st.success(f"Added {name.strip()}.")
+    with get_conn() as conn:
+        staff = scheduler.counsellors(conn)
+        waiting = conn.execute(scheduler.WAITING_SQL).fetchone()[0]
+    if staff and unlocked:
+        with cols[1].form("add_slots"):
+            staff_ids = {name: id_ for id_, name, _ in staff}
+            who = st.selectbox("Counsellor", list(staff_ids))
+            day = st.date_input("Day", min_value=datetime.datetime.utcnow().date())
+            start = st.time_input("From", value=datetime.time(9, 0))
+            end = st.time_input("To", value=datetime.time(17, 0))
+            minutes = st.number_input("Slot length (minutes)", 15, scheduler.MAX_SLOT_MINUTES, scheduler.SLOT_MINUTES, step=5)
+            if st.form_submit_button("Publish slots"):
+                created = scheduler.add_slots(get_pool(), staff_ids[who], day, start, end, int(minutes))
+                st.success(f"Published {created} slots for {who}.")
+    st.write(f"{waiting:,} booking requests waiting for a slot.")
+    if waiting and unlocked and st.button("Allocate waiting requests"):
+        started = time.perf_counter()
+        assigned, left = scheduler.allocate(get_pool())
+        st.success(f"Assigned {assigned:,} requests in {time.perf_counter() - started:.2f}s; {left:,} still waiting for a free slot.")
+
+    if USE_OPENAI:
+        st.subheader("AI chat")
+        chat_stats = get_chat_service().stats()
+        cols = st.columns(3)
+        cols[0].metric("Streamed replies", chat_stats["streams"])
+        cols[1].metric("Mean time to first token",
+                       f"{chat_stats['mean_ttft'] * 1000:.0f} ms" if chat_stats["mean_ttft"] is not None else "—")
+        cols[2].metric("Upstream circuit", chat_stats["breaker"])
+        cache_stats = get_response_cache().stats()
+        cols = st.columns(3)
+        cols[0].metric("Reply cache hit rate", f"{cache_stats['hit_rate']:.0%}",
+                       help=f"{cache_stats['hits']} hits ({cache_stats['near_hits']} near-duplicate), {cache_stats['misses']} misses")
+        cols[1].metric("LLM time saved by cache", f"{cache_stats['saved_seconds']:.1f} s")
+        cols[2].metric("Cached replies", cache_stats["entries"])
+
+    st.subheader("Performance (this process)")
+    cache_stats = get_query_cache().stats()
+    st.caption(f"Query cache: {cache_stats['hit_rate']:.0%} of {cache_stats['hits'] + cache_stats['misses']:,} "
+               f"lookups reused, {cache_stats['entries']} results held")
+    renders = [(page, child.snapshot()[1], child.quantile(0.95)) for (page,), child in metrics.PAGE_RENDER.children()]
+    renders = [r for r in renders if r[1]]  # this page's own first render is still in progress
+    if renders:
+        st.table(pd.DataFrame([(page, n, f"≤ {p95 * 1000:,.0f} ms") for page, n, p95 in renders],
+                              columns=["page", "renders", "p95"]).set_index("page"))
+    slow = list(metrics.SLOW_QUERIES)[::-1]
+    if slow:
+        st.dataframe(pd.DataFrame(slow, columns=["at", "seconds", "statement"]), use_container_width=True)
+    else:
+        st.caption(f"No statements slower than {metrics.SLOW_QUERY_SECONDS * 1000:.0f} ms so far.")
+
+    # bulk import of paper/offline screenings
+    if unlocked:
+        st.subheader("Import paper screenings")
+        upload = st.file_uploader("CSV or JSONL file (columns: student_id, timestamp, phq9_1..phq9_9, gad7_1..gad7_7)", type=["csv", "jsonl"])
+        if upload is not None and st.button("Import screenings"):
+            bar = st.progress(0.0)
+            def progress(r):
+                bar.progress(min(upload.tell() / max(upload.size, 1), 1.0), text=f"{r['imported']:,} imported, {r['rejected']:,} rejected")
+            fmt = "jsonl" if upload.name.endswith(".jsonl") else "csv"
+            report = importer.import_screenings(get_pool(), io.TextIOWrapper(upload, encoding="utf-8", newline=""), fmt, progress=progress)
+            st.success(f"Imported {report['imported']:,} of {report['read']:,} rows.")
+            if report["errors"]:
+                st.warning(f"{report['rejected']:,} rows rejected (first {len(report['errors'])} shown).")
+                st.dataframe(pd.DataFrame(report["errors"], columns=["line", "error"]))
+
+    # export anonymized screenings, streamed page by page to a temp file
+    st.subheader("Export anonymized screenings")
+    columns = st.multiselect("Columns", list(exporter.EXPORT_COLUMNS), default=exporter.DEFAULT_COLUMNS)
+    date_range = st.date_input("Date range (optional)", value=())
+    formats = ["CSV", "Parquet"] if exporter.parquet_available() else ["CSV"]
+    fmt = st.radio("Format", formats, horizontal=True)
+    if st.button("Export anonymized screenings") and columns:
+        since, until = (list(date_range) + [None, None])[:2]
+        out = tempfile.TemporaryFile(mode="w+b")
+        if fmt == "Parquet":
+            exporter.write_parquet(get_pool(), out, columns, since, until)
+            name, mime = "screenings_anon.parquet", "application/octet-stream"
+        else:
+            text = io.TextIOWrapper(out, encoding="utf-8", newline="", write_through=True)
+            exporter.write_csv(get_pool(), text, columns=columns, since=since, until=until)
+            text.detach()
+            name, mime = "screenings_anon.csv", "text/csv"
+        out.seek(0)
+        # Streamlit serves downloads from memory, so this is the only full copy
+        st.download_button(f"Download {fmt}", out.read(), file_name=name, mime=mime)
+        out.close()
+
+    st.subheader(f"Resource engagement (last {ENGAGEMENT_WINDOW_DAYS} days)")
+    since = (datetime.datetime.utcnow().date() - datetime.timedelta(days=ENGAGEMENT_WINDOW_DAYS)).isoformat()
+    report = get_query_cache().get("engagement", ("resource_events", "resources"), engagement_report, since)
+    if report:
+        totals, chart = report
+        st.dataframe(totals, hide_index=True, use_container_width=True)
+        st.altair_chart(chart, use_container_width=True)
+    else:
+        st.write("No resource plays or downloads yet.")
+
+    if not unlocked:  # the rest of the page only changes data
+        return
+    st.subheader("Resource catalog")
+    with st.form("add_resource", clear_on_submit=True):
+        title = st.text_input("Title")
+        cols = st.columns(2)
+        typ = cols[0].selectbox("Type", catalog.TYPES)
+        language = cols[1].text_input("Language", value="English")
+        description = st.text_area("Description")
+        url = st.text_input("Link (optional)")
+        upload = st.file_uploader("File (optional): guide, audio or video")
+        if st.form_submit_button("Add resource") and title.strip():
+            catalog.add_resource(get_pool(), get_catalog(), title.strip(), typ, language.strip() or "English",
+                                 description.strip(), url.strip(), data=upload.getvalue() if upload else None,
+                                 filename=upload.name if upload else None)
+            st.success(f"Added “{title.strip()}”.")
+    resources = get_catalog().listing()
+    if resources:
+        cols = st.columns([3, 1])
+        by_label = {f"{r.title} ({r.type}, {r.language}) #{r.id}": r for r in resources}
+        doomed = by_label[cols[0].selectbox("Remove a resource", list(by_label))]
+        if cols[1].button("Remove"):
+            catalog.remove_resource(get_pool(), get_catalog(), doomed.id)
+            st.success(f"Removed “{doomed.title}”.")
+
+#Main App----
+
+
+def main():
+    st.set_page_config(page_title="Digital Psychological Intervention System", layout="wide")
+    get_pool()  # opens the shared pool and creates tables once per process
+    crisis.get_detector()  # compiles the crisis lexicon once per process
+    get_scanner()
+    get_metrics_server()
+
+    # Define pages
+    pages = {
+        "Home": page_home,
+        "Screening": page_screening,
+        "First-aid Chat": page_first_aid_chat,
+        "Booking": page_booking,
+        "Resources": page_resources,
+        "Peer Forum": page_forum,
+        "Admin": page_admin
+    }
+
+    # Session state to store selected page
+    if "current_page" not in st.session_state:
+        st.session_state.current_page = "Home"
+
+    # -------------------------
+    # HOME PAGE WITH DASHBOARD CARDS
+    # -------------------------
+    if st.session_state.current_page == "Home":
+        st.title("💻 Digital Psychological Intervention System")
+        st.subheader("Choose a section to continue:")
+
+        # Define card colors
+        card_styles = {
+            "Screening": "#FFB74D",       # Orange
+            "First-aid Chat": "#4DB6AC",   # Teal
+            "Booking": "#64B5F6",          # Blue
+            "Resources": "#81C784",        # Green
+            "Peer Forum": "#BA68C8",       # Purple
+            "Admin": "#E57373"             # Red
+        }
+
+        # Create cards in columns
+        features = list(pages.keys())[1:]  # exclude Home
+        cols = st.columns(3, gap="large")
+        for i, feature in enumerate(features):
+            with cols[i % 3]:
+                # Card as clickable button with color
+                if st.button(feature, key=feature, use_container_width=True):
+                    st.session_state.current_page = feature
+
+                # Display the styled card visually
+                st.markdown(
+                    f"""
+                    <div style="
+                        background-color:{card_styles[feature]};
+                        padding:40px 20px;
+                        border-radius:20px;
+                        text-align:center;
+                        font-size:20px;
+                        font-weight:bold;
+                        color:white;
+                        cursor:pointer;
+                    ">
+                        {feature}
+                    </div>
+                    """,
+                    unsafe_allow_html=True
+                )
+                st.write("")  # spacing
+
+    # -------------------------
+    # RUN SELECTED PAGE
+    # -------------------------
+    if st.session_state.current_page != "Home":
+        with metrics.timer(metrics.PAGE_RENDER.labels(st.session_state.current_page)):
+            pages[st.session_state.current_page]()
+
+        # Back to Home button
+        if st.button("⬅ Back to Home"):
+            st.session_state.current_page = "Home"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,574 @@
+# bench.py
+"""Micro-benchmarks for the platform's hot paths.
+
+    python bench.py scoring --rows 1000 100000 1000000
+    python bench.py crisis --patterns 10 100 1000 10000
+    python bench.py search --rows 10000 100000 1000000
+    python bench.py schedule --requests 1000 10000 50000
+    python bench.py core --rows 10000 100000 1000000
+    python bench.py load --users 1 8 32 --duration 10
+    python bench.py metrics
+    python bench.py coldstart --budget-ms 600
+
+Add ``--json results.json`` (before the command) to keep a run's numbers,
+and ``python bench.py compare old.json new.json`` to see what changed.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import scoring
+
+
+def best_of(fn, repeat=3):
+    """Fastest wall-clock time of ``repeat`` calls, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def bench_scoring(args):
+    rng = np.random.default_rng(0)
+    records = []
+    print(f"{'rows':>10}  {'per-row loop':>14}  {'vectorised':>12}  {'rows/s':>14}")
+    for rows in args.rows:
+        phq9 = rng.integers(0, scoring.MAX_ANSWER + 1, size=(rows, scoring.PHQ9_ITEMS))
+        gad7 = rng.integers(0, scoring.MAX_ANSWER + 1, size=(rows, scoring.GAD7_ITEMS))
+        vec = best_of(lambda: scoring.score_frame(phq9, gad7))
+        loop = None
+        if rows <= 100_000:
+            p, g = phq9.tolist(), gad7.tolist()
+            loop = best_of(lambda: [scoring.risk_level_from_scores(scoring.score_phq9(a), scoring.score_gad7(b))
+                                    for a, b in zip(p, g)], repeat=1)
+            loop_s = f"{loop * 1000:11.1f} ms"
+        else:
+            loop_s = f"{'(skipped)':>14}"
+        print(f"{rows:>10}  {loop_s}  {vec * 1000:9.1f} ms  {rows / vec:14,.0f}")
+        records.append({"name": "score_frame", "size": rows, "loop_ms": loop and loop * 1000,
+                        "vectorised_ms": vec * 1000, "rows_per_s": rows / vec})
+    return records
+
+
+def bench_crisis(args):
+    import random
+
+    import crisis
+
+    rng = random.Random(0)
+    vocab = [f"w{i}" for i in range(50_000)]
+    base_patterns, negations = crisis.load_patterns()
+    # half benign, half ending in a crisis phrase; benign ones make the substring scan try every pattern
+    messages = [" ".join(rng.choice(vocab) for _ in range(args.words)) + (" i want to end it all" if i % 2 else "")
+                for i in range(200)]
+    records = []
+    print(f"{'patterns':>9}  {'substring scan':>15}  {'automaton':>10}")
+    for size in args.patterns:
+        # synthetic phrases over their own vocabulary, so they don't fire on the benign messages
+        extra = [("self_harm", " ".join(f"p{rng.randrange(50_000)}" for _ in range(rng.randint(1, 3))), True)
+                 for _ in range(max(size - len(base_patterns), 0))]
+        patterns = base_patterns + extra
+        detector = crisis.CrisisDetector(patterns, negations)
+        phrases = [p for _, p, _ in patterns]
+        naive = best_of(lambda: [any(p in m.lower() for p in phrases) for m in messages]) / len(messages)
+        fast = best_of(lambda: [detector.is_crisis(m) for m in messages]) / len(messages)
+        print(f"{len(patterns):>9}  {naive * 1e6:12.1f} us  {fast * 1e6:7.1f} us")
+        records.append({"name": "is_crisis", "size": len(patterns), "substring_us": naive * 1e6,
+                        "automaton_us": fast * 1e6})
+    return records
+
+
+def bench_search(args):
+    import itertools
+    import random
+    import sqlite3
+    import tempfile
+
+    import migrations
+    import search
+
+    rng = random.Random(0)
+    # Zipf-ish vocabulary: a few very common words, a long tail of rare ones
+    vocab = ["i", "feel", "exam", "stress", "sleep", "anxious", "friends", "home"] + [f"w{i}" for i in range(20_000)]
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocab))))
+    queries = ["exam stress", '"feel anxious"', "anx*", "w1234", "sleep w42*", "nothingmatches"]
+    records = []
+    print(f"{'rows':>10}  " + "  ".join(f"{q:>16}" for q in queries))
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            conn = sqlite3.connect(os.path.join(tmp, f"search_{rows}.db"))
+            migrations.migrate(conn)
+            for start in range(0, rows, 50_000):
+                conn.executemany(
+                    "INSERT INTO posts (anon_id, content, approved, timestamp) VALUES ('anon', ?, 1, '2026-01-01')",
+                    [(" ".join(rng.choices(vocab, cum_weights=cum_weights, k=args.words)),) for _ in range(min(50_000, rows - start))])
+            conn.commit()
+            times = [best_of(lambda: search.search_posts(conn, q), repeat=5) for q in queries]
+            print(f"{rows:>10}  " + "  ".join(f"{t * 1000:13.2f} ms" for t in times))
+            records += [{"name": f"search {q}", "size": rows, "ms": t * 1000} for q, t in zip(queries, times)]
+            conn.close()
+    return records
+
+
+def bench_schedule(args):
+    import datetime
+    import random
+    import tempfile
+
+    import migrations
+    import scheduler
+    import storage
+
+    rng = random.Random(0)
+    today = datetime.datetime.utcnow().date() + datetime.timedelta(days=1)
+    records = []
+    print(f"{'requests':>10}  {'slots':>8}  {'allocate':>10}  {'assigned':>9}  {'requests/s':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for requests in args.requests:
+            pool = storage.ConnectionPool(os.path.join(tmp, f"schedule_{requests}.db"), max_size=2)
+            with pool.transaction() as conn:
+                migrations.migrate(conn)
+            # enough counsellors for the slots to cover the backlog over args.days working days
+            per_day = (17 - 9) * 60 // scheduler.SLOT_MINUTES
+            for c in range(-(-requests // (per_day * args.days))):
+                counsellor = scheduler.add_counsellor(pool, f"counsellor {c}")
+                for d in range(args.days):
+                    scheduler.add_slots(pool, counsellor, today + datetime.timedelta(days=d),
+                                        datetime.time(9), datetime.time(17))
+            with pool.transaction() as conn:
+                conn.executemany(
+                    "INSERT INTO screenings (anon_id, phq9_score, gad7_score, timestamp) VALUES (?, ?, ?, ?)",
+                    [(f"anon_{i}", rng.randint(0, 27), rng.randint(0, 21), "2026-01-01T00:00:00")
+                     for i in range(0, requests, 2)])  # half the students have screened
+                conn.executemany(
+                    "INSERT INTO bookings (anon_id, preferred_date, preferred_time, status, timestamp) "
+                    "VALUES (?, ?, ?, 'requested', '2026-01-01T00:00:00')",
+                    [(f"anon_{i}", (today + datetime.timedelta(days=rng.randrange(args.days))).isoformat(),
+                      f"{rng.randint(9, 16):02d}:00") for i in range(requests)])
+                slots = conn.execute("SELECT count(*) FROM slots").fetchone()[0]
+            start = time.perf_counter()
+            assigned, _ = scheduler.allocate(pool)
+            elapsed = time.perf_counter() - start
+            print(f"{requests:>10}  {slots:>8}  {elapsed * 1000:7.0f} ms  {assigned:>9}  {requests / elapsed:12,.0f}")
+            records.append({"name": "allocate", "size": requests, "slots": slots, "ms": elapsed * 1000,
+                            "assigned": assigned, "requests_per_s": requests / elapsed})
+            pool.close()
+    return records
+
+SEED_STATUSES = ["requested"] * 6 + ["confirmed", "completed", "completed", "no_show", "cancelled"]
+POST_WORDS = ["i", "feel", "exam", "stress", "sleep", "anxious", "friends", "home", "hostel", "lonely", "better"]
+CHAT_MESSAGES = ["exams are stressing me out", "i can't sleep before tests", "feeling lonely in the hostel",
+                 "i want to end it all", "my friends don't get it", "how do i calm down before a viva"]
+
+
+def seed(pool, screenings, posts=0, bookings=0, days=90, chunk=50_000):
+    """Fill a migrated database with synthetic screenings, forum posts and booking requests.
+
+    Timestamps are spread over the last ``days`` days and students are drawn
+    from a population a tenth the size of ``screenings``, so most have
+    screened several times. Nine in ten posts are approved.
+    """
+    import datetime
+    import random
+
+    rng = np.random.default_rng(0)
+    pick = random.Random(0)
+    now = datetime.datetime.utcnow()
+    students = max(screenings // 10, 1)
+
+    def stamps(n):
+        return [(now - datetime.timedelta(seconds=int(s))).isoformat() for s in rng.integers(0, days * 86400, n)]
+
+    for start in range(0, screenings, chunk):
+        n = min(chunk, screenings - start)
+        answers = rng.integers(0, scoring.MAX_ANSWER + 1, size=(n, scoring.PHQ9_ITEMS + scoring.GAD7_ITEMS))
+        phq9 = answers[:, :scoring.PHQ9_ITEMS].sum(axis=1).tolist()
+        gad7 = answers[:, scoring.PHQ9_ITEMS:].sum(axis=1).tolist()
+        ids = rng.integers(0, students, n).tolist()
+        with pool.transaction() as conn:
+            conn.executemany("INSERT INTO screenings (anon_id, phq9_score, gad7_score, timestamp) VALUES (?, ?, ?, ?)",
+                             zip((f"anon_{i:08x}" for i in ids), phq9, gad7, stamps(n)))
+    for start in range(0, posts, chunk):
+        n = min(chunk, posts - start)
+        with pool.transaction() as conn:
+            conn.executemany("INSERT INTO posts (anon_id, content, flagged, approved, timestamp) VALUES (?, ?, 0, ?, ?)",
+                             [(f"anon_{pick.randrange(students):08x}", " ".join(pick.choices(POST_WORDS, k=20)),
+                               int(pick.random() < 0.9), ts) for ts in stamps(n)])
+    today = datetime.datetime.utcnow().date()
+    for start in range(0, bookings, chunk):
+        n = min(chunk, bookings - start)
+        with pool.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO bookings (anon_id, preferred_date, preferred_time, notes, status, timestamp) "
+                "VALUES (?, ?, ?, '', ?, ?)",
+                [(f"anon_{pick.randrange(students):08x}", (today + datetime.timedelta(days=pick.randrange(14))).isoformat(),
+                  f"{pick.randint(9, 16):02d}:00", pick.choice(SEED_STATUSES), ts) for ts in stamps(n)])
+
+
+def bench_core(args):
+    import datetime
+    import tempfile
+
+    import exporter
+    import migrations
+    import services
+    import storage
+
+    records = []
+    rng = np.random.default_rng(0)
+    answers = rng.integers(0, scoring.MAX_ANSWER + 1, size=(10_000, scoring.PHQ9_ITEMS)).tolist()
+    scores = [(sum(a), sum(a[:scoring.GAD7_ITEMS])) for a in answers]
+    messages = CHAT_MESSAGES * 500
+    calls = {
+        "score_phq9": (lambda: [scoring.score_phq9(a) for a in answers], len(answers)),
+        "risk_level_from_scores": (lambda: [scoring.risk_level_from_scores(p, g) for p, g in scores], len(scores)),
+        "rule_based_response": (lambda: [services.rule_based_response(m) for m in messages], len(messages)),
+    }
+    print(f"{'function':>24}  {'per call':>10}")
+    for name, (fn, calls_made) in calls.items():
+        per_call = best_of(fn) / calls_made
+        print(f"{name:>24}  {per_call * 1e6:7.2f} us")
+        records.append({"name": name, "size": calls_made, "per_call_us": per_call * 1e6})
+
+    print(f"\n{'rows':>10}  {'seed':>9}  {'admin summary':>14}  {'csv export':>11}  {'export rows/s':>14}")
+    since = (datetime.datetime.utcnow().date() - datetime.timedelta(days=30)).isoformat()
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            pool = storage.ConnectionPool(os.path.join(tmp, f"core_{rows}.db"), max_size=2)
+            with pool.connection() as conn:
+                migrations.migrate(conn)
+            start = time.perf_counter()
+            seed(pool, rows, rows // 10, rows // 10)
+            seeded = time.perf_counter() - start
+
+            def summary():
+                with pool.connection() as conn:
+                    services.admin_summary(conn, since)
+
+            admin = best_of(summary, repeat=5)
+            with open(os.devnull, "w") as sink:
+                export = best_of(lambda: exporter.write_csv(pool, sink), repeat=1 if rows > 100_000 else 3)
+            print(f"{rows:>10}  {seeded:7.1f} s  {admin * 1000:11.2f} ms  {export:9.2f} s  {rows / export:14,.0f}")
+            records.append({"name": "database", "size": rows, "seed_s": seeded, "admin_summary_ms": admin * 1000,
+                            "csv_export_s": export, "export_rows_per_s": rows / export})
+            pool.close()
+    return records
+
+
+def bench_metrics(args):
+    import tempfile
+
+    import metrics
+    import migrations
+    import services
+    import storage
+
+    records = []
+    n = 200_000
+    child = metrics.histogram("bench_seconds", "bench.py metrics overhead").labels()
+
+    def nothing():
+        pass
+
+    timed_nothing = metrics.timed(child)(nothing)
+    costs = {
+        "observe": best_of(lambda: [child.observe(0.001) for _ in range(n)]) / n,
+        "timed call": (best_of(lambda: [timed_nothing() for _ in range(n)])
+                       - best_of(lambda: [nothing() for _ in range(n)])) / n,
+        "observe_query": best_of(lambda: [metrics.observe_query("SELECT 1", 0.001) for _ in range(n)]) / n,
+    }
+    print(f"{'recording':>16}  {'cost':>9}")
+    for name, cost in costs.items():
+        print(f"{name:>16}  {cost * 1e9:6.0f} ns")
+        records.append({"name": name, "size": n, "ns": cost * 1e9})
+
+    # what that adds up to per user-facing operation: recordings made x cost of one, over the operation's time
+    import datetime
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = storage.ConnectionPool(os.path.join(tmp, "metrics.db"), max_size=4)
+        with pool.connection() as conn:
+            migrations.migrate(conn)
+        seed(pool, args.rows, args.rows // 10, args.rows // 10)
+        writer = storage.WriteQueue(pool)
+        since = (datetime.datetime.utcnow().date() - datetime.timedelta(days=30)).isoformat()
+
+        def chat_turn():
+            with pool.connection() as conn:
+                conn.execute("SELECT phq9_score, gad7_score FROM screenings ORDER BY id DESC LIMIT 1").fetchone()
+            services.rule_based_response("exams are stressing me out")
+
+        def admin_summary():
+            with pool.connection() as conn:
+                services.admin_summary(conn, since)
+
+        operations = {
+            "chat turn": chat_turn,
+            "admin summary": admin_summary,
+            "screening submit": lambda: services.submit_screening(writer, "student", [1] * 9, [1] * 7),
+        }
+        per_recording = costs["timed call"]
+        print(f"\n{'operation':>18}  {'time':>10}  {'recordings':>10}  {'overhead':>8}")
+        for name, op in operations.items():
+            calls = 200
+            before = metrics.observations()
+            elapsed = best_of(lambda: [op() for _ in range(calls)], repeat=1) / calls
+            recordings = (metrics.observations() - before) / calls
+            overhead = recordings * per_recording / (elapsed - recordings * per_recording)
+            print(f"{name:>18}  {elapsed * 1e6:7.0f} us  {recordings:10.1f}  {overhead:8.2%}")
+            records.append({"name": name, "size": calls, "us": elapsed * 1e6, "recordings": recordings,
+                            "overhead": overhead})
+        writer.close()
+        pool.close()
+    return records
+
+
+LOAD_MIX = {  # operation -> relative weight in a simulated user's session
+    "screening": 25,
+    "chat": 30,
+    "forum_feed": 25,
+    "booking": 10,
+    "forum_post": 5,
+    "admin_summary": 5,
+}
+
+
+def bench_load(args):
+    """Closed loop: each simulated user is a thread running operations back to back, like a Streamlit session."""
+    import collections
+    import datetime
+    import random
+    import tempfile
+    import threading
+
+    import forum
+    import migrations
+    import services
+    import storage
+
+    records = []
+    since = (datetime.datetime.utcnow().date() - datetime.timedelta(days=30)).isoformat()
+    tomorrow = datetime.datetime.utcnow().date() + datetime.timedelta(days=1)
+    names, weights = list(LOAD_MIX), list(LOAD_MIX.values())
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = storage.ConnectionPool(os.path.join(tmp, "load.db"), max_size=args.pool_size)
+        with pool.connection() as conn:
+            migrations.migrate(conn)
+        seed(pool, args.rows, args.rows // 10, args.rows // 10)
+        writer = storage.WriteQueue(pool)
+        feed = forum.FeedCache(pool)
+
+        def admin_summary():
+            with pool.connection() as conn:
+                return services.admin_summary(conn, since)
+
+        operations = {
+            "screening": lambda rng: services.submit_screening(
+                writer, f"student{rng.randrange(10_000)}", [rng.randint(0, 3) for _ in range(scoring.PHQ9_ITEMS)],
+                [rng.randint(0, 3) for _ in range(scoring.GAD7_ITEMS)]),
+            "chat": lambda rng: services.rule_based_response(rng.choice(CHAT_MESSAGES)),
+            "forum_feed": lambda rng: feed.page(),
+            "booking": lambda rng: services.request_booking(writer, None, f"student{rng.randrange(10_000)}",
+                                                            tomorrow, "10:00"),
+            "forum_post": lambda rng: services.create_post(writer, "synthetic load-test post"),
+            "admin_summary": lambda rng: admin_summary(),
+        }
+        print(f"{'users':>6}  {'operation':>14}  {'count':>8}  {'ops/s':>9}  {'p50':>9}  {'p95':>9}  {'p99':>9}  {'errors':>6}")
+        for users in args.users:
+            latencies = [collections.defaultdict(list) for _ in range(users)]  # one per thread: no locking
+            errors = [collections.Counter() for _ in range(users)]
+            deadline = time.perf_counter() + args.duration
+
+            def user(i):
+                rng = random.Random(i)
+                while (started := time.perf_counter()) < deadline:
+                    name = rng.choices(names, weights)[0]
+                    try:
+                        operations[name](rng)
+                    except Exception:
+                        errors[i][name] += 1
+                    else:
+                        latencies[i][name].append(time.perf_counter() - started)
+
+            threads = [threading.Thread(target=user, args=(i,)) for i in range(users)]
+            start = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - start
+            merged = {name: [x for per_user in latencies for x in per_user[name]] for name in names}
+            merged["all"] = [x for name in names for x in merged[name]]
+            failed = sum(errors, collections.Counter())
+            failed["all"] = sum(failed.values())
+            for name, samples in merged.items():
+                if not samples:
+                    continue
+                p50, p95, p99 = np.percentile(np.array(samples) * 1000, [50, 95, 99])
+                print(f"{users:>6}  {name:>14}  {len(samples):>8}  {len(samples) / elapsed:9,.0f}  "
+                      f"{p50:6.2f} ms  {p95:6.2f} ms  {p99:6.2f} ms  {failed[name]:>6}")
+                records.append({"name": f"load {name}", "size": users, "count": len(samples),
+                                "ops_per_s": len(samples) / elapsed, "p50_ms": p50, "p95_ms": p95, "p99_ms": p99,
+                                "errors": failed[name]})
+        writer.close()
+        pool.close()
+    return records
+
+
+# imported only by the pages and functions that need them; loading one at startup is a cold-start regression
+LAZY_MODULES = ("pandas", "altair", "numpy", "llm", "httpx", "crypto_keys", "cryptography")
+
+
+def import_profile(module):
+    """``(cumulative µs, {direct import: cumulative µs}, every module loaded)`` for ``import module`` in a fresh interpreter."""
+    import subprocess
+
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True,
+                          text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if proc.returncode:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    total, children, pending, loaded = None, {}, {}, set()
+    # children are reported before their parent: "import time: self [us] | cumulative | <indent>name"
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or line.endswith("| imported package"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        loaded.add(name)
+        if depth == 1:
+            pending[name] = int(cumulative)
+        elif depth == 0:
+            if name == module:
+                total, children = int(cumulative), pending
+            pending = {}
+    return total, children, loaded
+
+
+def bench_coldstart(args):
+    import statistics
+
+    records = []
+    for module in args.modules:
+        runs = [import_profile(module) for _ in range(args.repeat)]
+        total = statistics.median(r[0] for r in runs) / 1000
+        heavy = sorted({m.split(".")[0] for r in runs for m in r[2]} & set(LAZY_MODULES))
+        print(f"import {module}: {total:,.0f} ms (median of {args.repeat})"
+              + (f" — loads {', '.join(heavy)} eagerly" if heavy else ""))
+        top = {name: statistics.median(r[1].get(name, 0) for r in runs) / 1000 for name in runs[0][1]}
+        for name, ms in sorted(top.items(), key=lambda kv: -kv[1])[:args.top]:
+            print(f"  {name:>24}  {ms:8.1f} ms")
+        over = args.budget_ms is not None and total > args.budget_ms
+        if over:
+            print(f"  over the {args.budget_ms:,.0f} ms budget")
+        records.append({"name": f"import {module}", "size": args.repeat, "ms": total, "eager": heavy,
+                        "failed": over or bool(heavy)})
+    return records
+
+
+def compare(args):
+    """Print how every metric moved between two ``--json`` result files."""
+    with open(args.old) as fh:
+        old = {(r["name"], r["size"]): r for r in json.load(fh)["results"]}
+    with open(args.new) as fh:
+        new = json.load(fh)["results"]
+    print(f"{'benchmark':>28}  {'size':>9}  {'metric':>18}  {'old':>12}  {'new':>12}  {'change':>8}")
+    for record in new:
+        before = old.get((record["name"], record["size"]))
+        if before is None:
+            continue
+        for metric, value in record.items():
+            was = before.get(metric)
+            numeric = all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in (value, was))
+            if metric in ("name", "size") or not numeric:
+                continue
+            change = f"{(value - was) / was:+8.1%}" if was else f"{'':>8}"
+            print(f"{record['name']:>28}  {record['size']:>9}  {metric:>18}  {was:12.3f}  {value:12.3f}  {change}")
+
+
+def write_results(path, args, records):
+    """Save a run's records, with enough context to compare it against later runs."""
+    import datetime
+    import platform
+    import subprocess
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    run = {
+        "command": args.command,
+        "params": {k: v for k, v in vars(args).items() if k not in ("command", "json")},
+        "at": datetime.datetime.utcnow().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": records,
+    }
+    with open(path, "w") as fh:
+        json.dump(run, fh, indent=2)
+
+
+COMMANDS = {
+    "scoring": bench_scoring,
+    "crisis": bench_crisis,
+    "search": bench_search,
+    "schedule": bench_schedule,
+    "core": bench_core,
+    "load": bench_load,
+    "metrics": bench_metrics,
+    "coldstart": bench_coldstart,
+    "compare": compare,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", metavar="PATH", help="also write the results to PATH as JSON")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("scoring", help="per-row vs vectorised PHQ-9/GAD-7 scoring and banding")
+    p.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    p = sub.add_parser("crisis", help="per-message crisis detection cost as the lexicon grows")
+    p.add_argument("--patterns", type=int, nargs="+", default=[10, 100, 1_000, 10_000])
+    p.add_argument("--words", type=int, default=40, help="words per synthetic message")
+    p = sub.add_parser("search", help="ranked full-text search latency over synthetic forum posts")
+    p.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    p.add_argument("--words", type=int, default=30, help="words per synthetic post")
+    p = sub.add_parser("schedule", help="allocating a booking backlog to counsellor slots")
+    p.add_argument("--requests", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    p.add_argument("--days", type=int, default=20, help="working days of slots published")
+    p = sub.add_parser("core", help="scoring, chat fallback, admin summary and CSV export over seeded databases")
+    p.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="screenings seeded")
+    p = sub.add_parser("load", help="latency percentiles and throughput with N concurrent simulated users")
+    p.add_argument("--users", type=int, nargs="+", default=[1, 8, 32])
+    p.add_argument("--duration", type=float, default=10.0, help="seconds per user count")
+    p.add_argument("--rows", type=int, default=100_000, help="screenings seeded before the run")
+    p.add_argument("--pool-size", type=int, default=8, help="connection pool size")
+    p = sub.add_parser("metrics", help="cost of recording metrics, alone and on hot calls")
+    p.add_argument("--rows", type=int, default=100_000, help="screenings seeded for the query timings")
+    p = sub.add_parser("coldstart", help="import time of the app and API in fresh interpreters (python -X importtime)")
+    p.add_argument("--modules", nargs="+", default=["app", "api"])
+    p.add_argument("--repeat", type=int, default=5, help="fresh interpreters per module; the median is reported")
+    p.add_argument("--top", type=int, default=8, help="slowest direct imports listed per module")
+    p.add_argument("--budget-ms", type=float, help="exit non-zero if a median import takes longer")
+    p = sub.add_parser("compare", help="compare two --json result files")
+    p.add_argument("old")
+    p.add_argument("new")
+    args = parser.parse_args(argv)
+    records = COMMANDS[args.command](args)
+    if args.json and records:
+        write_results(args.json, args, records)
+    if any(r.get("failed") for r in records or ()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
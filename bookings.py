@@ -0,0 +1,90 @@
+# bookings.py
+"""Booking status workflow and counsellor worklists.
+
+A booking moves through::
+
+    requested ──► confirmed ──► completed
+        │             ├───────► no_show
+        └─────────────┴───────► cancelled
+
+``transition`` applies a move to many bookings at once. Like forum
+moderation, each booking is updated only if it is still in the status the
+counsellor was shown, so two people working the same list can't both act
+on it. Confirming needs a slot; cancelling gives the slot back to the pool
+and clears the booking's slot and counsellor, so the slot has one owner.
+
+Triggers (migration 12) log every change in ``booking_transitions`` with
+its time and keep ``booking_status_counts`` current, so the dashboard reads
+a handful of rows instead of counting the table.
+"""
+import datetime
+
+import scheduler
+
+STATUSES = ("requested", "confirmed", "completed", "no_show", "cancelled")
+TRANSITIONS = {
+    "requested": ("confirmed", "cancelled"),
+    "confirmed": ("completed", "no_show", "cancelled"),
+}
+
+# the status guard is the compare-and-set; confirming also needs a slot
+TRANSITION_SQL = "UPDATE bookings SET status=?, status_changed_at=? WHERE id=? AND status=?"
+CONFIRM_SQL = TRANSITION_SQL + " AND slot_id IS NOT NULL"
+RELEASE_SLOT_SQL = "UPDATE slots SET booking_id=NULL WHERE booking_id=?"
+
+WORKLIST_SQL = (
+    "SELECT b.id, s.starts_at, s.ends_at, b.anon_id, b.notes, b.contact_encrypted, b.status "
+    "FROM slots s JOIN bookings b ON b.id = s.booking_id "
+    "WHERE s.counsellor_id = ? AND s.starts_at >= ? AND s.starts_at < ? ORDER BY s.starts_at")
+COUNTS_SQL = f"SELECT status, n FROM booking_status_counts WHERE status IN ({', '.join('?' * len(STATUSES))})"
+
+
+def can_transition(from_status, to_status):
+    return to_status in TRANSITIONS.get(from_status, ())
+
+
+def transition(pool, to_status, bookings):
+    """Move ``bookings`` (``[(id, status_shown), ...]``) to ``to_status`` in one transaction.
+
+    Returns ``(done, skipped)`` lists of ids; a booking is skipped if the
+    move isn't allowed from the status shown, if it has changed since, or
+    (for confirming) if it has no slot yet.
+    """
+    if to_status not in STATUSES:
+        raise ValueError(f"unknown booking status {to_status!r}")
+    sql = CONFIRM_SQL if to_status == "confirmed" else TRANSITION_SQL
+    now = datetime.datetime.utcnow().isoformat()
+    done, skipped = [], []
+    with pool.transaction() as conn:
+        for id_, shown in bookings:
+            if can_transition(shown, to_status) and conn.execute(sql, (to_status, now, id_, shown)).rowcount:
+                if to_status == "cancelled":
+                    conn.execute(RELEASE_SLOT_SQL, (id_,))
+                    conn.execute(scheduler.UNASSIGN_SQL, (id_,))
+                done.append(id_)
+            else:
+                skipped.append(id_)
+    return done, skipped
+
+
+def worklist(conn, counsellor_id, since, until):
+    """A counsellor's booked slots starting in ``[since, until)`` (``scheduler.TIME_FORMAT`` strings).
+
+    Rows are ``(booking_id, starts_at, ends_at, anon_id, notes,
+    contact_encrypted, status)`` by start time. Cancelled bookings have
+    given their slot back and don't appear.
+    """
+    return conn.execute(WORKLIST_SQL, (counsellor_id, since, until)).fetchall()
+
+
+def status_counts(conn):
+    """``{status: count}`` for every status, from the trigger-maintained counts."""
+    counts = dict.fromkeys(STATUSES, 0)
+    counts.update(conn.execute(COUNTS_SQL, STATUSES).fetchall())
+    return counts
+
+
+def history(conn, booking_id):
+    """``[(from_status, to_status, at), ...]`` for one booking, oldest first."""
+    return conn.execute("SELECT from_status, to_status, at FROM booking_transitions WHERE booking_id=? ORDER BY id",
+                        (booking_id,)).fetchall()
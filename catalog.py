@@ -0,0 +1,142 @@
+# catalog.py
+"""Psychoeducational resource catalog.
+
+The ``resources`` table is small and read on every visit to the Resources
+page, so a ``ResourceCatalog`` loads it once per process into an immutable
+snapshot: listings precomputed for every (language, type) filter, including
+"all", plus the facet counts shown next to each filter. Writers go through
+``add_resource`` / ``remove_resource``, which invalidate the snapshot; the
+next reader rebuilds it. Edits made by other processes are picked up through
+the ``resources`` data version, checked at most once per ``recheck`` seconds.
+
+Downloadable guides, audio and video live as files under ``RESOURCE_DIR``
+and the table stores their relative ``path``; pages hand the path to
+Streamlit instead of holding the content in Python.
+"""
+import collections
+import itertools
+import os
+import re
+import threading
+import time
+
+import storage
+
+RESOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources")
+TYPES = ("article", "video", "audio")
+DEFAULT_RECHECK = 1.0  # seconds between checks of the resources data version
+SNAPSHOT_SQL = "SELECT id, title, type, language, url, path, description FROM resources ORDER BY title"
+
+Resource = collections.namedtuple("Resource", "id title type language url path description")
+Snapshot = collections.namedtuple("Snapshot", "resources listings facets")
+
+
+def resolve_path(resource, resource_dir=RESOURCE_DIR):
+    """Absolute path of a resource's file, or None; never points outside ``resource_dir``."""
+    if not resource.path:
+        return None
+    root = os.path.realpath(resource_dir)
+    full = os.path.realpath(os.path.join(root, resource.path))
+    if os.path.commonpath([root, full]) != root or not os.path.isfile(full):
+        return None
+    return full
+
+
+def build_snapshot(resources):
+    listings = collections.defaultdict(list)
+    for r in resources:
+        for key in itertools.product((r.language, None), (r.type, None)):
+            listings[key].append(r)
+    facets = {
+        "language": collections.Counter(r.language for r in resources),
+        "type": collections.Counter(r.type for r in resources),
+        "language_type": collections.Counter((r.language, r.type) for r in resources),
+    }
+    return Snapshot(tuple(resources), {k: tuple(v) for k, v in listings.items()}, facets)
+
+
+class ResourceCatalog:
+    """Process-wide cached view of the ``resources`` table."""
+
+    def __init__(self, pool, recheck=DEFAULT_RECHECK):
+        self.pool = pool
+        self.recheck = recheck
+        self._snapshot = None
+        self._version = None  # resources data version the snapshot was read at
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def snapshot(self):
+        snap = self._snapshot
+        if snap is not None and time.monotonic() < self._next_check:
+            return snap
+        with self._lock:
+            now = time.monotonic()
+            if self._snapshot is None or now >= self._next_check:
+                with self.pool.connection() as conn:
+                    # version first: a write landing in between only costs one extra reload
+                    version = storage.data_versions(conn, ("resources",))
+                    if self._snapshot is None or version != self._version:
+                        rows = conn.execute(SNAPSHOT_SQL).fetchall()
+                        self._snapshot = build_snapshot([Resource(*row) for row in rows])
+                        self._version = version
+                        self.loads += 1
+                self._next_check = now + self.recheck
+            return self._snapshot
+
+    def listing(self, language=None, type=None):
+        """Resources matching the filters (None = any), sorted by title."""
+        return self.snapshot().listings.get((language, type), ())
+
+    def facets(self):
+        return self.snapshot().facets
+
+    def get(self, resource_id):
+        return next((r for r in self.snapshot().resources if r.id == resource_id), None)
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+
+def _safe_filename(name):
+    base, ext = os.path.splitext(os.path.basename(name))
+    return (re.sub(r"[^\w.-]+", "_", base).strip("._") or "resource") + re.sub(r"[^\w.]", "", ext)
+
+
+def add_resource(pool, catalog, title, type, language, description="", url="", data=None, filename=None,
+                 resource_dir=RESOURCE_DIR):
+    """Insert a resource, storing ``data`` (bytes) as a file under ``resource_dir`` if given."""
+    if type not in TYPES:
+        raise ValueError(f"type must be one of {', '.join(TYPES)}")
+    path = None
+    if data is not None:
+        os.makedirs(resource_dir, exist_ok=True)
+        path = _safe_filename(filename or title)
+        stem, ext = os.path.splitext(path)
+        for n in itertools.count(1):
+            if not os.path.exists(os.path.join(resource_dir, path)):
+                break
+            path = f"{stem}_{n}{ext}"
+        with open(os.path.join(resource_dir, path), "wb") as fh:
+            fh.write(data)
+    with pool.transaction() as conn:
+        rowid = conn.execute(
+            "INSERT INTO resources (title, type, language, url, path, description) VALUES (?, ?, ?, ?, ?, ?)",
+            (title, type, language, url, path, description)).lastrowid
+    catalog.invalidate()
+    return rowid
+
+
+def remove_resource(pool, catalog, resource_id, resource_dir=RESOURCE_DIR):
+    """Delete a resource; its file goes too unless another resource still uses it."""
+    resource = catalog.get(resource_id)
+    with pool.transaction() as conn:
+        conn.execute("DELETE FROM resources WHERE id=?", (resource_id,))
+        shared = resource is not None and resource.path and conn.execute(
+            "SELECT 1 FROM resources WHERE path=? LIMIT 1", (resource.path,)).fetchone()
+    catalog.invalidate()
+    full = resolve_path(resource, resource_dir) if resource is not None else None
+    if full and not shared:
+        os.remove(full)
@@ -0,0 +1,177 @@
+# chat_cache.py
+"""Response cache for the first-aid chat.
+
+Students send the same few messages over and over ("stressed about exams",
+"can't sleep"), so replies are cached under the normalized message text with
+a TTL and LRU eviction. An optional MinHash/LSH index (off by default) also
+matches near duplicates ("so stressed about my exams" ~ "so stressed about my
+exam"). Shingle similarity can't see negation ("i cant sleep" ~ "i can
+sleep"), so a near match is only served when both messages carry the same
+negation cues from the crisis lexicon. With a ``ConnectionPool`` the cache is
+written through to the ``chat_cache`` table, which is trimmed to the TTL and
+``max_entries`` on every write, and reloaded on restart.
+
+Callers must not use the cache for crisis messages — those always get a
+fresh, escalating response.
+"""
+import collections
+import re
+import threading
+import time
+import zlib
+
+import crisis
+
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_TTL = 24 * 3600  # seconds
+NEAR_DUP_THRESHOLD = 0.8  # estimated Jaccard similarity of character shingles
+SHINGLE_SIZE = 3
+NUM_HASHES = 64
+LSH_BANDS = 16            # 16 bands x 4 rows: ~0.8 similarity is found with high probability
+
+# drop rows past the TTL and beyond the newest max_entries; one index range delete
+TRIM_SQL = ("DELETE FROM chat_cache WHERE created_at < "
+            "max(?, coalesce((SELECT created_at FROM chat_cache ORDER BY created_at DESC LIMIT 1 OFFSET ? - 1), 0))")
+
+_MERSENNE = (1 << 61) - 1
+# fixed (a, b) pairs so signatures are stable across processes and restarts
+_HASH_PARAMS = [(1 + 2 * zlib.crc32(f"a{i}".encode()), zlib.crc32(f"b{i}".encode())) for i in range(NUM_HASHES)]
+
+
+def normalize(text):
+    """Cache key for a message: lowercase, apostrophes dropped, punctuation and extra spaces collapsed."""
+    text = text.lower().replace("'", "").replace("’", "")
+    return " ".join(re.findall(r"\w+", text))
+
+
+def minhash(key):
+    shingles = {key[i:i + SHINGLE_SIZE] for i in range(max(len(key) - SHINGLE_SIZE + 1, 1))}
+    hashed = [zlib.crc32(s.encode()) for s in shingles]
+    return tuple(min((a * h + b) % _MERSENNE for h in hashed) for a, b in _HASH_PARAMS)
+
+
+def similarity(sig_a, sig_b):
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / len(sig_a)
+
+
+def negation_cues(key):
+    return crisis.get_detector().negations.intersection(key.split())
+
+
+class ResponseCache:
+    """Thread-safe TTL + LRU cache of chat replies, shared by all sessions."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL, pool=None, near_duplicates=False):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.pool = pool
+        self.near_duplicates = near_duplicates
+        self._entries = collections.OrderedDict()  # key -> (response, created_at, latency, signature)
+        self._buckets = collections.defaultdict(set)  # (band, band hash) -> keys
+        self._lock = threading.Lock()
+        self.hits = self.near_hits = self.misses = 0
+        self.saved_seconds = 0.0
+        if pool is not None:
+            self._load()
+
+    # ---------- public API ----------
+    def get(self, message):
+        """Cached reply for ``message`` (or a near duplicate), or None."""
+        key = normalize(message)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            near = False
+            if entry is None and self.near_duplicates and key:
+                match = self._nearest(key)
+                if match is not None:
+                    key, entry, near = match, self._entries[match], True
+            if entry is None or now - entry[1] > self.ttl:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.near_hits += near
+            self.saved_seconds += entry[2]
+            return entry[0]
+
+    def put(self, message, response, latency=0.0):
+        """Cache ``response``; ``latency`` is what producing it cost, counted as saved on each hit."""
+        key = normalize(message)
+        if not key or not response:
+            return
+        created = time.time()
+        with self._lock:
+            self._insert(key, response, created, latency)
+        if self.pool is not None:
+            with self.pool.transaction() as conn:
+                conn.execute("INSERT OR REPLACE INTO chat_cache (key, response, created_at, latency) VALUES (?, ?, ?, ?)",
+                             (key, response, created, latency))
+                conn.execute(TRIM_SQL, (created - self.ttl, self.max_entries))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_seconds": self.saved_seconds,
+            }
+
+    # ---------- internals (call with the lock held) ----------
+    def _insert(self, key, response, created, latency):
+        if key in self._entries:
+            self._remove(key)
+        signature = minhash(key) if self.near_duplicates else None
+        self._entries[key] = (response, created, latency, signature)
+        if signature:
+            for band in self._bands(signature):
+                self._buckets[band].add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        _, _, _, signature = self._entries.pop(key)
+        if signature:
+            for band in self._bands(signature):
+                bucket = self._buckets.get(band)
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self._buckets[band]
+
+    @staticmethod
+    def _bands(signature):
+        rows = NUM_HASHES // LSH_BANDS
+        return [(i, signature[i * rows:(i + 1) * rows]) for i in range(LSH_BANDS)]
+
+    def _nearest(self, key):
+        signature = minhash(key)
+        candidates = set()
+        for band in self._bands(signature):
+            candidates |= self._buckets.get(band, set())
+        cues = negation_cues(key)
+        best, best_sim = None, NEAR_DUP_THRESHOLD
+        for candidate in candidates:
+            if negation_cues(candidate) != cues:
+                continue
+            sim = similarity(signature, self._entries[candidate][3])
+            if sim >= best_sim:
+                best, best_sim = candidate, sim
+        return best
+
+    def _load(self):
+        cutoff = time.time() - self.ttl
+        with self.pool.transaction() as conn:
+            conn.execute(TRIM_SQL, (cutoff, self.max_entries))
+            rows = conn.execute(
+                "SELECT key, response, created_at, latency FROM chat_cache ORDER BY created_at DESC LIMIT ?",
+                (self.max_entries,)).fetchall()
+        with self._lock:
+            for key, response, created, latency in reversed(rows):
+                self._insert(key, response, created, latency)
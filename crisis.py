@@ -0,0 +1,153 @@
+# crisis.py
+"""Crisis-language detection for chat messages and forum posts.
+
+Patterns are whole-word phrases loaded from ``crisis_patterns.txt`` and
+compiled once into an Aho-Corasick automaton over word tokens, so a message
+is matched against the whole lexicon in a single left-to-right pass whose
+cost depends on the message length, not on the number of patterns.
+
+A match directly preceded by a negation cue ("not", "never", "nahi", ...)
+is ignored ("I'm not suicidal"), unless its pattern is marked with ``!``
+in the pattern file. Only the word right before the match counts, so "no"
+in "no one cares, kill myself" or "never" in "never wanted to kill myself
+this badly" negates nothing, and a cue never reaches past punctuation or a
+conjunction like "but" ("No. Suicide feels like the answer"). A missed
+crisis costs far more than an extra helpline banner, so when in doubt the
+detector escalates.
+"""
+import collections
+import functools
+import os
+import re
+
+PATTERN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "crisis_patterns.txt")
+NEGATION_WINDOW = 1  # tokens before a match that are checked for a negation cue: only the one directly before it
+CLAUSE_WORDS = {"but", "and", "so", "because", "cause", "though", "although", "yet", "lekin"}  # a cue before these negates nothing after
+
+# words plus the combining marks of Indic scripts (Devanagari .. Malayalam), which \w alone splits on
+_TOKEN_RE = re.compile(r"[\w\u0900-\u0DFF]+")
+_CLAUSE_BREAK_RE = re.compile(r"[.,;:!?\u2014\u0964]")  # sentence and clause punctuation, incl. the Devanagari danda
+
+Match = collections.namedtuple("Match", "category phrase start end")
+
+
+def tokenize(text):
+    text = text.lower().replace("'", "").replace("’", "")
+    return _TOKEN_RE.findall(text)
+
+
+def tokenize_clauses(text):
+    """``(tokens, clause_starts)``: ``clause_starts[i]`` is the index of the first token in token i's clause."""
+    tokens, clause_starts = [], []
+    for part in _CLAUSE_BREAK_RE.split(text):
+        start = len(tokens)
+        for tok in tokenize(part):
+            tokens.append(tok)
+            clause_starts.append(start)
+            if tok in CLAUSE_WORDS:
+                start = len(tokens)
+    return tokens, clause_starts
+
+
+def load_patterns(path=PATTERN_FILE):
+    """Parse a pattern file into ``(patterns, negations)``.
+
+    ``patterns`` is a list of ``(category, phrase, negatable)``. Sections
+    are ``[category]`` headers; ``[negation]`` lists negation cues; ``#``
+    starts a comment; a leading ``!`` marks a phrase that negation cues
+    must not suppress.
+    """
+    patterns, negations, category = [], set(), None
+    with open(path, encoding="utf-8") as fh:
+        for line_no, line in enumerate(fh, 1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            if line.startswith("[") and line.endswith("]"):
+                category = line[1:-1].strip()
+                continue
+            if category is None:
+                raise ValueError(f"{path}:{line_no}: pattern outside a [category] section")
+            negatable = not line.startswith("!")
+            phrase = " ".join(tokenize(line.lstrip("!")))
+            if not phrase:
+                continue
+            if category == "negation":
+                negations.add(phrase)
+            else:
+                patterns.append((category, phrase, negatable))
+    return patterns, negations
+
+
+class CrisisDetector:
+    """Aho-Corasick automaton over word tokens."""
+
+    def __init__(self, patterns, negations=()):
+        self.patterns = []      # id -> (category, phrase, negatable, length in tokens)
+        self.negations = set(negations)
+        self._goto = [{}]       # node -> {token: node}
+        self._fail = [0]
+        self._out = [[]]        # node -> pattern ids ending here (including via fail links)
+        for category, phrase, negatable in patterns:
+            self._add(category, phrase, negatable)
+        self._link()
+
+    def _add(self, category, phrase, negatable):
+        tokens = phrase.split()
+        node = 0
+        for tok in tokens:
+            nxt = self._goto[node].get(tok)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][tok] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(len(self.patterns))
+        self.patterns.append((category, phrase, negatable, len(tokens)))
+
+    def _link(self):
+        queue = collections.deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for tok, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and tok not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[child] = self._goto[f].get(tok, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def _negated(self, tokens, clause_starts, start):
+        return any(t in self.negations for t in tokens[max(clause_starts[start], start - NEGATION_WINDOW):start])
+
+    def scan(self, text):
+        """All non-negated matches in ``text``, in order of where they end."""
+        tokens, clause_starts = tokenize_clauses(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        matches, node = [], 0
+        for i, tok in enumerate(tokens):
+            while node and tok not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(tok, 0)
+            for pid in out[node]:
+                category, phrase, negatable, length = self.patterns[pid]
+                start = i - length + 1
+                if negatable and self._negated(tokens, clause_starts, start):
+                    continue
+                matches.append(Match(category, phrase, start, i + 1))
+        return matches
+
+    def categories(self, text):
+        return {m.category for m in self.scan(text)}
+
+    def is_crisis(self, text):
+        return any(m.category == "self_harm" for m in self.scan(text))
+
+
+@functools.lru_cache(maxsize=None)
+def get_detector(path=PATTERN_FILE):
+    """Process-wide detector, compiled on first use and shared by every session."""
+    patterns, negations = load_patterns(path)
+    return CrisisDetector(patterns, negations)
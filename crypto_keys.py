@@ -0,0 +1,224 @@
+# crypto_keys.py
+"""Encryption of booking contact details.
+
+``FERNET_KEY`` holds one or more comma-separated Fernet keys, newest first.
+A ``ContactCipher`` builds the ``MultiFernet`` once per process: it encrypts
+with the first key and decrypts with any of them, so a new key can be put in
+front without breaking older bookings. ``rotate_bookings`` (or a
+``RotationJob`` thread) then re-encrypts the whole ``bookings`` table under
+the new key in chunked transactions, after which the old key can be dropped.
+
+Counsellors read a day's bookings at once, so ``decrypt_many`` takes the
+whole list and, once it is long enough to be worth it, splits it across a
+thread pool.
+
+    python crypto_keys.py --generate
+    FERNET_KEY=new,old python crypto_keys.py --db mental_platform.db --rotate
+"""
+import argparse
+import concurrent.futures
+import logging
+import os
+import threading
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500  # bookings re-encrypted per transaction
+MIN_PARALLEL_BATCH = 64   # below this, handing tokens to threads costs more than it saves
+DEFAULT_WORKERS = min(os.cpu_count() or 1, 4)
+
+UNREADABLE = object()  # rotate_many's marker for a token no configured key opens
+
+UPDATE_SQL = "UPDATE bookings SET contact_encrypted=? WHERE id=? AND contact_encrypted=?"
+
+
+def parse_keys(value):
+    """Fernet keys from a comma-separated ``FERNET_KEY`` value; raises ValueError on a malformed key."""
+    keys = [k.strip() for k in (value or "").split(",") if k.strip()]
+    try:
+        return [Fernet(k.encode()) for k in keys]
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"FERNET_KEY holds a malformed key: {e}") from None
+
+
+class ContactCipher:
+    """Process-wide cipher for ``bookings.contact_encrypted``; thread-safe."""
+
+    def __init__(self, keys, workers=DEFAULT_WORKERS):
+        if not keys:
+            raise ValueError("at least one Fernet key is required")
+        self.primary = keys[0]
+        self.key_count = len(keys)
+        self._multi = MultiFernet(keys)
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, value, workers=DEFAULT_WORKERS):
+        """A cipher for a ``FERNET_KEY`` value, or None when no key is configured."""
+        keys = parse_keys(value)
+        return cls(keys, workers) if keys else None
+
+    def encrypt(self, plain):
+        return self._multi.encrypt(plain.encode()).decode()
+
+    def decrypt(self, token):
+        """Plaintext of ``token``, or None if it is empty or no configured key opens it."""
+        if not token:
+            return None
+        try:
+            return self._multi.decrypt(token.encode()).decode()
+        except InvalidToken:
+            return None
+
+    def decrypt_many(self, tokens):
+        """``decrypt`` over a list, in order; long lists are split across the thread pool."""
+        return self._map(self.decrypt, tokens)
+
+    def rotate(self, token):
+        """``token`` re-encrypted under the primary key, or None if it already is.
+
+        Raises ``InvalidToken`` if no configured key opens it.
+        """
+        data = token.encode()
+        try:
+            self.primary.decrypt(data)
+            return None
+        except InvalidToken:
+            return self._multi.rotate(data).decode()
+
+    def rotate_many(self, tokens):
+        """``rotate`` over a list, in order; a token no key opens comes back as ``UNREADABLE``."""
+        return self._map(self._rotate_or_mark, tokens)
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def _rotate_or_mark(self, token):
+        try:
+            return self.rotate(token)
+        except InvalidToken:
+            return UNREADABLE
+
+    def _map(self, fn, items):
+        items = list(items)
+        if len(items) < MIN_PARALLEL_BATCH or self.workers <= 1:
+            return [fn(item) for item in items]
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="fernet")
+            executor = self._executor
+        size = -(-len(items) // self.workers)  # one contiguous slice per worker
+        parts = executor.map(lambda part: [fn(item) for item in part],
+                             [items[i:i + size] for i in range(0, len(items), size)])
+        return [result for part in parts for result in part]
+
+
+def rotate_bookings(pool, cipher, chunk_size=DEFAULT_CHUNK_SIZE, progress=None, stop=None):
+    """Re-encrypt every booking contact under the primary key; returns ``(rotated, unreadable)`` counts.
+
+    Each chunk is read, rotated and written back in its own transaction, so
+    the app keeps serving bookings throughout; a contact changed meanwhile is
+    left alone. ``progress(rotated, unreadable)`` is called after each chunk
+    and ``stop`` (a ``threading.Event``) ends the run between chunks.
+    """
+    rotated = unreadable = 0
+    last_id = 0
+    while stop is None or not stop.is_set():
+        with pool.connection() as conn:
+            rows = conn.execute("SELECT id, contact_encrypted FROM bookings "
+                                "WHERE contact_encrypted IS NOT NULL AND id > ? ORDER BY id LIMIT ?",
+                                (last_id, chunk_size)).fetchall()
+        if not rows:
+            break
+        results = cipher.rotate_many([token for _, token in rows])
+        params = [(new, id_, old) for (id_, old), new in zip(rows, results) if new not in (None, UNREADABLE)]
+        if params:
+            with pool.transaction() as conn:
+                conn.executemany(UPDATE_SQL, params)
+        rotated += len(params)
+        unreadable += sum(1 for r in results if r is UNREADABLE)
+        last_id = rows[-1][0]
+        if progress:
+            progress(rotated, unreadable)
+    return rotated, unreadable
+
+
+class RotationJob:
+    """Daemon thread running ``rotate_bookings`` once, for the admin page."""
+
+    def __init__(self, pool, cipher, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.pool = pool
+        self.cipher = cipher
+        self.chunk_size = chunk_size
+        self.rotated = self.unreadable = 0
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="fernet-rotation", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10.0):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {"rotated": self.rotated, "unreadable": self.unreadable,
+                "running": self._thread.is_alive(), "error": self.error}
+
+    def _progress(self, rotated, unreadable):
+        self.rotated, self.unreadable = rotated, unreadable
+
+    def _run(self):
+        try:
+            rotate_bookings(self.pool, self.cipher, self.chunk_size, self._progress, self._stop)
+        except Exception as e:
+            log.exception("booking key rotation failed")
+            self.error = repr(e)
+
+
+def main(argv=None):
+    import time
+
+    import migrations
+    import storage
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="mental_platform.db")
+    parser.add_argument("--generate", action="store_true", help="print a new key to put in front of FERNET_KEY")
+    parser.add_argument("--rotate", action="store_true", help="re-encrypt all bookings under the first key")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args(argv)
+
+    if args.generate:
+        print(Fernet.generate_key().decode())
+        return
+    if not args.rotate:
+        parser.error("nothing to do: pass --generate or --rotate")
+    cipher = ContactCipher.from_env(os.getenv("FERNET_KEY"), args.workers)
+    if cipher is None:
+        parser.error("FERNET_KEY is not set")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    pool = storage.ConnectionPool(args.db, max_size=2)
+    with pool.connection() as conn:
+        migrations.migrate(conn)
+    start = time.perf_counter()
+    rotated, unreadable = rotate_bookings(pool, cipher, args.chunk_size)
+    log.info("re-encrypted %d contacts in %.2fs (%d keys configured)", rotated, time.perf_counter() - start,
+             cipher.key_count)
+    if unreadable:
+        log.warning("%d contacts could not be opened with any configured key and were left as they are",
+                    unreadable)
+    cipher.close()
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
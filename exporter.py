@@ -0,0 +1,146 @@
+# exporter.py
+"""Anonymized screening export, streamed page by page.
+
+Rows are read with keyset pagination (``id > last_id ORDER BY id LIMIT n``),
+so memory is bounded by one page no matter how big the table is. CSV output
+is produced by a generator of text chunks; Parquet output (needs ``pyarrow``)
+writes one row group per page.
+
+    python exporter.py screenings.csv [--db mental_platform.db] [--since 2024-01-01] [--until 2024-06-30]
+    python exporter.py screenings.parquet --columns anon_id phq9 timestamp --last-days 7
+"""
+import argparse
+import csv
+import datetime
+import io
+import sys
+
+# export name -> screenings column; anon_id is already pseudonymous, meta is never exported
+EXPORT_COLUMNS = {
+    "id": "id",
+    "anon_id": "anon_id",
+    "phq9": "phq9_score",
+    "gad7": "gad7_score",
+    "timestamp": "timestamp",
+}
+DEFAULT_COLUMNS = ["anon_id", "phq9", "gad7", "timestamp"]
+PAGE_SIZE = 5000
+
+
+def _date_bounds(since=None, until=None):
+    # ``until`` is an inclusive date; timestamps are ISO strings so compare textually
+    lower = since.isoformat() if since else None
+    upper = (until + datetime.timedelta(days=1)).isoformat() if until else None
+    return lower, upper
+
+
+def iter_pages(pool, columns=DEFAULT_COLUMNS, since=None, until=None, page_size=PAGE_SIZE):
+    """Yield lists of row tuples (in ``columns`` order), one page at a time."""
+    unknown = [c for c in columns if c not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"unknown export columns {unknown}; choose from {list(EXPORT_COLUMNS)}")
+    lower, upper = _date_bounds(since, until)
+    where, params = ["id > ?"], []
+    if lower:
+        where.append("timestamp >= ?")
+        params.append(lower)
+    if upper:
+        where.append("timestamp < ?")
+        params.append(upper)
+    sql = (f"SELECT id, {', '.join(EXPORT_COLUMNS[c] for c in columns)} FROM screenings "
+           f"WHERE {' AND '.join(where)} ORDER BY id LIMIT ?")
+    last_id = 0
+    while True:
+        with pool.connection() as conn:
+            rows = conn.execute(sql, [last_id, *params, page_size]).fetchall()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield [row[1:] for row in rows]
+        if len(rows) < page_size:
+            return
+
+
+def iter_csv(pool, columns=DEFAULT_COLUMNS, since=None, until=None, page_size=PAGE_SIZE):
+    """Yield the CSV export as text chunks: the header, then one chunk per page."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    for page in iter_pages(pool, columns, since, until, page_size):
+        writer.writerows(page)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def write_csv(pool, fh, **filters):
+    rows = 0
+    for chunk in iter_csv(pool, **filters):
+        fh.write(chunk)
+        rows += chunk.count("\n")
+    return max(rows - 1, 0)
+
+
+def write_parquet(pool, path_or_file, columns=DEFAULT_COLUMNS, since=None, until=None, page_size=PAGE_SIZE):
+    """Write a Parquet file with one row group per page; returns the row count."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)") from None
+    types = {"id": pa.int64(), "anon_id": pa.string(), "phq9": pa.int16(), "gad7": pa.int16(), "timestamp": pa.string()}
+    schema = pa.schema([(c, types[c]) for c in columns])
+    rows = 0
+    with pq.ParquetWriter(path_or_file, schema) as writer:
+        for page in iter_pages(pool, columns, since, until, page_size):
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(col, type=schema.field(i).type) for i, col in enumerate(zip(*page))], schema=schema))
+            rows += len(page)
+    return rows
+
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def main(argv=None):
+    import migrations
+    import storage
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("out", help="output path; '-' writes CSV to stdout")
+    parser.add_argument("--db", default="mental_platform.db")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="default: from the output extension")
+    parser.add_argument("--columns", nargs="+", default=DEFAULT_COLUMNS, choices=list(EXPORT_COLUMNS))
+    parser.add_argument("--since", type=datetime.date.fromisoformat, help="first day to include (YYYY-MM-DD)")
+    parser.add_argument("--until", type=datetime.date.fromisoformat, help="last day to include (YYYY-MM-DD)")
+    parser.add_argument("--last-days", type=int, help="shortcut for --since TODAY-N (for scheduled exports)")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    args = parser.parse_args(argv)
+    if args.last_days is not None:
+        args.since = datetime.datetime.utcnow().date() - datetime.timedelta(days=args.last_days)
+    fmt = args.format or ("parquet" if args.out.endswith(".parquet") else "csv")
+    filters = dict(columns=args.columns, since=args.since, until=args.until, page_size=args.page_size)
+
+    pool = storage.ConnectionPool(args.db, max_size=1)
+    with pool.connection() as conn:
+        migrations.migrate(conn)
+    if fmt == "parquet":
+        rows = write_parquet(pool, args.out, **filters)
+    elif args.out == "-":
+        rows = write_csv(pool, sys.stdout, **filters)
+    else:
+        with open(args.out, "w", newline="", encoding="utf-8") as fh:
+            rows = write_csv(pool, fh, **filters)
+    pool.close()
+    print(f"exported {rows:,} screenings", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
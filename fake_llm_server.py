@@ -0,0 +1,107 @@
+# fake_llm_server.py
+"""Local stand-in for an OpenAI-compatible chat-completions endpoint.
+
+Answers ``POST /v1/chat/completions`` with canned coping tips after an
+artificial delay (streamed word by word when the request sets
+``"stream": true``), and can be told to fail a fraction of requests, so the
+client's timeouts, retries, rate limiting and circuit breaker can be
+exercised without a real API key.
+
+    python fake_llm_server.py --port 8001 --latency 0.3 --fail-rate 0.1
+    OPENAI_API_KEY=fake OPENAI_BASE_URL=http://127.0.0.1:8001/v1 streamlit run app.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLIES = [
+    "That sounds really hard. Try breathing slowly: in for 4, hold for 2, out for 6. "
+    "If this keeps weighing on you, a counsellor can help — you can book one from the Booking page.",
+    "Exams can feel overwhelming. Break revision into 25-minute blocks with short breaks, "
+    "and be kind to yourself about what you can get done today.",
+    "Sleep troubles are common under stress. Keep screens away for the last half hour before bed "
+    "and try a short wind-down routine. If it lasts more than a couple of weeks, please talk to a counsellor.",
+]
+
+
+class FakeChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, body, headers=()):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in headers:
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, reply, model, token_delay):
+        # server-sent events over a chunked response, one word per event
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = reply.split(" ")
+        events = [{"id": "chatcmpl-fake", "object": "chat.completion.chunk", "model": model,
+                   "choices": [{"index": 0, "delta": {"content": w if i == 0 else " " + w}}]}
+                  for i, w in enumerate(words)]
+        for event in events:
+            self._write_chunk(f"data: {json.dumps(event)}\n\n".encode())
+            time.sleep(token_delay)
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            return self._send_json(404, {"error": {"message": "not found"}})
+        cfg = self.server.config
+        with self.server.lock:
+            self.server.requests += 1
+        time.sleep(cfg.latency * random.uniform(0.5, 1.5))
+        if random.random() < cfg.fail_rate:
+            return self._send_json(random.choice([429, 500, 503]), {"error": {"message": "simulated failure"}},
+                                   headers=[("Retry-After", "0.1")])
+        reply = random.choice(REPLIES)
+        if request.get("stream"):
+            return self._send_stream(reply, request.get("model", "fake"), cfg.token_delay)
+        self._send_json(200, {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+        })
+
+
+def make_server(host="127.0.0.1", port=8001, latency=0.3, fail_rate=0.0, token_delay=0.02):
+    server = ThreadingHTTPServer((host, port), FakeChatHandler)
+    server.config = argparse.Namespace(latency=latency, fail_rate=fail_rate, token_delay=token_delay)
+    server.lock = threading.Lock()
+    server.requests = 0
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.3, help="mean seconds before answering")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 429/5xx")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between streamed words")
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, args.latency, args.fail_rate, args.token_delay)
+    print(f"fake chat-completions server on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
@@ -0,0 +1,159 @@
+# forum.py
+"""Public peer-forum feed and moderation queue.
+
+The feed is read with keyset cursors: a page is the newest ``PAGE_SIZE``
+approved posts with ``id < before_id``, and its last id is the cursor for
+the next page, so "load more" costs the same however far back a reader
+scrolls. Pages are kept in a ``FeedCache`` shared by every session and
+dropped only when the feed changes, so feed views normally touch the
+database not at all. A moderator's approve/delete drops them at once in
+the moderator's process; other processes (more app workers, the API) see
+the ``posts`` data version move within ``DEFAULT_RECHECK`` seconds.
+
+The moderation queue is paged the same way, highest risk first. Moderators
+act on many posts at once with ``moderate``; each post carries a
+``version`` that every moderation action bumps, and an action only applies
+to posts still at the version the moderator was shown, so two moderators
+working the same page can't both process a post.
+"""
+import collections
+import threading
+import time
+
+import storage
+
+PAGE_SIZE = 30
+DEFAULT_MAX_PAGES = 256  # cached pages kept (LRU)
+DEFAULT_RECHECK = 1.0  # seconds between checks of the posts data version
+
+FIRST_PAGE_SQL = "SELECT id, anon_id, content, timestamp FROM posts WHERE approved=1 ORDER BY id DESC LIMIT ?"
+NEXT_PAGE_SQL = ("SELECT id, anon_id, content, timestamp FROM posts WHERE approved=1 AND id < ? "
+                 "ORDER BY id DESC LIMIT ?")
+
+QUEUE_PAGE_SIZE = 50
+_QUEUE_SELECT = ("SELECT id, version, anon_id, content, flagged, risk_score, risk_categories, timestamp "
+                 "FROM posts WHERE approved=0 ")
+_QUEUE_ORDER = " ORDER BY risk_score DESC, id DESC LIMIT ?"  # unscanned posts (NULL score) sort last
+QUEUE_FIRST_SQL = _QUEUE_SELECT + _QUEUE_ORDER
+QUEUE_AFTER_SCORED_SQL = (_QUEUE_SELECT + "AND (risk_score < ? OR (risk_score = ? AND id < ?) OR risk_score IS NULL)"
+                          + _QUEUE_ORDER)
+QUEUE_AFTER_UNSCANNED_SQL = _QUEUE_SELECT + "AND risk_score IS NULL AND id < ?" + _QUEUE_ORDER
+
+# each statement takes (id, version) and only touches a post nobody else has moderated since
+MODERATION_SQL = {
+    "approve": "UPDATE posts SET approved=1, version=version+1 WHERE id=? AND version=? AND approved=0",
+    "flag": "UPDATE posts SET flagged=1, version=version+1 WHERE id=? AND version=?",
+    "delete": "DELETE FROM posts WHERE id=? AND version=?",
+}
+FLAG_AUTHOR_SQL = "UPDATE posts SET flagged=1, version=version+1 WHERE anon_id=? AND approved=1"
+
+
+def fetch_page(conn, before_id=None, limit=PAGE_SIZE):
+    """``(rows, next_cursor)``; ``next_cursor`` is None on the last page."""
+    if before_id is None:
+        rows = conn.execute(FIRST_PAGE_SQL, (limit,)).fetchall()
+    else:
+        rows = conn.execute(NEXT_PAGE_SQL, (before_id, limit)).fetchall()
+    return rows, (rows[-1][0] if len(rows) == limit else None)
+
+
+def queue_page(conn, after=None, limit=QUEUE_PAGE_SIZE):
+    """One page of unapproved posts, highest risk first: ``(rows, next_cursor)``.
+
+    Rows are ``(id, version, anon_id, content, flagged, risk_score,
+    risk_categories, timestamp)``; the cursor is the ``(risk_score, id)`` of
+    the last row, or None on the last page.
+    """
+    if after is None:
+        rows = conn.execute(QUEUE_FIRST_SQL, (limit,)).fetchall()
+    elif after[0] is None:
+        rows = conn.execute(QUEUE_AFTER_UNSCANNED_SQL, (after[1], limit)).fetchall()
+    else:
+        rows = conn.execute(QUEUE_AFTER_SCORED_SQL, (after[0], after[0], after[1], limit)).fetchall()
+    return rows, ((rows[-1][5], rows[-1][0]) if len(rows) == limit else None)
+
+
+def moderate(pool, action, posts):
+    """Apply ``action`` to ``posts`` (``[(id, version), ...]``) in one transaction.
+
+    Returns ``(done, conflicts)`` lists of ids; a conflict is a post another
+    moderator approved, flagged or deleted after this one was shown it, and
+    is left as it is.
+    """
+    sql = MODERATION_SQL[action]
+    done, conflicts = [], []
+    with pool.transaction() as conn:
+        for id_, version in posts:
+            (done if conn.execute(sql, (id_, version)).rowcount else conflicts).append(id_)
+    return done, conflicts
+
+
+class FeedCache:
+    """Thread-safe cache of feed pages keyed by ``(before_id, page_size)``."""
+
+    def __init__(self, pool, page_size=PAGE_SIZE, max_pages=DEFAULT_MAX_PAGES, recheck=DEFAULT_RECHECK):
+        self.pool = pool
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.recheck = recheck
+        self._pages = collections.OrderedDict()
+        self._generation = 0  # bumped on every invalidation
+        self._version = None  # posts data version the cached pages were read at
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def _check_version(self):
+        # at most once per ``recheck``: picks up moderation done by other processes
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.recheck
+        with self.pool.connection() as conn:
+            version = storage.data_versions(conn, ("posts",))
+        if version != self._version:
+            self.invalidate()
+            self._version = version
+
+    def page(self, before_id=None):
+        self._check_version()
+        key = (before_id, self.page_size)
+        with self._lock:
+            cached = self._pages.get(key)
+            if cached is not None:
+                self._pages.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+            generation = self._generation
+        with self.pool.connection() as conn:
+            result = fetch_page(conn, before_id, self.page_size)
+        with self._lock:
+            # a moderator action that landed while we were reading makes this page stale; don't keep it
+            if generation == self._generation:
+                self._pages[key] = result
+                while len(self._pages) > self.max_pages:
+                    self._pages.popitem(last=False)
+        return result
+
+    def pages(self, count):
+        """The first ``count`` pages concatenated: ``(rows, next_cursor)``."""
+        rows, cursor = [], None
+        for _ in range(count):
+            page_rows, cursor = self.page(cursor)
+            rows.extend(page_rows)
+            if cursor is None:
+                break
+        return rows, cursor
+
+    def invalidate(self):
+        """Drop every cached page; call after posts are approved or deleted."""
+        with self._lock:
+            self._pages.clear()
+            self._generation += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"pages": len(self._pages), "hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / lookups if lookups else 0.0}
@@ -0,0 +1,185 @@
+# forum_scan.py
+"""Background risk triage for forum posts.
+
+New posts arrive unscanned (``scanned_at IS NULL``). A ``ForumScanner``
+thread picks them up in id-ordered chunks, runs the crisis/abuse detector
+over each chunk in a process pool and writes ``risk_score``,
+``risk_categories`` and ``flagged`` back with one ``executemany`` per chunk.
+The moderation queue sorts on ``risk_score`` so the most urgent posts come
+first however long the backlog is.
+
+    python forum_scan.py --db mental_platform.db --once
+"""
+import argparse
+import concurrent.futures
+import datetime
+import logging
+import multiprocessing
+import os
+import threading
+
+import crisis
+
+log = logging.getLogger(__name__)
+
+# score of a post = weight of its worst category, plus a little for every extra match
+CATEGORY_WEIGHTS = {
+    "self_harm": 1.0,
+    "abuse": 0.6,
+}
+EXTRA_MATCH_WEIGHT = 0.05
+FLAG_THRESHOLD = 0.5  # posts at or above this are flagged for moderators
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_INTERVAL = 5.0  # seconds between scans when nothing wakes the scanner
+MIN_PARALLEL_BATCH = 200  # below this, shipping work to the pool costs more than it saves
+WORKER_BATCH = 100  # posts per task sent to a pool worker
+
+UNSCANNED_SQL = "SELECT id, content FROM posts WHERE scanned_at IS NULL AND id > ? ORDER BY id LIMIT ?"
+PENDING_SQL = "SELECT count(*) FROM posts WHERE scanned_at IS NULL"
+UPDATE_SQL = ("UPDATE posts SET risk_score=?, risk_categories=?, flagged=max(flagged, ?), scanned_at=? "
+              "WHERE id=?")
+
+
+def risk_score(matches):
+    """0..1 score for a post's detector matches."""
+    weights = [CATEGORY_WEIGHTS.get(m.category, 0.0) for m in matches]
+    if not weights:
+        return 0.0
+    return min(max(weights) + EXTRA_MATCH_WEIGHT * (len(weights) - 1), 1.0)
+
+
+def score_texts(texts):
+    """``[(score, categories), ...]`` for a batch of post bodies; runs in pool workers."""
+    detector = crisis.get_detector()
+    results = []
+    for text in texts:
+        matches = detector.scan(text or "")
+        results.append((risk_score(matches), ",".join(sorted({m.category for m in matches}))))
+    return results
+
+
+def make_executor(workers=None):
+    # spawn, not fork: the Streamlit process has threads (pool, writer) that fork would copy mid-flight
+    return concurrent.futures.ProcessPoolExecutor(max_workers=workers or min(os.cpu_count() or 1, 4),
+                                                  mp_context=multiprocessing.get_context("spawn"))
+
+
+def scan_pending(pool, chunk_size=DEFAULT_CHUNK_SIZE, executor=None):
+    """Score every unscanned post; returns ``(scanned, flagged)`` counts."""
+    scanned = flagged = 0
+    last_id = 0
+    while True:
+        with pool.connection() as conn:
+            rows = conn.execute(UNSCANNED_SQL, (last_id, chunk_size)).fetchall()
+        if not rows:
+            break
+        texts = [content for _, content in rows]
+        if executor is not None and len(texts) >= MIN_PARALLEL_BATCH:
+            parts = [texts[i:i + WORKER_BATCH] for i in range(0, len(texts), WORKER_BATCH)]
+            results = [r for part in executor.map(score_texts, parts) for r in part]
+        else:
+            results = score_texts(texts)
+        now = datetime.datetime.utcnow().isoformat()
+        params = [(score, categories or None, int(score >= FLAG_THRESHOLD), now, id_)
+                  for (id_, _), (score, categories) in zip(rows, results)]
+        with pool.transaction() as conn:
+            conn.executemany(UPDATE_SQL, params)
+        scanned += len(rows)
+        flagged += sum(p[2] for p in params)
+        last_id = rows[-1][0]
+    return scanned, flagged
+
+
+class ForumScanner:
+    """Daemon thread that calls ``scan_pending`` every ``interval`` seconds or when woken."""
+
+    def __init__(self, pool, interval=DEFAULT_INTERVAL, chunk_size=DEFAULT_CHUNK_SIZE, workers=None):
+        self.pool = pool
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.scanned = self.flagged = 0
+        self._executor = None
+        self._parallel = True  # cleared if worker processes can't be started here
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="forum-scanner", daemon=True)
+        self._thread.start()
+
+    def wake(self):
+        """Scan now instead of waiting for the next interval (e.g. right after a post)."""
+        self._wake.set()
+
+    def stop(self, timeout=10.0):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+
+    def stats(self):
+        return {"scanned": self.scanned, "flagged": self.flagged, "running": self._thread.is_alive()}
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                scanned, flagged = scan_pending(self.pool, self.chunk_size, self._pool_for_backlog())
+                self.scanned += scanned
+                self.flagged += flagged
+            except concurrent.futures.process.BrokenProcessPool:
+                log.warning("forum scan worker pool died; scanning in-process from now on")
+                self._executor.shutdown(wait=False)
+                self._executor, self._parallel = None, False
+                continue
+            except Exception:
+                log.exception("forum scan failed; retrying in %.0fs", self.interval)
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def _pool_for_backlog(self):
+        # the process pool is only worth starting once there is a real backlog
+        if self._executor is None and self._parallel:
+            with self.pool.connection() as conn:
+                pending = conn.execute(PENDING_SQL).fetchone()[0]
+            if pending >= MIN_PARALLEL_BATCH:
+                self._executor = make_executor(self.workers)
+        return self._executor
+
+
+def main(argv=None):
+    import time
+
+    import migrations
+    import storage
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="mental_platform.db")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, help="process pool size (default: up to 4 CPUs)")
+    parser.add_argument("--once", action="store_true", help="scan the current backlog and exit")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    pool = storage.ConnectionPool(args.db, max_size=2)
+    with pool.connection() as conn:
+        migrations.migrate(conn)
+    if args.once:
+        start = time.perf_counter()
+        with make_executor(args.workers) as executor:
+            scanned, flagged = scan_pending(pool, args.chunk_size, executor)
+        elapsed = time.perf_counter() - start
+        log.info("scanned %d posts (%d flagged) in %.2fs", scanned, flagged, elapsed)
+    else:
+        scanner = ForumScanner(pool, args.interval, args.chunk_size, args.workers)
+        try:
+            while True:
+                time.sleep(60)
+                log.info("%s", scanner.stats())
+        except KeyboardInterrupt:
+            scanner.stop()
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# importer.py
+"""Bulk import of paper/offline PHQ-9 and GAD-7 screenings.
+
+Reads CSV or JSONL in chunks, so memory stays flat whatever the file size.
+Each chunk is validated, anonymized, scored in bulk and written with one
+``executemany`` in one transaction.
+
+CSV header: ``student_id,timestamp,phq9_1..phq9_9,gad7_1..gad7_7``
+(``student_id`` and ``timestamp`` may be empty or missing).
+JSONL: ``{"student_id": ..., "timestamp": ..., "phq9_answers": [9 ints], "gad7_answers": [7 ints]}``
+
+    python importer.py paper_drive.csv [--db mental_platform.db] [--chunk-size 5000]
+"""
+import argparse
+import csv
+import datetime
+import itertools
+import json
+import sys
+
+import scoring
+from privacy import anonymize_id, make_anon_tag
+
+PHQ9_COLUMNS = [f"phq9_{i}" for i in range(1, scoring.PHQ9_ITEMS + 1)]
+GAD7_COLUMNS = [f"gad7_{i}" for i in range(1, scoring.GAD7_ITEMS + 1)]
+DEFAULT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+
+INSERT_SQL = "INSERT INTO screenings (anon_id, phq9_score, gad7_score, meta, timestamp) VALUES (?, ?, ?, ?, ?)"
+
+
+def read_records(fh, fmt):
+    """Yield ``(line_no, record dict)`` from a text file handle."""
+    if fmt == "csv":
+        reader = csv.DictReader(fh)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == "jsonl":
+        for line_no, line in enumerate(fh, 1):
+            if line.strip():
+                try:
+                    yield line_no, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_no, {"_error": f"invalid JSON: {e.msg}"}
+    else:
+        raise ValueError(f"unsupported format {fmt!r}; expected 'csv' or 'jsonl'")
+
+
+def _is_int(v):
+    return isinstance(v, int) and not isinstance(v, bool)
+
+
+def _answers(record, list_key, columns):
+    values = record.get(list_key)
+    if values is None:  # one column per answer: text in CSV, numbers in JSONL
+        values = [record.get(c) for c in columns]
+        if any(v in (None, "") for v in values):
+            raise ValueError(f"expected {len(columns)} {list_key}")
+        values = [int(v) if isinstance(v, str) else v for v in values]
+    # same rule as the API: a string would be read one character per answer, a float silently truncated
+    if not isinstance(values, list) or not all(_is_int(v) for v in values):
+        raise ValueError(f"{list_key} must be a list of integers")
+    if len(values) != len(columns):
+        raise ValueError(f"expected {len(columns)} {list_key}")
+    if any(a < 0 or a > scoring.MAX_ANSWER for a in values):
+        raise ValueError(f"{list_key} must be between 0 and {scoring.MAX_ANSWER}")
+    return values
+
+
+def _text(record, key):
+    # JSONL may carry a number (an id like 12345); anything else that isn't text is a bad row
+    value = record.get(key)
+    if value is None:
+        return ""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = str(value)
+    if not isinstance(value, str):
+        raise ValueError(f"{key} must be a string")
+    return value.strip()
+
+
+def parse_record(record, now):
+    """``(anon_id, timestamp, phq9_answers, gad7_answers)``; raises ValueError on bad input."""
+    if not isinstance(record, dict):
+        raise ValueError("expected a JSON object")
+    if "_error" in record:
+        raise ValueError(record["_error"])
+    phq9 = _answers(record, "phq9_answers", PHQ9_COLUMNS)
+    gad7 = _answers(record, "gad7_answers", GAD7_COLUMNS)
+    raw_id = _text(record, "student_id")
+    ts = _text(record, "timestamp")
+    ts = datetime.datetime.fromisoformat(ts).isoformat() if ts else now
+    return (anonymize_id(raw_id) if raw_id else make_anon_tag()), ts, phq9, gad7
+
+
+def import_screenings(pool, fh, fmt="csv", chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """Import every valid row of ``fh``; returns a report dict.
+
+    ``progress(report)`` is called after each committed chunk. Invalid rows
+    are skipped and listed (up to ``MAX_REPORTED_ERRORS``) in ``report["errors"]``.
+    """
+    report = {"read": 0, "imported": 0, "rejected": 0, "errors": []}
+    now = datetime.datetime.utcnow().isoformat()
+    records = read_records(fh, fmt)
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            break
+        report["read"] += len(chunk)
+        parsed = []
+        for line_no, record in chunk:
+            try:
+                parsed.append(parse_record(record, now))
+            except (ValueError, TypeError) as e:
+                report["rejected"] += 1
+                if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                    report["errors"].append((line_no, str(e)))
+        if parsed:
+            phq9 = scoring.score_matrix([p[2] for p in parsed], scoring.PHQ9_ITEMS)
+            gad7 = scoring.score_matrix([p[3] for p in parsed], scoring.GAD7_ITEMS)
+            rows = [
+                (anon, p, g, json.dumps({"phq9_answers": pa, "gad7_answers": ga, "source": "import"}), ts)
+                for (anon, ts, pa, ga), p, g in zip(parsed, phq9.tolist(), gad7.tolist())
+            ]
+            with pool.transaction() as conn:
+                conn.executemany(INSERT_SQL, rows)
+            report["imported"] += len(rows)
+        if progress:
+            progress(report)
+    return report
+
+
+def main(argv=None):
+    import time
+
+    import migrations
+    import storage
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--db", default="mental_platform.db")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+    fmt = args.format or ("jsonl" if args.path.endswith((".jsonl", ".ndjson")) else "csv")
+
+    pool = storage.ConnectionPool(args.db, max_size=1)
+    with pool.connection() as conn:
+        migrations.migrate(conn)
+    start = time.perf_counter()
+
+    def progress(r):
+        print(f"\r{r['imported']:,} imported, {r['rejected']:,} rejected "
+              f"({r['read'] / (time.perf_counter() - start):,.0f} rows/s)", end="", file=sys.stderr)
+
+    with open(args.path, newline="", encoding="utf-8") as fh:
+        report = import_screenings(pool, fh, fmt, args.chunk_size, progress)
+    print(file=sys.stderr)
+    for line_no, err in report["errors"]:
+        print(f"line {line_no}: {err}", file=sys.stderr)
+    pool.close()
+    return 0 if report["imported"] or not report["read"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,352 @@
+# llm.py
+"""Chat-completions client for the first-aid chat.
+
+All sessions share one ``ChatClient``: a single ``httpx.AsyncClient``
+connection pool running on a background event loop, with per-request
+timeouts, jittered exponential backoff, a token-bucket rate limit, a cap on
+in-flight requests and a circuit breaker. When the upstream is degraded the
+client fails fast with ``UpstreamUnavailable`` and the caller falls back to
+the rule-based responder.
+
+Point ``OPENAI_BASE_URL`` at ``fake_llm_server.py`` to exercise it locally.
+"""
+import asyncio
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+import httpx
+
+import metrics
+
+DEFAULT_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")  # replace with available model in your account
+SYSTEM_PROMPT = ("You are a supportive mental health first-aid assistant. Provide coping tips and encourage "
+                 "professional help when needed. Don't provide medical or legal advice.")
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class UpstreamUnavailable(RuntimeError):
+    """The upstream failed, timed out or the circuit breaker is open."""
+
+
+class TokenBucket:
+    """Allows ``rate`` requests per second on average, bursts of up to ``capacity``."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures; after ``reset_timeout``
+    seconds lets a single trial request through (half-open) before closing again."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial_in_flight or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+    def record_abandoned(self):
+        # a request cancelled (or broken) before its outcome was recorded; if it was the
+        # half-open trial, count it as failed so the breaker doesn't wait on it forever
+        if self._trial_in_flight:
+            self.record_failure()
+
+
+class ChatClient:
+    """Async chat-completions client. Create it on the loop that will use it."""
+
+    def __init__(self, api_key, base_url=DEFAULT_BASE_URL, model=DEFAULT_MODEL, timeout=20.0,
+                 max_retries=3, backoff_base=0.5, backoff_max=8.0, rate=5.0, burst=10,
+                 max_concurrency=16, breaker=None):
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = breaker or CircuitBreaker()
+        self._in_flight = asyncio.Semaphore(max_concurrency)
+        self._http = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=httpx.Timeout(timeout, connect=5.0),
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        )
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        # "full jitter": uniform over [0, base * 2^attempt]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _post(self, payload, stream=False):
+        """POST with retries; returns the successful ``httpx.Response``.
+
+        With ``stream=True`` the body is left unread, so only connecting and
+        the response status are retried — never a half-delivered stream.
+        """
+        if not self.breaker.allow():
+            raise UpstreamUnavailable("circuit breaker is open")
+        try:
+            return await self._send(payload, stream)
+        except BaseException:
+            self.breaker.record_abandoned()  # no-op unless the outcome went unrecorded (e.g. cancelled)
+            raise
+
+    async def _send(self, payload, stream):
+        async with self._in_flight:
+            last_error = None
+            for attempt in range(self.max_retries + 1):
+                await self.bucket.acquire()
+                retry_after = None
+                try:
+                    request = self._http.build_request("POST", "/chat/completions", json=payload)
+                    resp = await self._http.send(request, stream=stream)
+                except httpx.HTTPError as e:
+                    last_error = e
+                else:
+                    if resp.status_code < 400:
+                        self.breaker.record_success()
+                        return resp
+                    if stream:
+                        await resp.aread()
+                        await resp.aclose()
+                    if resp.status_code not in RETRYABLE_STATUS:
+                        # our request is wrong, not the upstream degraded
+                        self.breaker.record_success()
+                        resp.raise_for_status()
+                    last_error = httpx.HTTPStatusError(f"upstream returned {resp.status_code}",
+                                                       request=resp.request, response=resp)
+                    try:
+                        retry_after = float(resp.headers.get("retry-after", ""))
+                    except ValueError:
+                        pass
+                self.breaker.record_failure()
+                if attempt == self.max_retries or not self.breaker.allow():
+                    break
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+            raise UpstreamUnavailable(f"chat completion failed after {attempt + 1} attempt(s): {last_error!r}")
+
+    def _payload(self, prompt, **params):
+        return {
+            "model": self.model,
+            "messages": [{"role": "system", "content": SYSTEM_PROMPT},
+                         {"role": "user", "content": prompt}],
+            "temperature": params.get("temperature", 0.7),
+            "max_tokens": params.get("max_tokens", 400),
+        }
+
+    async def complete(self, prompt, **params):
+        started = time.perf_counter()
+        try:
+            resp = await self._post(self._payload(prompt, **params))
+        except Exception:
+            metrics.LLM_ERRORS.labels("complete").inc()
+            raise
+        finally:
+            metrics.LLM_CALL.labels("complete").observe(time.perf_counter() - started)
+        return resp.json()["choices"][0]["message"]["content"].strip()
+
+    async def stream(self, prompt, **params):
+        """Yield the completion text piece by piece as the upstream generates it."""
+        started = time.perf_counter()
+        try:
+            resp = await self._post({**self._payload(prompt, **params), "stream": True}, stream=True)
+        except Exception:
+            metrics.LLM_ERRORS.labels("stream").inc()
+            raise
+        first = True
+        try:
+            async for line in resp.aiter_lines():
+                # server-sent events: "data: {json}" per chunk, then "data: [DONE]"
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or [{}]
+                piece = (choices[0].get("delta") or {}).get("content")
+                if piece:
+                    if first:
+                        metrics.LLM_FIRST_TOKEN.observe(time.perf_counter() - started)
+                        first = False
+                    yield piece
+        finally:
+            metrics.LLM_CALL.labels("stream").observe(time.perf_counter() - started)
+            await resp.aclose()
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+class ChatStream:
+    """Blocking iterator over a streamed completion, with timing.
+
+    ``ttft`` (time to first token) and ``elapsed`` are in seconds, measured
+    from when the request was issued; ``text`` is everything received so far.
+    Once it has ended (or raised), further ``next()`` calls just stop.
+    """
+
+    _DONE = object()
+
+    def __init__(self, service, prompt, params):
+        self.text = ""
+        self.ttft = None
+        self.elapsed = None
+        self._finished = False
+        self._service = service
+        self._chunks = queue.Queue()
+        self._started = time.perf_counter()
+        self._future = asyncio.run_coroutine_threadsafe(self._pump(prompt, params), service._loop)
+
+    async def _pump(self, prompt, params):
+        try:
+            async for piece in self._service.client.stream(prompt, **params):
+                self._chunks.put(piece)
+        except BaseException as e:
+            self._chunks.put(e)
+            raise
+        finally:
+            self._chunks.put(self._DONE)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._finished:
+            raise StopIteration
+        try:
+            item = self._chunks.get(timeout=self._service.client.timeout)
+        except queue.Empty:
+            self._finished = True
+            self.close()
+            raise UpstreamUnavailable("chat stream stalled") from None
+        if item is self._DONE:
+            self._finished = True
+            self.elapsed = time.perf_counter() - self._started
+            self._service._record(self)
+            raise StopIteration
+        if isinstance(item, BaseException):
+            self._finished = True
+            self._chunks.get()  # the _DONE marker that follows every error
+            raise item
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self._started
+        self.text += item
+        return item
+
+    def close(self):
+        self._future.cancel()
+
+
+class ChatService:
+    """Blocking facade over ``ChatClient`` for the Streamlit script thread.
+
+    Owns a daemon thread running the event loop that the shared client (and
+    its connection pool) lives on.
+    """
+
+    def __init__(self, api_key, **client_kwargs):
+        self.streams = 0
+        self.last_ttft = None
+        self.total_ttft = 0.0
+        self._stats_lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-loop", daemon=True)
+        self._thread.start()
+        self.client = self._run(self._make_client(api_key, client_kwargs))
+
+    @staticmethod
+    async def _make_client(api_key, client_kwargs):
+        return ChatClient(api_key, **client_kwargs)
+
+    def _run(self, coro, timeout=None):
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def complete(self, prompt, **params):
+        """Completion text; raises ``UpstreamUnavailable`` if the upstream is down or too slow."""
+        # retries + backoff can outlast one request timeout; bound the whole call too
+        deadline = self.client.timeout * (self.client.max_retries + 1) + self.client.backoff_max
+        try:
+            return self._run(self.client.complete(prompt, **params), timeout=deadline)
+        except TimeoutError as e:
+            raise UpstreamUnavailable("chat completion timed out") from e
+
+    def stream(self, prompt, **params):
+        """Start a streamed completion; iterate the returned ``ChatStream`` for text pieces."""
+        return ChatStream(self, prompt, params)
+
+    def _record(self, stream):
+        if stream.ttft is None:
+            return
+        with self._stats_lock:
+            self.streams += 1
+            self.last_ttft = stream.ttft
+            self.total_ttft += stream.ttft
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "streams": self.streams,
+                "last_ttft": self.last_ttft,
+                "mean_ttft": self.total_ttft / self.streams if self.streams else None,
+                "breaker": self.client.breaker.state,
+            }
+
+    def close(self):
+        self._run(self.client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
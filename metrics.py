@@ -0,0 +1,326 @@
+# metrics.py
+"""In-process timing histograms and counters, in Prometheus text format.
+
+    with metrics.timer(PAGE_RENDER.labels("Booking")):
+        page_booking()
+
+    @metrics.timed(CHAT_FALLBACK)
+    def rule_based_response(...): ...
+
+Every observation goes to a shard owned by the recording thread (a plain
+list of bucket counts), so recording never takes a lock and threads never
+contend. Shards are summed only when ``exposition()`` renders the metrics;
+a reader may see a count one observation behind, never a torn one. When a
+thread ends (Streamlit runs each rerun on a fresh thread), its shard is
+folded into the metric's totals so nothing is lost and nothing piles up.
+
+Database time is recorded by ``storage``'s connections through
+``observe_query``. Statements slower than ``SLOW_QUERY_SECONDS`` are logged
+with their SQL and kept in ``SLOW_QUERIES`` for the admin page.
+
+Each process exposes its own numbers: the API at ``GET /metrics``, the
+Streamlit app on ``METRICS_PORT`` when that is set (``serve``).
+"""
+import bisect
+import collections
+import contextlib
+import datetime
+import functools
+import http.server
+import logging
+import os
+import re
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", "0.1"))
+SLOW_QUERY_LOG_SIZE = 100
+MAX_QUERY_LABELS = 1024  # distinct SQL strings remembered; the SQL is all constants, so this is never reached
+
+SLOW_QUERIES = collections.deque(maxlen=SLOW_QUERY_LOG_SIZE)  # (at, seconds, sql), newest last
+
+_bisect = bisect.bisect_left
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class _ShardHandle:
+    # lives in the owning thread's threading.local; dies with the thread
+    __slots__ = ("values", "owner")
+
+    def __init__(self, owner, size):
+        self.values = [0] * size
+        self.owner = owner
+
+    def __del__(self):
+        self.owner._retire(self)
+
+
+class _Shards:
+    """Per-thread lists of numbers, summed on read."""
+
+    def __init__(self, size):
+        self.size = size
+        self.local = threading.local()
+        self._live = {}  # id(handle) -> values; the handle itself is owned by its thread only
+        self._retired = [0] * size
+        self._lock = threading.RLock()  # a shard can be retired by the GC while a reader holds it
+
+    def mine(self):
+        """This thread's shard (kept as ``local.values`` for the recorders' fast path)."""
+        local = self.local
+        try:
+            return local.values
+        except AttributeError:
+            handle = local.handle = _ShardHandle(self, self.size)
+            with self._lock:
+                self._live[id(handle)] = local.values = handle.values
+            return handle.values
+
+    def _retire(self, handle):
+        with self._lock:
+            del self._live[id(handle)]
+            self._retired = [a + b for a, b in zip(self._retired, handle.values)]
+
+    def total(self):
+        with self._lock:
+            shards = list(self._live.values())
+            totals = list(self._retired)
+        for values in shards:
+            for i, v in enumerate(values):
+                totals[i] += v
+        return totals
+
+
+class Histogram:
+    # shard layout: one count per bucket, then +Inf, then the sum of observed values
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self._shards = _Shards(len(buckets) + 2)
+        self._local = self._shards.local
+
+    def observe(self, value):
+        try:
+            values = self._local.values
+        except AttributeError:
+            values = self._shards.mine()
+        values[_bisect(self.buckets, value)] += 1
+        values[-1] += value
+
+    def snapshot(self):
+        """``(cumulative bucket counts incl. +Inf, count, sum)``."""
+        *counts, total = self._shards.total()
+        cumulative, running = [], 0
+        for n in counts:
+            running += n
+            cumulative.append(running)
+        return cumulative, running, total
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile; None before any observation."""
+        cumulative, count, _ = self.snapshot()
+        if not count:
+            return None
+        i = bisect.bisect_left(cumulative, q * count)
+        return self.buckets[i] if i < len(self.buckets) else float("inf")
+
+
+class Counter:
+    def __init__(self):
+        self._shards = _Shards(1)
+        self._local = self._shards.local
+
+    def inc(self, amount=1):
+        try:
+            values = self._local.values
+        except AttributeError:
+            values = self._shards.mine()
+        values[0] += amount
+
+    def value(self):
+        return self._shards.total()[0]
+
+
+class Family:
+    """A named metric and its children, one per label combination."""
+
+    def __init__(self, kind, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name} takes labels {self.label_names}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(
+                    values, Histogram(self.buckets) if self.kind == "histogram" else Counter())
+        return child
+
+    # unlabelled families record straight through
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def children(self):
+        with self._lock:
+            return sorted(self._children.items())
+
+
+def _register(family):
+    with _registry_lock:
+        if family.name in _registry:
+            raise ValueError(f"metric {family.name} is already registered")
+        _registry[family.name] = family
+    return family
+
+
+def histogram(name, help, labels=(), buckets=DEFAULT_BUCKETS):
+    return _register(Family("histogram", name, help, labels, buckets))
+
+
+def counter(name, help, labels=()):
+    return _register(Family("counter", name, help, labels))
+
+
+@contextlib.contextmanager
+def timer(metric):
+    """Observe the block's wall-clock time in ``metric`` (a histogram child or unlabelled family)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metric.observe(time.perf_counter() - start)
+
+
+def timed(metric):
+    """Decorator form of ``timer``."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                metric.observe(time.perf_counter() - start)
+        return inner
+    return wrap
+
+
+# ---------- the platform's metrics ----------
+DB_QUERY = histogram("db_query_seconds", "SQLite statement execution time", ["statement"])
+DB_SLOW_QUERIES = counter("db_slow_queries_total", "Statements slower than SLOW_QUERY_SECONDS", ["statement"])
+DB_WRITE_BATCH = histogram("db_write_batch_seconds", "WriteQueue group commit time")
+LLM_CALL = histogram("llm_call_seconds", "Chat completion time (streams: to the last piece)", ["kind"])
+LLM_FIRST_TOKEN = histogram("llm_first_token_seconds", "Streamed chat completion time to first piece")
+LLM_ERRORS = counter("llm_errors_total", "Chat completions that failed after retries", ["kind"])
+CHAT_FALLBACK = histogram("chat_fallback_seconds", "rule_based_response time")
+CRISIS_ESCALATIONS = counter("crisis_escalations_total", "Helpline escalations shown", ["source"])
+PAGE_RENDER = histogram("page_render_seconds", "Streamlit page render time", ["page"])
+HTTP_REQUEST = histogram("http_request_seconds", "API request time", ["route", "status"])
+
+
+_VERB_RE = re.compile(r"\s*(\w+)")
+_TABLE_RE = re.compile(r"\b(?:FROM|INTO|JOIN|UPDATE|TABLE|INDEX|TRIGGER)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?(\w+)", re.I)
+_query_children = {}
+
+
+def statement_label(sql):
+    """``"SELECT posts"``-style label: the statement's verb and first table."""
+    verb = _VERB_RE.match(sql)
+    if not verb:
+        return "other"
+    verb = verb.group(1).upper()
+    table = _TABLE_RE.search(sql) if verb != "PRAGMA" else None
+    return f"{verb} {table.group(1)}" if table else verb
+
+
+def observe_query(sql, seconds):
+    try:
+        histogram, slow = _query_children[sql]
+    except KeyError:
+        label = statement_label(sql)
+        histogram, slow = DB_QUERY.labels(label), DB_SLOW_QUERIES.labels(label)
+        if len(_query_children) < MAX_QUERY_LABELS:
+            _query_children[sql] = histogram, slow
+    histogram.observe(seconds)
+    if seconds >= SLOW_QUERY_SECONDS:
+        slow.inc()
+        SLOW_QUERIES.append((datetime.datetime.utcnow().isoformat(timespec="seconds"), seconds, sql))
+        log.warning("slow query (%.0f ms): %s", seconds * 1000, " ".join(sql.split()))
+
+
+# ---------- exposition ----------
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{k}="{_escape(v)}"' for k, v in (*zip(names, values), *extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def families():
+    with _registry_lock:
+        return sorted(_registry.values(), key=lambda f: f.name)
+
+
+def observations():
+    """Histogram observations plus counter increments recorded so far, over every metric."""
+    return sum(child.snapshot()[1] if family.kind == "histogram" else child.value()
+               for family in families() for _, child in family.children())
+
+
+def exposition():
+    """Every registered metric in the Prometheus text format (version 0.0.4)."""
+    lines = []
+    for family in families():
+        lines.append(f"# HELP {family.name} {family.help}")
+        lines.append(f"# TYPE {family.name} {family.kind}")
+        for values, child in family.children():
+            if family.kind == "counter":
+                lines.append(f"{family.name}{_labels(family.label_names, values)} {child.value()}")
+                continue
+            cumulative, count, total = child.snapshot()
+            for le, n in zip((*(repr(b) for b in family.buckets), "+Inf"), cumulative):
+                lines.append(f"{family.name}_bucket{_labels(family.label_names, values, [('le', le)])} {n}")
+            lines.append(f"{family.name}_sum{_labels(family.label_names, values)} {total!r}")
+            lines.append(f"{family.name}_count{_labels(family.label_names, values)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = exposition().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes every few seconds would drown the app's log
+
+
+def serve(port, host="0.0.0.0"):
+    """Serve ``GET /metrics`` on a daemon thread; returns the server (``.shutdown()`` to stop)."""
+    server = http.server.ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
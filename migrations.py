@@ -0,0 +1,513 @@
+# migrations.py
+"""Versioned schema migrations for the platform database.
+
+Each migration is ``(version, description, statements)`` and is applied at
+most once, in order, inside its own transaction; the applied versions are
+recorded in ``schema_version``. Never edit a migration that has shipped —
+append a new one instead.
+
+    python migrations.py [DB_PATH] [--check-plans]
+"""
+import datetime
+import sys
+
+# Starter catalog: the original samples plus what the Resources page used to hard-code.
+SAMPLE_RESOURCES = [
+    ("Understanding Anxiety (Guide)", "article", "English", "https://example.edu/anxiety.html", None,
+     "A simple guide to anxiety and coping."),
+    ("PHQ-9 Explained (Video)", "video", "Hindi", "https://example.edu/phq9_hi.mp4", None,
+     "Short video on PHQ-9 meaning (regional language)"),
+    ("Relaxation Audio (10 min)", "audio", "Tamil", "https://example.edu/relax_ta.mp3", None,
+     "A 10-minute guided relaxation"),
+    ("On-campus Counsellors", "article", "English", "", None, "List of counsellors and timings"),
+    ("Guided Meditation Video", "video", "English", "https://www.youtube.com/watch?v=1vx8iUvfyCY", None,
+     "A short guided meditation to slow down and breathe."),
+    ("Relaxing Audio", "audio", "English", "https://www.soundhelix.com/examples/mp3/SoundHelix-Song-1.mp3", None,
+     "Calm background music for a study break."),
+    ("Wellness Guide", "article", "English", "", "wellness_guide.txt",
+     "Self-care means taking the time to do things that help you live well and improve both your physical "
+     "health and mental health. This can help you manage stress, lower your risk of illness, and increase "
+     "your energy. Even small acts of self-care in your daily life can have a big impact."),
+]
+
+
+def _seed_resources(conn):
+    # by title, so databases seeded before this migration only gain what they're missing
+    conn.executemany(
+        "INSERT INTO resources (title, type, language, url, path, description) SELECT ?, ?, ?, ?, ?, ? "
+        "WHERE NOT EXISTS (SELECT 1 FROM resources WHERE title = ?)",
+        [(*r, r[0]) for r in SAMPLE_RESOURCES])
+
+
+def _version_trigger(table, event, when=""):
+    # one bump per written row; readers compare counters, so the amount doesn't matter, only that it moved
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.split()[0].lower()} AFTER {event} ON {table} {when}
+        BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE name = '{table}';
+        END
+        """
+
+
+# tables whose cached reads (storage.VersionedCache) are invalidated by any write
+VERSIONED_TABLES = ("screenings", "bookings", "slots", "counsellors", "resources", "resource_events")
+
+
+MIGRATIONS = [
+    (1, "base tables", [
+        """
+        CREATE TABLE IF NOT EXISTS screenings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            anon_id TEXT,
+            phq9_score INTEGER,
+            gad7_score INTEGER,
+            meta JSON,
+            timestamp TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS bookings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            anon_id TEXT,
+            preferred_date TEXT,
+            preferred_time TEXT,
+            notes TEXT,
+            contact_encrypted TEXT,
+            status TEXT,
+            timestamp TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS resources (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT,
+            type TEXT,
+            language TEXT,
+            url TEXT,
+            description TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS posts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            anon_id TEXT,
+            content TEXT,
+            flagged INTEGER DEFAULT 0,
+            approved INTEGER DEFAULT 0,
+            timestamp TEXT
+        )
+        """,
+    ]),
+    (2, "indexes for feed, moderation queue, flagging, booking counts and daily screening stats", [
+        # public feed (approved=1) and moderation queue (approved=0), newest first
+        "CREATE INDEX IF NOT EXISTS idx_posts_approved_id ON posts (approved, id)",
+        # 'flag a post by anon id'
+        "CREATE INDEX IF NOT EXISTS idx_posts_anon_id ON posts (anon_id, approved)",
+        # covering index for 'GROUP BY status'
+        "CREATE INDEX IF NOT EXISTS idx_bookings_status ON bookings (status)",
+        # covering index for per-day score aggregation and date-range filters
+        "CREATE INDEX IF NOT EXISTS idx_screenings_timestamp ON screenings (timestamp, phq9_score, gad7_score)",
+    ]),
+    (3, "per-day screening rollup maintained by triggers", [
+        """
+        CREATE TABLE IF NOT EXISTS screening_daily_rollup (
+            day TEXT PRIMARY KEY,
+            n INTEGER NOT NULL DEFAULT 0,
+            phq9_sum INTEGER NOT NULL DEFAULT 0,
+            gad7_sum INTEGER NOT NULL DEFAULT 0,
+            phq9_none_mild INTEGER NOT NULL DEFAULT 0,
+            phq9_moderate INTEGER NOT NULL DEFAULT 0,
+            phq9_moderately_severe INTEGER NOT NULL DEFAULT 0,
+            phq9_severe INTEGER NOT NULL DEFAULT 0,
+            gad7_none_mild INTEGER NOT NULL DEFAULT 0,
+            gad7_moderate INTEGER NOT NULL DEFAULT 0,
+            gad7_severe INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        # backfill from existing screenings
+        """
+        INSERT OR REPLACE INTO screening_daily_rollup
+        SELECT substr(timestamp, 1, 10), count(*), sum(phq9_score), sum(gad7_score),
+               sum(phq9_score < 10), sum(phq9_score >= 10 AND phq9_score < 15),
+               sum(phq9_score >= 15 AND phq9_score < 20), sum(phq9_score >= 20),
+               sum(gad7_score < 10), sum(gad7_score >= 10 AND gad7_score < 15), sum(gad7_score >= 15)
+        FROM screenings GROUP BY substr(timestamp, 1, 10)
+        """,
+        # the insert and its rollup update commit (or roll back) together
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_screenings_rollup_insert AFTER INSERT ON screenings
+        BEGIN
+            INSERT INTO screening_daily_rollup VALUES (
+                substr(NEW.timestamp, 1, 10), 1, NEW.phq9_score, NEW.gad7_score,
+                NEW.phq9_score < 10, NEW.phq9_score >= 10 AND NEW.phq9_score < 15,
+                NEW.phq9_score >= 15 AND NEW.phq9_score < 20, NEW.phq9_score >= 20,
+                NEW.gad7_score < 10, NEW.gad7_score >= 10 AND NEW.gad7_score < 15, NEW.gad7_score >= 15)
+            ON CONFLICT (day) DO UPDATE SET
+                n = n + 1,
+                phq9_sum = phq9_sum + excluded.phq9_sum,
+                gad7_sum = gad7_sum + excluded.gad7_sum,
+                phq9_none_mild = phq9_none_mild + excluded.phq9_none_mild,
+                phq9_moderate = phq9_moderate + excluded.phq9_moderate,
+                phq9_moderately_severe = phq9_moderately_severe + excluded.phq9_moderately_severe,
+                phq9_severe = phq9_severe + excluded.phq9_severe,
+                gad7_none_mild = gad7_none_mild + excluded.gad7_none_mild,
+                gad7_moderate = gad7_moderate + excluded.gad7_moderate,
+                gad7_severe = gad7_severe + excluded.gad7_severe;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_screenings_rollup_delete AFTER DELETE ON screenings
+        BEGIN
+            UPDATE screening_daily_rollup SET
+                n = n - 1,
+                phq9_sum = phq9_sum - OLD.phq9_score,
+                gad7_sum = gad7_sum - OLD.gad7_score,
+                phq9_none_mild = phq9_none_mild - (OLD.phq9_score < 10),
+                phq9_moderate = phq9_moderate - (OLD.phq9_score >= 10 AND OLD.phq9_score < 15),
+                phq9_moderately_severe = phq9_moderately_severe - (OLD.phq9_score >= 15 AND OLD.phq9_score < 20),
+                phq9_severe = phq9_severe - (OLD.phq9_score >= 20),
+                gad7_none_mild = gad7_none_mild - (OLD.gad7_score < 10),
+                gad7_moderate = gad7_moderate - (OLD.gad7_score >= 10 AND OLD.gad7_score < 15),
+                gad7_severe = gad7_severe - (OLD.gad7_score >= 15)
+            WHERE day = substr(OLD.timestamp, 1, 10);
+        END
+        """,
+    ]),
+    (4, "persistent first-aid chat response cache", [
+        """
+        CREATE TABLE IF NOT EXISTS chat_cache (
+            key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            latency REAL NOT NULL DEFAULT 0
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_chat_cache_created_at ON chat_cache (created_at)",
+    ]),
+    (5, "forum post risk triage", [
+        "ALTER TABLE posts ADD COLUMN risk_score REAL",
+        "ALTER TABLE posts ADD COLUMN risk_categories TEXT",
+        "ALTER TABLE posts ADD COLUMN scanned_at TEXT",
+        # the scanner's work list; stays tiny because scanned posts drop out of it
+        "CREATE INDEX IF NOT EXISTS idx_posts_unscanned ON posts (id) WHERE scanned_at IS NULL",
+        # moderation queue, highest risk first
+        "CREATE INDEX IF NOT EXISTS idx_posts_queue ON posts (approved, risk_score DESC, id DESC)",
+    ]),
+    (6, "optimistic concurrency for moderation actions", [
+        # bumped by every approve/flag/delete; the risk scanner leaves it alone
+        "ALTER TABLE posts ADD COLUMN version INTEGER NOT NULL DEFAULT 0",
+    ]),
+    (7, "full-text search over posts and resources", [
+        # external-content indexes: the text lives only in posts/resources, FTS5 keeps the inverted index
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+            content, content='posts', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        """,
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS resources_fts USING fts5(
+            title, description, content='resources', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        """,
+        "INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')",
+        "INSERT INTO resources_fts (resources_fts) VALUES ('rebuild')",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_posts_fts_insert AFTER INSERT ON posts
+        BEGIN
+            INSERT INTO posts_fts (rowid, content) VALUES (NEW.id, NEW.content);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_posts_fts_delete AFTER DELETE ON posts
+        BEGIN
+            INSERT INTO posts_fts (posts_fts, rowid, content) VALUES ('delete', OLD.id, OLD.content);
+        END
+        """,
+        # approve/flag/risk-scan updates don't touch content and skip this trigger
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_posts_fts_update AFTER UPDATE OF content ON posts
+        BEGIN
+            INSERT INTO posts_fts (posts_fts, rowid, content) VALUES ('delete', OLD.id, OLD.content);
+            INSERT INTO posts_fts (rowid, content) VALUES (NEW.id, NEW.content);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_resources_fts_insert AFTER INSERT ON resources
+        BEGIN
+            INSERT INTO resources_fts (rowid, title, description) VALUES (NEW.id, NEW.title, NEW.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_resources_fts_delete AFTER DELETE ON resources
+        BEGIN
+            INSERT INTO resources_fts (resources_fts, rowid, title, description)
+            VALUES ('delete', OLD.id, OLD.title, OLD.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_resources_fts_update AFTER UPDATE OF title, description ON resources
+        BEGIN
+            INSERT INTO resources_fts (resources_fts, rowid, title, description)
+            VALUES ('delete', OLD.id, OLD.title, OLD.description);
+            INSERT INTO resources_fts (rowid, title, description) VALUES (NEW.id, NEW.title, NEW.description);
+        END
+        """,
+    ]),
+    (8, "resource files and starter catalog", [
+        "ALTER TABLE resources ADD COLUMN path TEXT",  # relative to catalog.RESOURCE_DIR
+        _seed_resources,
+    ]),
+    (9, "resource engagement log and per-day rollup", [
+        """
+        CREATE TABLE IF NOT EXISTS resource_events (
+            id INTEGER PRIMARY KEY,
+            resource_id INTEGER NOT NULL,
+            event TEXT NOT NULL,
+            timestamp TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS resource_daily_stats (
+            day TEXT NOT NULL,
+            resource_id INTEGER NOT NULL,
+            event TEXT NOT NULL,
+            n INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, resource_id, event)
+        ) WITHOUT ROWID
+        """,
+        # events are append-only, so only inserts need folding into the rollup
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_resource_events_rollup AFTER INSERT ON resource_events
+        BEGIN
+            INSERT INTO resource_daily_stats VALUES (substr(NEW.timestamp, 1, 10), NEW.resource_id, NEW.event, 1)
+            ON CONFLICT (day, resource_id, event) DO UPDATE SET n = n + 1;
+        END
+        """,
+    ]),
+    (10, "index for the counsellor's day list", [
+        "CREATE INDEX IF NOT EXISTS idx_bookings_date ON bookings (preferred_date, preferred_time)",
+    ]),
+    (11, "counsellors, bookable slots and the allocation backlog", [
+        """
+        CREATE TABLE IF NOT EXISTS counsellors (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            active INTEGER NOT NULL DEFAULT 1
+        )
+        """,
+        # booking_id is NULL while the slot is free
+        """
+        CREATE TABLE IF NOT EXISTS slots (
+            id INTEGER PRIMARY KEY,
+            counsellor_id INTEGER NOT NULL REFERENCES counsellors (id),
+            starts_at TEXT NOT NULL,
+            ends_at TEXT NOT NULL,
+            booking_id INTEGER,
+            UNIQUE (counsellor_id, starts_at)
+        )
+        """,
+        # a booking never holds two slots
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_slots_booking ON slots (booking_id) WHERE booking_id IS NOT NULL",
+        # availability by time window; the (counsellor_id, starts_at) key serves overlap checks
+        "CREATE INDEX IF NOT EXISTS idx_slots_free ON slots (starts_at) WHERE booking_id IS NULL",
+        "ALTER TABLE bookings ADD COLUMN slot_id INTEGER",
+        "ALTER TABLE bookings ADD COLUMN counsellor_id INTEGER",
+        "CREATE INDEX IF NOT EXISTS idx_bookings_backlog ON bookings (status, slot_id)",
+        # latest screening per student, for allocation priority
+        "CREATE INDEX IF NOT EXISTS idx_screenings_anon ON screenings (anon_id, timestamp)",
+    ]),
+    (12, "booking status workflow: transition log and incremental status counts", [
+        "ALTER TABLE bookings ADD COLUMN status_changed_at TEXT",
+        """
+        CREATE TABLE IF NOT EXISTS booking_transitions (
+            id INTEGER PRIMARY KEY,
+            booking_id INTEGER NOT NULL,
+            from_status TEXT,
+            to_status TEXT NOT NULL,
+            at TEXT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_booking_transitions_booking ON booking_transitions (booking_id, id)",
+        """
+        CREATE TABLE IF NOT EXISTS booking_status_counts (
+            status TEXT PRIMARY KEY,
+            n INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """,
+        # backfill from existing bookings
+        """
+        INSERT OR REPLACE INTO booking_status_counts
+        SELECT status, count(*) FROM bookings WHERE status IS NOT NULL GROUP BY status
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_bookings_status_insert AFTER INSERT ON bookings WHEN NEW.status IS NOT NULL
+        BEGIN
+            INSERT INTO booking_status_counts VALUES (NEW.status, 1) ON CONFLICT (status) DO UPDATE SET n = n + 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_bookings_status_delete AFTER DELETE ON bookings WHEN OLD.status IS NOT NULL
+        BEGIN
+            UPDATE booking_status_counts SET n = n - 1 WHERE status = OLD.status;
+        END
+        """,
+        # every status change is counted and logged in the same transaction as the change itself
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_bookings_status_update AFTER UPDATE OF status ON bookings
+        WHEN OLD.status IS NOT NEW.status
+        BEGIN
+            UPDATE booking_status_counts SET n = n - 1 WHERE status = OLD.status;
+            INSERT INTO booking_status_counts SELECT NEW.status, 1 WHERE NEW.status IS NOT NULL
+            ON CONFLICT (status) DO UPDATE SET n = n + 1;
+            INSERT INTO booking_transitions (booking_id, from_status, to_status, at)
+            VALUES (NEW.id, OLD.status, NEW.status, coalesce(NEW.status_changed_at, strftime('%Y-%m-%dT%H:%M:%f', 'now')));
+        END
+        """,
+        # the counsellor day list now reads slots (see "counsellor worklist")
+        "DROP INDEX IF EXISTS idx_bookings_date",
+    ]),
+    (13, "per-table data versions for cross-process read caching", [
+        """
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """,
+        "INSERT OR IGNORE INTO data_versions (name) VALUES " + ", ".join(
+            f"('{t}')" for t in (*VERSIONED_TABLES, "posts")),
+        *(_version_trigger(t, event) for t in VERSIONED_TABLES for event in ("INSERT", "UPDATE", "DELETE")),
+        # posts only count when the public feed changes: not new posts awaiting review, risk scans or flags
+        _version_trigger("posts", "INSERT", "WHEN NEW.approved = 1"),
+        _version_trigger("posts", "UPDATE OF approved, content", "WHEN OLD.approved = 1 OR NEW.approved = 1"),
+        _version_trigger("posts", "DELETE", "WHEN OLD.approved = 1"),
+    ]),
+]
+
+def hot_queries():
+    """Statements the pages and workers run all the time, with sample parameters; none may scan a whole table.
+
+    Built from the SQL constants the code itself executes, so the plan check
+    can't drift from what actually runs. Imported here, not at the top, to
+    keep this module free of the app's.
+    """
+    import bookings
+    import chat_cache
+    import engagement
+    import forum
+    import forum_scan
+    import scheduler
+    import search
+    import services
+    import storage
+
+    day, start, end = "1970-01-01", "2024-01-01T00:00", "2024-01-02T00:00"
+    return {
+        "public feed": (forum.FIRST_PAGE_SQL, (30,)),
+        "public feed, next page": (forum.NEXT_PAGE_SQL, (1000, 30)),
+        "moderation queue": (forum.QUEUE_FIRST_SQL, (50,)),
+        "moderation queue, next page": (forum.QUEUE_AFTER_SCORED_SQL, (0.5, 0.5, 1000, 50)),
+        "moderation queue, unscanned page": (forum.QUEUE_AFTER_UNSCANNED_SQL, (1000, 50)),
+        **{f"moderation {action}": (sql, (1, 0)) for action, sql in forum.MODERATION_SQL.items()},
+        "flag by anon id": (forum.FLAG_AUTHOR_SQL, ("anon_000000",)),
+        "forum search": (search.MATCHES_SQL.format(columns=search.POST_COLUMNS), ('"exam"', 1, search.RANK_WINDOW)),
+        "queue search": (search.MATCHES_SQL.format(columns=search.QUEUE_COLUMNS), ('"exam"', 0, search.RANK_WINDOW)),
+        "resource search": (search.RESOURCES_SQL, (*search.HIGHLIGHT, search.SNIPPET_TOKENS, '"sleep"', 20)),
+        "unscanned posts": (forum_scan.UNSCANNED_SQL, (0, 500)),
+        "unscanned count": (forum_scan.PENDING_SQL, ()),
+        "store risk score": (forum_scan.UPDATE_SQL, (0.5, "self_harm", 1, start, 1)),
+        "counsellor worklist": (bookings.WORKLIST_SQL, (1, start, end)),
+        "booking transition": (bookings.TRANSITION_SQL, ("completed", start, 1, "confirmed")),
+        "booking confirm": (bookings.CONFIRM_SQL, ("confirmed", start, 1, "requested")),
+        "release slot": (bookings.RELEASE_SLOT_SQL, (1,)),
+        "unassign booking": (scheduler.UNASSIGN_SQL, (1,)),
+        "booking counts": (bookings.COUNTS_SQL, bookings.STATUSES),
+        "free slots on a day": (scheduler.FREE_SLOTS_SQL, (start, end, 200)),
+        "slot overlap check": (scheduler.OVERLAP_SQL, (1, "2024-01-01T08:00", "2024-01-01T10:50", "2024-01-01T10:00")),
+        "booking backlog": (scheduler.BACKLOG_SQL, ()),
+        "waiting bookings": (scheduler.WAITING_SQL, ()),
+        "allocatable slots": (scheduler.ALLOCATABLE_SLOTS_SQL, (start,)),
+        "assign slot": (scheduler.ASSIGN_SQL, (1, 1, 1)),
+        "claim slot": (scheduler.CLAIM_SQL, (1, 1)),
+        "engagement by resource": (engagement.BY_RESOURCE_SQL, (day,)),
+        "engagement by day": (engagement.BY_DAY_SQL, (day,)),
+        "admin daily rollup": (services.ROLLUP_SQL, (day,)),
+        "dashboard trends": (services.TRENDS_SQL, ()),
+        "latest screening": (services.LATEST_SCREENING_SQL, ()),
+        "data versions": (storage.data_versions_sql(len(services.ADMIN_SUMMARY_TABLES)), services.ADMIN_SUMMARY_TABLES),
+        "chat cache trim": (chat_cache.TRIM_SQL, (0.0, chat_cache.DEFAULT_MAX_ENTRIES)),
+    }
+
+
+def current_version(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TEXT
+    )
+    """)
+    return conn.execute("SELECT coalesce(max(version), 0) FROM schema_version").fetchone()[0]
+
+
+def migrate(conn, migrations=MIGRATIONS):
+    """Apply pending migrations; returns the list of versions applied.
+
+    Safe to call from several worker processes at once: each migration takes
+    the write lock (BEGIN IMMEDIATE) and re-checks the version before running.
+    """
+    applied = []
+    for version, description, statements in migrations:
+        if version <= current_version(conn):
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if version <= current_version(conn):  # another process got there first
+                conn.rollback()
+                continue
+            for stmt in statements:
+                if callable(stmt):
+                    stmt(conn)
+                else:
+                    conn.execute(stmt)
+            conn.execute("INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                         (version, description, datetime.datetime.utcnow().isoformat()))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
+
+
+def query_plan(conn, sql, params=()):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def full_scans(conn, queries=None):
+    """Map of query name -> plan for hot queries that scan a table without an index."""
+    bad = {}
+    for name, (sql, params) in (queries or hot_queries()).items():
+        plan = query_plan(conn, sql, params)
+        if any(step.startswith("SCAN") and "INDEX" not in step for step in plan):
+            bad[name] = plan
+    return bad
+
+
+def check_query_plans(conn, queries=None):
+    bad = full_scans(conn, queries)
+    if bad:
+        raise AssertionError("hot queries regressed to full table scans:\n" +
+                             "\n".join(f"  {name}: {plan}" for name, plan in bad.items()))
+
+
+if __name__ == "__main__":
+    import sqlite3
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    conn = sqlite3.connect(args[0] if args else "mental_platform.db")
+    print("applied:", migrate(conn) or "nothing (up to date)")
+    print("schema version:", current_version(conn))
+    if "--check-plans" in sys.argv:
+        check_query_plans(conn)
+        print("query plans OK:", ", ".join(hot_queries()))
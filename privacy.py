@@ -0,0 +1,13 @@
+# privacy.py
+"""Pseudonymous identifiers for students, shared by the app and offline tools."""
+import hashlib
+import random
+
+
+def anonymize_id(raw_id: str):
+    # deterministic pseudonymization (not reversible)
+    h = hashlib.sha256(raw_id.encode()).hexdigest()[:8]
+    return f"anon_{h}"
+
+def make_anon_tag():
+    return "anon_" + "".join(random.choice("0123456789ABCDEF") for i in range(6))
@@ -0,0 +1,202 @@
+# scheduler.py
+"""Counsellor slots and allocation of booking requests to them.
+
+Counsellors publish ``slots`` (a start and end time each). A slot is free
+while its ``booking_id`` is NULL, and it is claimed with a compare-and-set
+``UPDATE ... WHERE booking_id IS NULL``, so two students racing for the
+same slot can't both get it: one update matches, the other finds it taken.
+A unique index on ``booking_id`` means no booking ever holds two slots.
+
+Availability and overlap lookups are interval queries over ``starts_at``.
+No slot is longer than ``MAX_SLOT_MINUTES``, so "slots overlapping [a, b)"
+is the index range ``a - MAX_SLOT_MINUTES < starts_at < b`` and never a
+table scan.
+
+Requests made without a slot wait in the backlog until ``allocate`` assigns
+them in one pass. The most severe latest screening goes first, then the
+oldest request, and each gets the first free slot at or after its preferred
+time (or the very first free slot, if its screening was severe).
+
+    python scheduler.py --db mental_platform.db --allocate
+"""
+import argparse
+import bisect
+import datetime
+import logging
+
+import scoring
+
+log = logging.getLogger(__name__)
+
+TIME_FORMAT = "%Y-%m-%dT%H:%M"  # slots.starts_at / ends_at, UTC like every stored timestamp
+SLOT_MINUTES = 50
+MAX_SLOT_MINUTES = 120  # bounds the interval lookups; add_slots refuses longer slots
+URGENT_BANDS = {"severe"}  # a latest screening in one of these bands takes the earliest slot
+
+FREE_SLOTS_SQL = ("SELECT s.id, c.name, s.starts_at, s.ends_at FROM slots s JOIN counsellors c ON c.id = s.counsellor_id "
+                  "WHERE s.booking_id IS NULL AND s.starts_at >= ? AND s.starts_at < ? AND c.active = 1 "
+                  "ORDER BY s.starts_at, s.id LIMIT ?")
+OVERLAP_SQL = "SELECT 1 FROM slots WHERE counsellor_id=? AND starts_at > ? AND starts_at < ? AND ends_at > ? LIMIT 1"
+BACKLOG_SQL = (
+    "SELECT b.id, b.preferred_date, b.preferred_time, "
+    "(SELECT s.phq9_score || ',' || s.gad7_score FROM screenings s WHERE s.anon_id = b.anon_id "
+    "ORDER BY s.timestamp DESC LIMIT 1) "
+    "FROM bookings b WHERE b.status = 'requested' AND b.slot_id IS NULL ORDER BY b.id")
+ALLOCATABLE_SLOTS_SQL = ("SELECT s.id, s.starts_at FROM slots s JOIN counsellors c ON c.id = s.counsellor_id "
+                         "WHERE s.booking_id IS NULL AND s.starts_at >= ? AND c.active = 1 ORDER BY s.starts_at, s.id")
+WAITING_SQL = "SELECT count(*) FROM bookings WHERE status='requested' AND slot_id IS NULL"
+# booking side first: a booking that is no longer waiting for a slot is left alone
+ASSIGN_SQL = ("UPDATE bookings SET slot_id=?, counsellor_id=(SELECT counsellor_id FROM slots WHERE id=?) "
+              "WHERE id=? AND status='requested' AND slot_id IS NULL")
+CLAIM_SQL = "UPDATE slots SET booking_id=? WHERE id=? AND booking_id IS NULL"
+UNASSIGN_SQL = "UPDATE bookings SET slot_id=NULL, counsellor_id=NULL WHERE id=?"
+
+
+def _fmt(dt):
+    return dt.strftime(TIME_FORMAT)
+
+
+def add_counsellor(pool, name):
+    with pool.transaction() as conn:
+        return conn.execute("INSERT INTO counsellors (name) VALUES (?)", (name,)).lastrowid
+
+
+def counsellors(conn, active_only=True):
+    """``[(id, name, active), ...]`` by name."""
+    return conn.execute("SELECT id, name, active FROM counsellors WHERE active >= ? ORDER BY name",
+                        (int(active_only),)).fetchall()
+
+
+def add_slots(pool, counsellor_id, day, start, end, minutes=SLOT_MINUTES):
+    """Publish back-to-back ``minutes``-long slots from ``start`` to ``end`` (times) on ``day``.
+
+    Slots that would overlap one the counsellor already has are skipped.
+    Returns the number created.
+    """
+    if not 0 < minutes <= MAX_SLOT_MINUTES:
+        raise ValueError(f"slot length must be between 1 and {MAX_SLOT_MINUTES} minutes")
+    at = datetime.datetime.combine(day, start)
+    stop = datetime.datetime.combine(day, end)
+    length = datetime.timedelta(minutes=minutes)
+    reach = datetime.timedelta(minutes=MAX_SLOT_MINUTES)
+    created = 0
+    with pool.transaction() as conn:
+        while at + length <= stop:
+            if not conn.execute(OVERLAP_SQL, (counsellor_id, _fmt(at - reach), _fmt(at + length), _fmt(at))).fetchone():
+                conn.execute("INSERT INTO slots (counsellor_id, starts_at, ends_at) VALUES (?, ?, ?)",
+                             (counsellor_id, _fmt(at), _fmt(at + length)))
+                created += 1
+            at += length
+    return created
+
+
+def free_slots(conn, day, now=None, limit=200):
+    """Free, bookable slots on ``day``: ``[(id, counsellor, starts_at, ends_at), ...]`` by start time."""
+    lower = max(_fmt(datetime.datetime.combine(day, datetime.time())), _fmt(now or datetime.datetime.utcnow()))
+    upper = _fmt(datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time()))
+    return conn.execute(FREE_SLOTS_SQL, (lower, upper, limit)).fetchall()
+
+
+def claim(conn, slot_id, booking_id):
+    """Give ``slot_id`` to ``booking_id`` inside the caller's transaction.
+
+    False, with nothing changed, if the slot was taken meanwhile or the
+    booking is no longer waiting for one.
+    """
+    if not conn.execute(ASSIGN_SQL, (slot_id, slot_id, booking_id)).rowcount:
+        return False
+    if not conn.execute(CLAIM_SQL, (booking_id, slot_id)).rowcount:
+        conn.execute(UNASSIGN_SQL, (booking_id,))
+        return False
+    return True
+
+
+def request_booking(conn, values, slot_id=None):
+    """Insert a booking (``values`` as in ``bookings``' INSERT) and, if given, claim its slot.
+
+    Returns ``(booking_id, claimed)``; meant to run on the ``storage.WriteQueue``.
+    """
+    booking_id = conn.execute(
+        "INSERT INTO bookings (anon_id, preferred_date, preferred_time, notes, contact_encrypted, status, timestamp) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)", values).lastrowid
+    return booking_id, slot_id is not None and claim(conn, slot_id, booking_id)
+
+
+def _priority(scores):
+    # (urgent, phq9 + gad7) from the "phq9,gad7" of a latest screening; no screening sorts last
+    if scores is None:
+        return False, -1
+    phq9, gad7 = (int(x) for x in scores.split(","))
+    urgent = scoring.band(phq9, "phq9") in URGENT_BANDS or scoring.band(gad7, "gad7") in URGENT_BANDS
+    return urgent, phq9 + gad7
+
+
+def plan(backlog, slots, now):
+    """Assignments ``[(slot_id, booking_id), ...]`` for ``backlog`` rows over free ``slots`` (by start time)."""
+    starts = [s for _, s in slots]
+    # next_free[i]: first unassigned slot index >= i (union-find with path halving)
+    next_free = list(range(len(slots) + 1))
+
+    def find(i):
+        while next_free[i] != i:
+            next_free[i] = next_free[next_free[i]]
+            i = next_free[i]
+        return i
+
+    ranked = sorted(((_priority(scores), booking_id, date, time) for booking_id, date, time, scores in backlog),
+                    key=lambda r: (not r[0][0], -r[0][1], r[1]))
+    assignments = []
+    for (urgent, _), booking_id, date, time in ranked:
+        wanted = now if urgent or not date else max(f"{date}T{time or '00:00'}", now)
+        i = find(bisect.bisect_left(starts, wanted))
+        if i == len(slots):
+            continue
+        next_free[i] = i + 1
+        assignments.append((slots[i][0], booking_id))
+    return assignments
+
+
+def allocate(pool, now=None):
+    """Assign the pending backlog to free slots; returns ``(assigned, left_waiting)`` counts.
+
+    Everything is written in one transaction and every claim is a
+    compare-and-set, so a slot a student took while the plan was being made
+    is skipped and its request simply waits for the next run.
+    """
+    now = _fmt(now or datetime.datetime.utcnow())
+    with pool.connection() as conn:
+        backlog = conn.execute(BACKLOG_SQL).fetchall()
+        slots = conn.execute(ALLOCATABLE_SLOTS_SQL, (now,)).fetchall()
+    assigned = 0
+    with pool.transaction() as conn:
+        for slot_id, booking_id in plan(backlog, slots, now):
+            assigned += claim(conn, slot_id, booking_id)
+    return assigned, len(backlog) - assigned
+
+
+def main(argv=None):
+    import time
+
+    import migrations
+    import storage
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="mental_platform.db")
+    parser.add_argument("--allocate", action="store_true", help="assign the pending backlog to free slots")
+    args = parser.parse_args(argv)
+    if not args.allocate:
+        parser.error("nothing to do: pass --allocate")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    pool = storage.ConnectionPool(args.db, max_size=2)
+    with pool.connection() as conn:
+        migrations.migrate(conn)
+    start = time.perf_counter()
+    assigned, waiting = allocate(pool)
+    log.info("assigned %d requests in %.2fs; %d still waiting for a slot", assigned, time.perf_counter() - start,
+             waiting)
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
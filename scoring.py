@@ -0,0 +1,95 @@
+# scoring.py
+"""PHQ-9 / GAD-7 scoring and risk banding.
+
+One threshold table (``BANDS``) drives everything: the scalar helpers used by
+the live screening form and the vectorised ones used for dashboards and bulk
+imports, which score N×9 / N×7 answer matrices with NumPy in one pass.
+NumPy and pandas are imported by the vectorised helpers when first called,
+so the live form (and the API) never pays for loading them.
+"""
+import bisect
+
+PHQ9_ITEMS = 9
+GAD7_ITEMS = 7
+MAX_ANSWER = 3  # 0=Not at all ... 3=Nearly every day
+
+# (band, lowest score in band), in ascending order; migration 3's daily rollup has these bands and
+# bounds written out, so a change here needs a new migration that rebuilds it (tests/test_rollup.py)
+BANDS = {
+    "phq9": (("none_mild", 0), ("moderate", 10), ("moderately_severe", 15), ("severe", 20)),
+    "gad7": (("none_mild", 0), ("moderate", 10), ("severe", 15)),
+}
+
+
+def band_labels(instrument):
+    return [label for label, _ in BANDS[instrument]]
+
+
+def _cut_points(instrument):
+    # lower bounds of every band but the first
+    return [low for _, low in BANDS[instrument][1:]]
+
+
+# ---------- one submission ----------
+def _score(answers, n_items):
+    values = [int(x) for x in answers]
+    if len(values) != n_items:
+        raise ValueError(f"expected {n_items} answers, got {len(values)}")
+    if any(v < 0 or v > MAX_ANSWER for v in values):
+        raise ValueError(f"answers must be between 0 and {MAX_ANSWER}")
+    return sum(values)
+
+def score_phq9(answers):
+    return _score(answers, PHQ9_ITEMS)
+
+def score_gad7(answers):
+    return _score(answers, GAD7_ITEMS)
+
+def band(score, instrument):
+    labels = band_labels(instrument)
+    return labels[bisect.bisect_right(_cut_points(instrument), score)]
+
+def risk_level_from_scores(phq9, gad7):
+    return band(phq9, "phq9"), band(gad7, "gad7")
+
+
+# ---------- many submissions ----------
+def score_matrix(answers, n_items):
+    """Row sums of an N×n_items answer matrix (array, list of lists or DataFrame)."""
+    import numpy as np
+    a = np.asarray(answers, dtype=np.int16)
+    if a.ndim != 2 or a.shape[1] != n_items:
+        raise ValueError(f"expected an N×{n_items} answer matrix, got shape {a.shape}")
+    if a.size and (a.min() < 0 or a.max() > MAX_ANSWER):
+        raise ValueError(f"answers must be between 0 and {MAX_ANSWER}")
+    return a.sum(axis=1, dtype=np.int32)
+
+def band_codes(scores, instrument):
+    """Index into ``band_labels(instrument)`` for every score."""
+    import numpy as np
+    return np.searchsorted(np.asarray(_cut_points(instrument)), np.asarray(scores), side="right")
+
+def band_array(scores, instrument):
+    import pandas as pd
+    return pd.Categorical.from_codes(band_codes(scores, instrument), categories=band_labels(instrument))
+
+def band_counts(scores, instrument):
+    """``{band: count}`` for a batch of scores, with every band present."""
+    import numpy as np
+    labels = band_labels(instrument)
+    counts = np.bincount(band_codes(scores, instrument), minlength=len(labels))
+    return dict(zip(labels, counts.tolist()))
+
+def score_frame(phq9_answers, gad7_answers):
+    """Scores and bands for N submissions as a DataFrame (phq9, gad7, phq9_level, gad7_level)."""
+    import pandas as pd
+    phq9 = score_matrix(phq9_answers, PHQ9_ITEMS)
+    gad7 = score_matrix(gad7_answers, GAD7_ITEMS)
+    if len(phq9) != len(gad7):
+        raise ValueError(f"{len(phq9)} PHQ-9 rows but {len(gad7)} GAD-7 rows")
+    return pd.DataFrame({
+        "phq9": phq9,
+        "gad7": gad7,
+        "phq9_level": band_array(phq9, "phq9"),
+        "gad7_level": band_array(gad7, "gad7"),
+    })
@@ -0,0 +1,168 @@
+# search.py
+"""Full-text search over forum posts and resources (SQLite FTS5).
+
+``posts_fts`` and ``resources_fts`` are external-content FTS5 indexes kept
+in sync with their tables by triggers (migration 7), so the text is stored
+once and searches never touch rows that don't match.
+
+User input is never passed to MATCH as-is: ``parse_query`` splits it into
+terms — every word is a term, ``"quoted words"`` is a phrase, and a trailing
+``*`` (``anx*``) is a prefix — and ``match_query`` turns those into FTS5
+syntax. Terms are ANDed and results are ranked by bm25.
+
+FTS5's own ``bm25()`` reads the whole posting list of every term to get its
+document frequency, which costs tens of milliseconds for common words on a
+forum with a million posts. Post searches instead take the ``RANK_WINDOW``
+newest matches (FTS5 walks its index newest-first and stops early) and rank
+those with bm25 computed over that window, which keeps a search in the low
+milliseconds however many posts there are. Resources are few and use
+``bm25()`` directly.
+"""
+import math
+import re
+import unicodedata
+
+DEFAULT_LIMIT = 20
+RANK_WINDOW = 300  # newest matching posts considered for ranking
+SNIPPET_TOKENS = 16
+HIGHLIGHT = ("**", "**")  # markdown bold around matched terms
+
+# CROSS JOIN keeps the FTS index as the outer loop, so ORDER BY rowid DESC LIMIT stops early
+MATCHES_SQL = ("SELECT {columns}, highlight(posts_fts, 0, char(2), char(3)) "
+               "FROM posts_fts CROSS JOIN posts p ON p.id = posts_fts.rowid "
+               "WHERE posts_fts MATCH ? AND p.approved = ? ORDER BY posts_fts.rowid DESC LIMIT ?")
+POST_COLUMNS = "p.id, p.anon_id, p.timestamp"
+QUEUE_COLUMNS = "p.id, p.version, p.anon_id, p.content, p.flagged, p.risk_score, p.risk_categories, p.timestamp"
+RESOURCES_SQL = ("SELECT r.id, r.title, r.type, r.language, r.url, snippet(resources_fts, 1, ?, ?, '…', ?) "
+                 "FROM resources_fts JOIN resources r ON r.id = resources_fts.rowid "
+                 "WHERE resources_fts MATCH ? ORDER BY bm25(resources_fts, 5.0, 1.0) LIMIT ?")
+BM25_K1, BM25_B = 1.2, 0.75
+
+_TERM_RE = re.compile(r'"([^"]*)"|(\S+)')
+_WORD_RE = re.compile(r"\w+")
+_OPEN, _CLOSE = "\x02", "\x03"  # highlight() markers, swapped for HIGHLIGHT in snippets
+_SPAN_RE = re.compile(f"{_OPEN}(.*?){_CLOSE}", re.S)
+
+
+def _quote(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _fold(text):
+    # what FTS5's unicode61 tokenizer (remove_diacritics 2) compares: lowercase, no accents
+    text = text.lower()
+    if text.isascii():
+        return text
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def parse_query(text):
+    """Search terms in ``text`` as ``[(words, prefix), ...]``."""
+    terms = []
+    for phrase, word in _TERM_RE.findall(text or ""):
+        if phrase:
+            words = _WORD_RE.findall(_fold(phrase))
+            if words:
+                terms.append((tuple(words), False))
+            continue
+        words = _WORD_RE.findall(_fold(word))
+        for i, w in enumerate(words):
+            terms.append(((w,), word.endswith("*") and i == len(words) - 1))
+    return terms
+
+
+def match_query(text):
+    """FTS5 MATCH expression for free-text ``text``, or None if it has no searchable words."""
+    return " ".join(_quote(" ".join(words)) + ("*" if prefix else "")
+                    for words, prefix in parse_query(text)) or None
+
+
+def _term_counts(highlighted, terms):
+    # how often each term occurs in a highlight()ed document; one span may hold several adjacent terms
+    counts = [0] * len(terms)
+    exact = {" ".join(term): t for t, (term, prefix) in enumerate(terms) if not prefix}
+    for span in _SPAN_RE.findall(highlighted):
+        span = _fold(span)
+        if span in exact:  # the usual case: a span is one whole term
+            counts[exact[span]] += 1
+            continue
+        words = _WORD_RE.findall(span)
+        i = 0
+        while i < len(words):
+            for t, (term, prefix) in enumerate(terms):
+                got = words[i:i + len(term)]
+                if len(got) == len(term) and got[:-1] == list(term[:-1]) and (
+                        got[-1].startswith(term[-1]) if prefix else got[-1] == term[-1]):
+                    counts[t] += 1
+                    i += len(term)
+                    break
+            else:
+                i += 1
+    return counts
+
+
+def rank(docs, terms):
+    """Order ``[(row, highlighted), ...]`` best-first by bm25 computed over ``docs`` themselves."""
+    if not docs:
+        return []
+    stats = [(_term_counts(h, terms), h.count(" ") + 1) for _, h in docs]  # length in words, near enough
+    n = len(docs)
+    avg_len = sum(length for _, length in stats) / n or 1
+    idf = [math.log((n - df + 0.5) / (df + 0.5) + 1)
+           for df in (sum(1 for counts, _ in stats if counts[t]) for t in range(len(terms)))]
+
+    def score(i):
+        counts, length = stats[i]
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_len)
+        return sum(w * f * (BM25_K1 + 1) / (f + norm) for w, f in zip(idf, counts))
+
+    return [docs[i] for i in sorted(range(n), key=score, reverse=True)]
+
+
+def snippet(highlighted, tokens=SNIPPET_TOKENS):
+    """About ``tokens`` words around the first match, with matches in ``HIGHLIGHT`` markers."""
+    words = highlighted.split()
+    first = next((i for i, w in enumerate(words) if _OPEN in w), 0)
+    start = max(0, min(first - tokens // 4, len(words) - tokens))
+    text = " ".join(words[start:start + tokens])
+    if text.rfind(_OPEN) > text.rfind(_CLOSE):  # a span cut off by the window
+        text += _CLOSE
+    if text.find(_CLOSE) < text.find(_OPEN) or (_CLOSE in text and _OPEN not in text):
+        text = _OPEN + text
+    text = ("…" if start > 0 else "") + text + ("…" if start + tokens < len(words) else "")
+    return text.replace(_OPEN, HIGHLIGHT[0]).replace(_CLOSE, HIGHLIGHT[1])
+
+
+def _newest_matches(conn, columns, query, approved, window):
+    return conn.execute(MATCHES_SQL.format(columns=columns), (query, approved, window)).fetchall()
+
+
+def search_posts(conn, text, approved=1, limit=DEFAULT_LIMIT, window=RANK_WINDOW):
+    """Best-matching posts: ``[(id, anon_id, snippet, timestamp), ...]``."""
+    terms = parse_query(text)
+    if not terms:
+        return []
+    rows = _newest_matches(conn, POST_COLUMNS, match_query(text), approved, window)
+    docs = rank([(row[:3], row[3]) for row in rows], terms)[:limit]
+    return [(id_, anon_id, snippet(h), ts) for (id_, anon_id, ts), h in docs]
+
+
+def search_queue(conn, text, limit=DEFAULT_LIMIT, window=RANK_WINDOW):
+    """Unapproved posts matching ``text``, in the row shape of ``forum.queue_page``."""
+    terms = parse_query(text)
+    if not terms:
+        return []
+    rows = _newest_matches(conn, QUEUE_COLUMNS, match_query(text), 0, window)
+    return [row for row, _ in rank([(row[:8], row[8]) for row in rows], terms)[:limit]]
+
+
+def search_resources(conn, text, limit=DEFAULT_LIMIT):
+    """Best-matching resources: ``[(id, title, type, language, url, snippet), ...]``.
+
+    Title matches weigh more than description matches.
+    """
+    query = match_query(text)
+    if query is None:
+        return []
+    return conn.execute(RESOURCES_SQL, (*HIGHLIGHT, SNIPPET_TOKENS, query, limit)).fetchall()
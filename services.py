@@ -0,0 +1,141 @@
+# services.py
+"""Operations shared by the Streamlit pages and the HTTP API (``api.py``).
+
+Nothing here knows about Streamlit or HTTP: each function takes the shared
+objects it needs (pool, ``storage.WriteQueue``, cipher, ...) and returns
+plain data. A screening submitted from a kiosk is scored, stored and
+escalated exactly like one from the web page.
+"""
+import datetime
+import json
+import random
+
+import bookings
+import crisis
+import engagement
+import metrics
+import scheduler
+from privacy import anonymize_id, make_anon_tag
+from scoring import risk_level_from_scores, score_gad7, score_phq9
+
+EMERGENCY_HELPLINE = """Please reach out for immediate help. You are not alone.\n\n
+                📞 National Suicide Prevention Lifeline (India): 9152987821\n
+                📞 KIRAN Mental Health Helpline: 1800-599-0019\n\n
+                If you are in immediate danger, please call your local emergency services."""
+DEFAULT_ACK_TIMEOUT = 10  # seconds to wait for the writer to commit
+URGENT_SCORE = 15  # PHQ-9 or GAD-7 at or above this (or any answer to PHQ-9 item 9) needs urgent help
+COPING_TIPS = [
+    "Take slow deep breaths for a minute — breathe in for 4, hold 2, out for 6.",
+    "Try grounding: name 5 things you can see, 4 you can touch, 3 you can hear.",
+    "A short walk, even 5–10 minutes, can reduce stress.",
+    "If you're comfortable, talking to a trusted friend or a counsellor often helps."
+]
+
+
+# ---------- chat ----------
+def is_crisis(text):
+    # one pass over the message against the whole lexicon in crisis_patterns.txt
+    return crisis.get_detector().is_crisis(text)
+
+@metrics.timed(metrics.CHAT_FALLBACK)
+def rule_based_response(user_text, last_screening=None):
+    """
+    Simple rule-based replies for fallback AI.
+    Escalation if suicidal keywords or high screening risk.
+    """
+    urgent = is_crisis(user_text)
+    if urgent:
+        metrics.CRISIS_ESCALATIONS.labels("chat_fallback").inc()
+        return {
+            "message": (
+                "I’m really sorry you’re feeling this way. If you are in immediate danger, please call your local emergency services now. "
+                + EMERGENCY_HELPLINE
+            ),
+            "escalate": True
+        }
+    # if last_screening:
+    #     phq9, gad7 = last_screening
+    #     if phq9 >= 15 or gad7 >= 15:
+    #         return {
+    #             "message": "I see your screening scores indicate moderate-to-severe symptoms. I recommend booking with a counsellor. Would you like to book an appointment now? You can also reach immediate support via the helpline.",
+    #             "escalate": False
+    #         }
+    # generic coping tips
+    return {"message": random.choice(COPING_TIPS), "escalate": False}
+
+def chat_prompt(user_text):
+    return f"User says: {user_text}\nProvide supportive, non-judgmental, practical coping tips. If suicidal or high-risk, instruct the user to seek emergency help and encourage booking. Keep brief."
+
+
+# ---------- screening ----------
+def submit_screening(writer, raw_id, phq9_answers, gad7_answers, timeout=DEFAULT_ACK_TIMEOUT):
+    """Score and store one screening; raises ValueError on invalid answers.
+
+    Returns ``{"anon_id", "phq9", "gad7", "phq9_level", "gad7_level", "urgent"}``.
+    """
+    phq9_score = score_phq9(phq9_answers)
+    gad7_score = score_gad7(gad7_answers)
+    phq9_answers, gad7_answers = [int(a) for a in phq9_answers], [int(a) for a in gad7_answers]
+    anon = anonymize_id(raw_id) if raw_id else make_anon_tag()
+    meta = {"phq9_answers": phq9_answers, "gad7_answers": gad7_answers}
+    writer.execute(
+        "INSERT INTO screenings (anon_id, phq9_score, gad7_score, meta, timestamp) VALUES (?, ?, ?, ?, ?)",
+        (anon, phq9_score, gad7_score, json.dumps(meta), datetime.datetime.utcnow().isoformat())
+    ).result(timeout=timeout)
+    phq9_level, gad7_level = risk_level_from_scores(phq9_score, gad7_score)
+    urgent = phq9_score >= URGENT_SCORE or gad7_score >= URGENT_SCORE or phq9_answers[-1] > 0
+    if urgent:
+        metrics.CRISIS_ESCALATIONS.labels("screening").inc()
+    return {"anon_id": anon, "phq9": phq9_score, "gad7": gad7_score, "phq9_level": phq9_level,
+            "gad7_level": gad7_level, "urgent": urgent}
+
+
+# ---------- booking ----------
+def request_booking(writer, cipher, raw_id, date, time, notes="", contact="", slot_id=None,
+                    timeout=DEFAULT_ACK_TIMEOUT):
+    """Store a booking request, claiming ``slot_id`` if given.
+
+    ``date`` is a ``datetime.date`` and ``time`` an ``"HH:MM"`` string.
+    Contact details are kept only encrypted, and only if ``cipher`` is set.
+    Returns ``{"booking_id", "anon_id", "claimed"}``; ``claimed`` is False
+    if someone took the slot first, in which case the request waits for the
+    allocator.
+    """
+    anon = anonymize_id(raw_id) if raw_id else make_anon_tag()
+    contact_enc = cipher.encrypt(contact) if contact and cipher else None
+    booking_id, claimed = writer.submit(
+        scheduler.request_booking,
+        (anon, date.isoformat(), time, notes, contact_enc, "requested", datetime.datetime.utcnow().isoformat()),
+        slot_id,
+    ).result(timeout=timeout)
+    return {"booking_id": booking_id, "anon_id": anon, "claimed": bool(claimed)}
+
+
+# ---------- forum ----------
+def create_post(writer, content, timeout=DEFAULT_ACK_TIMEOUT):
+    """Queue a post for moderation; returns ``{"post_id", "anon_id"}``."""
+    anon = make_anon_tag()
+    post_id = writer.execute(
+        "INSERT INTO posts (anon_id, content, flagged, approved, timestamp) VALUES (?, ?, ?, ?, ?)",
+        (anon, content.strip(), 0, 0, datetime.datetime.utcnow().isoformat())
+    ).result(timeout=timeout)
+    return {"post_id": post_id, "anon_id": anon}
+
+
+# ---------- admin ----------
+ADMIN_SUMMARY_TABLES = ("screenings", "bookings", "resource_events", "resources")  # data versions admin_summary depends on
+ROLLUP_SQL = "SELECT * FROM screening_daily_rollup WHERE day >= ? ORDER BY day"
+TRENDS_SQL = "SELECT * FROM screening_daily_rollup WHERE n > 0 ORDER BY day"  # the dashboard's chart, every day so far
+LATEST_SCREENING_SQL = "SELECT phq9_score, gad7_score FROM screenings WHERE id = (SELECT max(id) FROM screenings)"
+
+
+def admin_summary(conn, since):
+    """Anonymous aggregates since the ``since`` day (ISO date), all read from pre-aggregated tables."""
+    cur = conn.execute(ROLLUP_SQL, (since,))
+    cols = [d[0] for d in cur.description]
+    return {
+        "screenings_by_day": [dict(zip(cols, row)) for row in cur.fetchall()],
+        "bookings_by_status": bookings.status_counts(conn),
+        "resource_engagement": [{"resource_id": r[0], "title": r[1], "plays": r[2], "downloads": r[3]}
+                                for r in engagement.totals_by_resource(conn, since)],
+    }
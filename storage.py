@@ -0,0 +1,361 @@
+# storage.py
+"""SQLite connection layer shared by every page (and every Streamlit session).
+
+Pages never open connections themselves. They borrow one from a bounded
+``ConnectionPool`` for the length of a ``with`` block and hand it back:
+
+    with pool.connection() as conn:      # read
+        conn.execute("SELECT ...")
+    with pool.transaction() as conn:     # write, commit on success / rollback on error
+        conn.execute("INSERT ...")
+
+Bursty inserts (a whole class submitting screenings at once) go through a
+``WriteQueue`` instead: a single background writer drains the queue and
+group-commits it in batches, so readers in WAL mode never wait on them.
+
+Every pooled connection is a ``TimedConnection``: statement times go to
+``metrics`` (by verb and table), and slow statements are logged.
+
+Read results worth keeping across reruns go in a ``VersionedCache``, which
+reuses them until one of the tables they came from is written (by any
+process: triggers bump a per-table counter in ``data_versions``).
+"""
+import atexit
+import collections
+import concurrent.futures
+import contextlib
+import logging
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_ACQUIRE_TIMEOUT = 10.0  # seconds to wait for a free connection
+DEFAULT_LEAK_TIMEOUT = 30.0     # a checkout held longer than this is reported as a leak
+DEFAULT_CACHE_ENTRIES = 256     # VersionedCache results kept (LRU)
+
+# PRAGMAs applied to every new connection, by storage mode
+STORAGE_MODES = {
+    # SQLite defaults: rollback journal, fsync on every commit
+    "rollback": {},
+    # Readers don't block writers (and vice versa); fsync only at checkpoints
+    "wal": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,       # negative = KiB, i.e. ~16 MB page cache per connection
+        "mmap_size": 268435456,     # 256 MB memory-mapped reads
+        "temp_store": "MEMORY",
+    },
+}
+DEFAULT_STORAGE_MODE = "wal"
+
+
+def _caller_stack(depth=4):
+    # Where a connection was checked out from, skipping pool/contextlib frames. Runs on every
+    # checkout, so only (file, line, function) is taken; source lines are read if it is ever reported.
+    frames = []
+    frame = sys._getframe(1)
+    while frame is not None and len(frames) < depth:
+        if frame.f_code.co_filename not in (__file__, contextlib.__file__):
+            frames.append((frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name, None))
+        frame = frame.f_back
+    return frames[::-1]
+
+
+def _format_stack(frames):
+    return "".join(traceback.format_list(traceback.StackSummary.from_list(frames)))
+
+
+_observe_query = metrics.observe_query
+
+
+class TimedConnection(sqlite3.Connection):
+    """``sqlite3.Connection`` that reports each ``execute``/``executemany`` to ``metrics``.
+
+    A SELECT's time covers planning and stepping to its first row, which is
+    where a scan or a sort shows up; fetching the rest isn't counted.
+    """
+
+    # module-level lookups only: this runs for every statement the app makes
+    def execute(self, sql, *args, _execute=sqlite3.Connection.execute, _clock=time.perf_counter):
+        start = _clock()
+        try:
+            return _execute(self, sql, *args)
+        finally:
+            _observe_query(sql, _clock() - start)
+
+    def executemany(self, sql, *args, _executemany=sqlite3.Connection.executemany, _clock=time.perf_counter):
+        start = _clock()
+        try:
+            return _executemany(self, sql, *args)
+        finally:
+            _observe_query(sql, _clock() - start)
+
+
+class PoolTimeout(RuntimeError):
+    """Raised when no connection became free within the acquire timeout."""
+
+
+class ConnectionPool:
+    """Bounded pool of ``sqlite3`` connections to a single database file.
+
+    At most ``max_size`` connections exist at any time; they are created lazily
+    and reused LIFO so the hottest connection keeps its page cache warm.
+    Every checkout remembers where it came from, so connections that are never
+    returned can be reported by ``leaks()`` instead of silently running the
+    process out of file handles.
+    """
+
+    def __init__(self, path, max_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_ACQUIRE_TIMEOUT,
+                 leak_timeout=DEFAULT_LEAK_TIMEOUT, mode=DEFAULT_STORAGE_MODE):
+        if mode not in STORAGE_MODES:
+            raise ValueError(f"unknown storage mode {mode!r}; expected one of {sorted(STORAGE_MODES)}")
+        self.path = path
+        self.mode = mode
+        self.max_size = max_size
+        self.timeout = timeout
+        self.leak_timeout = leak_timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._checked_out = {}  # id(conn) -> (thread name, checkout time, stack)
+        self._all = []
+        self._closed = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False, factory=TimedConnection)
+        for name, value in STORAGE_MODES[self.mode].items():
+            conn.execute(f"PRAGMA {name}={value}")
+        with self._lock:
+            self._all.append(conn)
+        return conn
+
+    def acquire(self, timeout=None):
+        """Check out a connection. Callers must ``release()`` it (prefer ``connection()``)."""
+        if self._closed:
+            raise RuntimeError("connection pool is closed")
+        timeout = self.timeout if timeout is None else timeout
+        if not self._slots.acquire(timeout=timeout):
+            leaks = self.leaks()
+            raise PoolTimeout(
+                f"no free connection after {timeout}s ({self.max_size} in use); "
+                f"{len(leaks)} checkout(s) look leaked:\n" + "\n".join(l["stack"] for l in leaks)
+            )
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                conn = self._connect()
+            except Exception:
+                self._slots.release()
+                raise
+        stack = _caller_stack()
+        with self._lock:
+            self._checked_out[id(conn)] = (threading.current_thread().name, time.monotonic(), stack)
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool, rolling back anything left uncommitted."""
+        with self._lock:
+            info = self._checked_out.pop(id(conn), None)
+        if info is None:
+            raise ValueError("connection does not belong to this pool or was already released")
+        held = time.monotonic() - info[1]
+        if held > self.leak_timeout:
+            log.warning("connection held for %.1fs by %s, checked out at:\n%s", held, info[0], _format_stack(info[2]))
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+        self._slots.release()
+
+    @contextlib.contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Borrow a connection and run the block in one transaction."""
+        with self.connection() as conn:
+            with conn:
+                yield conn
+
+    def leaks(self):
+        """Checkouts that have been held longer than ``leak_timeout``."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {"thread": thread, "held": now - since, "stack": _format_stack(stack)}
+                for thread, since, stack in self._checked_out.values()
+                if now - since > self.leak_timeout
+            ]
+
+    def stats(self):
+        with self._lock:
+            return {"open": len(self._all), "in_use": len(self._checked_out),
+                    "idle": self._idle.qsize(), "max_size": self.max_size}
+
+    def close(self):
+        """Close idle connections now; checked-out ones are closed when released."""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class WriteQueue:
+    """Single background writer that group-commits queued writes.
+
+    ``submit(fn, *args)`` queues ``fn(conn, *args)`` and returns a
+    ``concurrent.futures.Future`` that resolves to ``fn``'s return value once
+    the batch containing it has committed (the caller's ack). Up to
+    ``batch_size`` queued writes share one transaction; if a batch fails, its
+    writes are replayed one by one so only the bad write reports an error.
+    """
+
+    _STOP = object()
+
+    def __init__(self, pool, batch_size=256, flush_interval=0.01):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, fn, *args):
+        if not self._thread.is_alive():
+            raise RuntimeError("write queue is closed")
+        future = concurrent.futures.Future()
+        self._queue.put((fn, args, future))
+        return future
+
+    def execute(self, sql, params=()):
+        """Queue a single statement; the future resolves to its ``lastrowid``."""
+        return self.submit(_execute, sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.submit(_executemany, sql, list(seq_of_params))
+
+    def close(self, timeout=10.0):
+        """Flush everything queued so far and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join(timeout)
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and batch[-1] is not self._STOP:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            stop = batch[-1] is self._STOP
+            if stop:
+                batch.pop()
+            if batch:
+                self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch):
+        batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        try:
+            with metrics.timer(metrics.DB_WRITE_BATCH), self.pool.transaction() as conn:
+                results = [fn(conn, *args) for fn, args, _ in batch]
+        except Exception:
+            log.exception("batch of %d writes failed; retrying individually", len(batch))
+            for fn, args, future in batch:
+                try:
+                    with self.pool.transaction() as conn:
+                        future.set_result(fn(conn, *args))
+                except Exception as e:
+                    future.set_exception(e)
+            return
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+def _execute(conn, sql, params):
+    return conn.execute(sql, params).lastrowid
+
+
+def _executemany(conn, sql, seq_of_params):
+    return conn.executemany(sql, seq_of_params).rowcount
+
+
+def data_versions_sql(n):
+    return f"SELECT name, version FROM data_versions WHERE name IN ({', '.join('?' * n)})"
+
+
+def data_versions(conn, tables):
+    """Write counters of ``tables`` (see migration 13), in order; each moves on every write to its table."""
+    found = dict(conn.execute(data_versions_sql(len(tables)), tables).fetchall())
+    return tuple(found.get(t) for t in tables)
+
+
+class VersionedCache:
+    """Read results shared by every session until a table they were read from is written.
+
+    ``get(key, tables, fn, *args)`` returns ``fn(conn, *args)``, computed once
+    per version of ``tables``: each call reads those tables' counters (a
+    primary-key lookup) and recomputes only if one has moved since. ``fn``
+    may build DataFrames or charts from its rows; callers share the cached
+    object and must not modify it.
+    """
+
+    def __init__(self, pool, max_entries=DEFAULT_CACHE_ENTRIES):
+        self.pool = pool
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()  # (key, args) -> (versions, value)
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key, tables, fn, *args):
+        entry_key = (key, args)
+        with self.pool.connection() as conn:
+            # counters first: a write landing while fn runs can only make the entry look older than it is
+            versions = data_versions(conn, tables)
+            with self._lock:
+                cached = self._entries.get(entry_key)
+                if cached is not None and cached[0] == versions:
+                    self._entries.move_to_end(entry_key)
+                    self.hits += 1
+                    return cached[1]
+                self.misses += 1
+            value = fn(conn, *args)
+        with self._lock:
+            self._entries[entry_key] = (versions, value)
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / lookups if lookups else 0.0}
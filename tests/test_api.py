@@ -0,0 +1,89 @@
+# tests/test_api.py
+import asyncio
+import datetime
+
+import httpx
+import pytest
+
+import api
+import scheduler
+
+
+@pytest.fixture
+def call(tmp_path, monkeypatch):
+    """``call(fn)`` runs ``await fn(client, runtime)`` against a fresh database."""
+    monkeypatch.setattr(api, "DB_PATH", str(tmp_path / "api.db"))
+    monkeypatch.setattr(api, "OPENAI_API_KEY", None)
+    monkeypatch.setattr(api, "ADMIN_TOKEN", "token")
+    monkeypatch.setattr(api, "_runtime", None)
+
+    def run(fn):
+        async def main():
+            transport = httpx.ASGITransport(app=api.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+                rt = await api.get_runtime()
+                try:
+                    return await fn(client, rt)
+                finally:
+                    await rt.close()
+                    api._runtime = None
+        return asyncio.run(main())
+    return run
+
+
+def test_screening_status_codes(call):
+    async def fn(client, rt):
+        ok = await client.post("/screenings", json={"student_id": "s1", "phq9": [3] * 9, "gad7": [1] * 7})
+        assert ok.status_code == 201
+        assert ok.json()["urgent"] is True and ok.json()["helpline"]
+        bad = {
+            "too few answers": {"phq9": [3] * 8, "gad7": [1] * 7},
+            "booleans": {"phq9": [True] * 9, "gad7": [1] * 7},
+            "strings": {"phq9": ["3"] * 9, "gad7": [1] * 7},
+            "not a list": {"phq9": 27, "gad7": [1] * 7},
+            "missing gad7": {"phq9": [3] * 9},
+            "numeric student id": {"student_id": 7, "phq9": [3] * 9, "gad7": [1] * 7},
+        }
+        for case, body in bad.items():
+            response = await client.post("/screenings", json=body)
+            assert response.status_code == 400, case
+            assert response.json()["error"], case
+        assert (await client.post("/screenings", content=b"nope")).status_code == 400
+        assert (await client.post("/screenings", json=[1, 2])).status_code == 400
+    call(fn)
+
+
+def test_booking_status_codes(call):
+    async def fn(client, rt):
+        day = datetime.date(2030, 1, 1)
+        scheduler.add_slots(rt.pool, scheduler.add_counsellor(rt.pool, "Dr. Rao"), day,
+                            datetime.time(9), datetime.time(10))
+        slots = (await client.get("/slots", params={"date": day.isoformat()})).json()["slots"]
+        assert len(slots) == 1
+        assert (await client.get("/slots", params={"date": "tomorrow"})).status_code == 400
+        booked = await client.post("/bookings", json={"slot_id": slots[0]["id"], "student_id": "s1"})
+        assert booked.status_code == 201 and booked.json()["claimed"]
+        assert (await client.post("/bookings", json={"slot_id": 999})).status_code == 404
+        assert (await client.post("/bookings", json={"slot_id": "1"})).status_code == 400
+        assert (await client.post("/bookings", json={"date": day.isoformat(), "time": "25:00"})).status_code == 400
+        assert (await client.post("/bookings", json={"date": day.isoformat()})).status_code == 201
+    call(fn)
+
+
+def test_forum_chat_and_admin_status_codes(call):
+    async def fn(client, rt):
+        assert (await client.post("/forum/posts", json={"content": "hello all"})).status_code == 202
+        assert (await client.post("/forum/posts", json={"content": "  "})).status_code == 400
+        assert (await client.post("/forum/posts", json={"content": "x" * (api.MAX_POST_CHARS + 1)})).status_code == 400
+        assert (await client.get("/forum/posts", params={"before": "x"})).status_code == 400
+        assert (await client.get("/forum/posts")).json() == {"posts": [], "next": None}  # awaiting review
+        crisis = await client.post("/chat", json={"message": "I want to kill myself"})
+        assert crisis.status_code == 200 and crisis.json()["escalate"] and crisis.json()["helpline"]
+        assert (await client.post("/chat", json={"message": ""})).status_code == 400
+        assert (await client.get("/admin/summary")).status_code == 401
+        admin = {"Authorization": "Bearer token"}
+        assert (await client.get("/admin/summary", headers=admin)).status_code == 200
+        assert (await client.get("/admin/summary", params={"days": 0}, headers=admin)).status_code == 400
+        assert (await client.get("/nope")).status_code == 404
+        assert (await client.delete("/chat")).status_code == 405
+    call(fn)
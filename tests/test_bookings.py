@@ -0,0 +1,38 @@
+# tests/test_bookings.py
+import datetime
+
+import bookings
+import migrations
+import scheduler
+import storage
+
+
+def _pool(tmp_path):
+    pool = storage.ConnectionPool(str(tmp_path / "bookings.db"), max_size=2)
+    with pool.connection() as conn:
+        migrations.migrate(conn)
+    return pool
+
+
+def _request(pool, slot_id):
+    with pool.transaction() as conn:
+        return scheduler.request_booking(conn, ("anon", "2030-01-01", "09:00", "", None, "requested", "t"), slot_id)
+
+
+def test_cancel_frees_the_slot_on_both_sides(tmp_path):
+    pool = _pool(tmp_path)
+    counsellor = scheduler.add_counsellor(pool, "Dr. Rao")
+    scheduler.add_slots(pool, counsellor, datetime.date(2030, 1, 1), datetime.time(9), datetime.time(10))
+    with pool.connection() as conn:
+        slot = conn.execute("SELECT id FROM slots").fetchone()[0]
+    first, claimed = _request(pool, slot)
+    assert claimed
+    assert bookings.transition(pool, "cancelled", [(first, "requested")]) == ([first], [])
+    second, claimed = _request(pool, slot)
+    assert claimed
+    with pool.connection() as conn:
+        rows = dict((id_, (s, c)) for id_, s, c in conn.execute("SELECT id, slot_id, counsellor_id FROM bookings"))
+        owner = conn.execute("SELECT booking_id FROM slots WHERE id=?", (slot,)).fetchone()[0]
+    assert rows == {first: (None, None), second: (slot, counsellor)}
+    assert owner == second
+    pool.close()
@@ -0,0 +1,19 @@
+# tests/test_catalog.py
+import catalog
+import migrations
+import storage
+
+
+def test_catalog_sees_edits_from_another_process(tmp_path):
+    pool = storage.ConnectionPool(str(tmp_path / "catalog.db"), max_size=2)
+    with pool.connection() as conn:
+        migrations.migrate(conn)
+    # two catalogs on one database stand in for two worker processes
+    here, there = catalog.ResourceCatalog(pool, recheck=0), catalog.ResourceCatalog(pool, recheck=0)
+    before = len(there.listing())
+    catalog.add_resource(pool, here, "Sleep hygiene", "article", "English")
+    assert len(there.listing()) == before + 1
+    loads = there.loads
+    there.listing()
+    assert there.loads == loads  # unchanged version: the snapshot is reused
+    pool.close()
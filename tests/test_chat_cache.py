@@ -0,0 +1,32 @@
+# tests/test_chat_cache.py
+import chat_cache
+import migrations
+import storage
+
+
+def test_near_duplicates_are_off_by_default():
+    cache = chat_cache.ResponseCache()
+    cache.put("so stressed about my exams", "reply")
+    assert cache.get("so stressed about my exam") is None
+
+
+def test_near_duplicate_needs_the_same_negation_cues():
+    cache = chat_cache.ResponseCache(near_duplicates=True)
+    cache.put("i cant sleep at night", "can't sleep reply")
+    cache.put("so stressed about my exams", "stress reply")
+    assert cache.get("so stressed about my exam") == "stress reply"
+    assert cache.get("i can sleep at night") is None
+    assert cache.get("not so stressed about my exams") is None
+
+
+def test_table_is_trimmed_on_put(tmp_path):
+    pool = storage.ConnectionPool(str(tmp_path / "cache.db"), max_size=2)
+    with pool.connection() as conn:
+        migrations.migrate(conn)
+    cache = chat_cache.ResponseCache(max_entries=3, pool=pool)
+    for i in range(10):
+        cache.put(f"message {i}", f"reply {i}")
+    with pool.connection() as conn:
+        keys = [k for k, in conn.execute("SELECT key FROM chat_cache ORDER BY created_at")]
+    assert keys == ["message 7", "message 8", "message 9"]
+    pool.close()
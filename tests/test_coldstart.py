@@ -0,0 +1,19 @@
+# tests/test_coldstart.py
+import os
+import subprocess
+import sys
+
+import pytest
+
+from bench import LAZY_MODULES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("module", ["app", "api"])
+def test_import_leaves_heavy_modules_unloaded(module):
+    # a fresh interpreter, as on a cold start; sys.modules in this one already holds whatever other tests imported
+    code = f"import sys, {module}; print('\\n'.join(sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    loaded = {name.split(".")[0] for name in out.split()}
+    assert not loaded & set(LAZY_MODULES)
@@ -0,0 +1,39 @@
+# tests/test_crisis.py
+import pytest
+
+import crisis
+
+
+@pytest.fixture(scope="module")
+def detector():
+    return crisis.get_detector()
+
+
+@pytest.mark.parametrize("text", [
+    "I want to kill myself",
+    "No. Suicide feels like the answer",
+    "I dont care anymore, suicide is the only way",
+    "Cant sleep, suicidal thoughts all night",
+    "I'm not sad but suicidal",
+    "I don't want to live anymore",
+    # a cue only negates the phrase it directly precedes
+    "no one cares kill myself",
+    "no hope left kill myself",
+    "theres no point ill end it all",
+    "I have never wanted to kill myself this badly",
+    # phrasings the original substring check caught
+    "im ending it tonight",
+    "i wanna die",
+])
+def test_escalates(detector, text):
+    assert detector.is_crisis(text)
+
+
+@pytest.mark.parametrize("text", [
+    "I'm not suicidal, just tired",
+    "I would never kill myself",
+    "i dont want to die",
+    "Exams are stressing me out",
+])
+def test_does_not_escalate(detector, text):
+    assert not detector.is_crisis(text)
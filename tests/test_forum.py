@@ -0,0 +1,57 @@
+# tests/test_forum.py
+import pytest
+
+import forum
+import migrations
+import storage
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = storage.ConnectionPool(str(tmp_path / "forum.db"), max_size=2)
+    with pool.connection() as conn:
+        migrations.migrate(conn)
+    yield pool
+    pool.close()
+
+
+def _post(pool, content, approved=0):
+    with pool.transaction() as conn:
+        return conn.execute("INSERT INTO posts (anon_id, content, approved, timestamp) VALUES ('anon', ?, ?, 't')",
+                            (content, approved)).lastrowid
+
+
+def test_two_moderators_on_one_post_conflict(pool):
+    post = _post(pool, "hello")
+    with pool.connection() as conn:
+        (shown,) = [(row[0], row[1]) for row in forum.queue_page(conn)[0]]
+    # both moderators were shown the same version; the second action must not land
+    assert forum.moderate(pool, "approve", [shown]) == ([post], [])
+    assert forum.moderate(pool, "delete", [shown]) == ([], [post])
+    with pool.connection() as conn:
+        assert conn.execute("SELECT approved, version FROM posts WHERE id=?", (post,)).fetchone() == (1, 1)
+
+
+def test_feed_pages_walk_back_by_id(pool):
+    ids = [_post(pool, f"post {i}", approved=1) for i in range(5)]
+    _post(pool, "awaiting review")
+    feed = forum.FeedCache(pool, page_size=2)
+    seen, cursor = [], None
+    for expected_cursor in (ids[3], ids[1], None):
+        rows, cursor = feed.page(cursor)
+        seen.extend(row[0] for row in rows)
+        assert cursor == expected_cursor
+    assert seen == ids[::-1]
+    assert feed.pages(10) == (feed.page()[0] + feed.page(ids[3])[0] + feed.page(ids[1])[0], None)
+
+
+def test_feed_drops_pages_when_a_post_is_approved(pool):
+    _post(pool, "first", approved=1)
+    feed = forum.FeedCache(pool, recheck=0)
+    assert len(feed.page()[0]) == 1
+    waiting = _post(pool, "second")
+    assert len(feed.page()[0]) == 1
+    assert feed.stats()["hits"] == 1  # a post awaiting review doesn't touch the feed
+    # nothing calls feed.invalidate(), as when another worker approves: only the data version tells
+    forum.moderate(pool, "approve", [(waiting, 0)])
+    assert [row[0] for row in feed.page()[0]][0] == waiting
@@ -0,0 +1,52 @@
+# tests/test_importer.py
+import io
+import json
+
+import pytest
+
+import importer
+import migrations
+import storage
+
+GOOD = {"student_id": "s1", "phq9_answers": [1] * 9, "gad7_answers": [2] * 7}
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = storage.ConnectionPool(str(tmp_path / "import.db"), max_size=2)
+    with pool.connection() as conn:
+        migrations.migrate(conn)
+    yield pool
+    pool.close()
+
+
+def _import(pool, records):
+    return importer.import_screenings(pool, io.StringIO("\n".join(json.dumps(r) for r in records)), "jsonl")
+
+
+@pytest.mark.parametrize("bad", [
+    {**GOOD, "phq9_answers": "123012301"},
+    {**GOOD, "phq9_answers": [1.7] * 9},
+    {**GOOD, "gad7_answers": [True] * 7},
+    {**GOOD, "gad7_answers": [1] * 6},
+    {**GOOD, "gad7_answers": [4] * 7},
+    [1, 2, 3],
+])
+def test_jsonl_rejects_malformed_answers(pool, bad):
+    report = _import(pool, [GOOD, bad])
+    assert (report["imported"], report["rejected"]) == (1, 1)
+
+
+def test_csv_still_reads_text_cells(pool):
+    header = ",".join(["student_id", "timestamp", *importer.PHQ9_COLUMNS, *importer.GAD7_COLUMNS])
+    rows = [header, ",".join(["s1", ""] + ["1"] * 16), ",".join(["s2", ""] + ["1.5"] * 16)]
+    report = importer.import_screenings(pool, io.StringIO("\n".join(rows)), "csv")
+    assert (report["imported"], report["rejected"]) == (1, 1)
+
+
+def test_jsonl_numeric_id_and_timestamp(pool):
+    report = _import(pool, [{**GOOD, "student_id": 12345}, {**GOOD, "timestamp": 1700000000},
+                            {**GOOD, "student_id": {"id": 1}}, GOOD])
+    # a numeric id is used as text; a number is not an ISO timestamp, and an object is not an id
+    assert (report["imported"], report["rejected"]) == (2, 2)
+    assert [line for line, _ in report["errors"]] == [2, 3]
@@ -0,0 +1,51 @@
+# tests/test_llm.py
+import asyncio
+import itertools
+import time
+
+import httpx
+import pytest
+
+import llm
+
+
+@pytest.fixture
+def service():
+    service = llm.ChatService("test-key", timeout=5)
+    yield service
+    service.close()
+
+
+def test_empty_stream_ends_without_waiting(service, monkeypatch):
+    async def no_pieces(prompt, **params):
+        return
+        yield
+
+    monkeypatch.setattr(service.client, "stream", no_pieces)
+    stream = service.stream("hello")
+    start = time.perf_counter()
+    first = next(stream, "")  # as app.stream_openai_chat reads it, then chains the rest
+    assert list(itertools.chain([first], stream)) == [""]
+    assert time.perf_counter() - start < 1
+
+
+def test_cancelled_half_open_trial_does_not_wedge_the_breaker():
+    async def scenario():
+        breaker = llm.CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        client = llm.ChatClient("test-key", breaker=breaker, max_retries=0)
+
+        async def hang(request):
+            await asyncio.sleep(60)
+
+        client._http = httpx.AsyncClient(base_url="http://upstream.test", transport=httpx.MockTransport(hang))
+        breaker.record_failure()  # open; with reset_timeout=0 it is half-open straight away
+        trial = asyncio.create_task(client.complete("hello"))
+        await asyncio.sleep(0.05)
+        assert breaker._trial_in_flight
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        assert breaker.allow()  # a new trial is let through
+        await client.aclose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,24 @@
+# tests/test_query_plans.py
+import sqlite3
+
+import pytest
+
+import migrations
+
+
+@pytest.fixture(scope="module")
+def conn(tmp_path_factory):
+    conn = sqlite3.connect(str(tmp_path_factory.mktemp("plans") / "plans.db"))
+    migrations.migrate(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("name", list(migrations.hot_queries()))
+def test_hot_query_uses_an_index(conn, name):
+    sql, params = migrations.hot_queries()[name]
+    assert not migrations.full_scans(conn, {name: (sql, params)}), migrations.query_plan(conn, sql, params)
+
+
+def test_plan_check_catches_a_full_scan(conn):
+    assert migrations.full_scans(conn, {"unindexed": ("SELECT * FROM screenings WHERE meta = ?", ("{}",))})
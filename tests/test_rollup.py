@@ -0,0 +1,41 @@
+# tests/test_rollup.py
+"""Migration 3 writes the band bounds out literally (shipped migrations never change), so these
+tests are what ties them to ``scoring.BANDS``: if the bands change, they fail until a new
+migration rebuilds the rollup."""
+import sqlite3
+
+import pytest
+
+import migrations
+import scoring
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    migrations.migrate(conn)
+    yield conn
+    conn.close()
+
+
+def test_rollup_columns_are_the_scoring_bands(conn):
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(screening_daily_rollup)")]
+    assert columns[4:] == [f"{instrument}_{label}" for instrument in scoring.BANDS
+                           for label in scoring.band_labels(instrument)]
+
+
+def test_rollup_bounds_match_scoring(conn):
+    scores = [(p, g) for p in range(scoring.PHQ9_ITEMS * scoring.MAX_ANSWER + 1)
+              for g in range(scoring.GAD7_ITEMS * scoring.MAX_ANSWER + 1)]
+    conn.executemany("INSERT INTO screenings (anon_id, phq9_score, gad7_score, meta, timestamp) "
+                     "VALUES ('anon', ?, ?, '{}', '2024-01-01T00:00:00')", scores)
+    # delete a few so the delete trigger is exercised too
+    conn.execute("DELETE FROM screenings WHERE phq9_score = 15 OR gad7_score = 10")
+    kept = [(p, g) for p, g in scores if p != 15 and g != 10]
+    cur = conn.execute("SELECT * FROM screening_daily_rollup")
+    row = dict(zip([d[0] for d in cur.description], cur.fetchone()))
+    for instrument, i in (("phq9", 0), ("gad7", 1)):
+        for label in scoring.band_labels(instrument):
+            expected = sum(scoring.band(s[i], instrument) == label for s in kept)
+            assert row[f"{instrument}_{label}"] == expected, (instrument, label)
+    assert row["n"] == len(kept)
@@ -0,0 +1,83 @@
+# tests/test_scheduler.py
+import collections
+import datetime
+import threading
+
+import pytest
+
+import migrations
+import scheduler
+import storage
+
+DAY = datetime.date(2030, 1, 1)
+NOW = datetime.datetime(2030, 1, 1, 8, 0)
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = storage.ConnectionPool(str(tmp_path / "scheduler.db"), max_size=8)
+    with pool.connection() as conn:
+        migrations.migrate(conn)
+    yield pool
+    pool.close()
+
+
+def _slots(pool, start=9, end=12):
+    counsellor = scheduler.add_counsellor(pool, "Dr. Rao")
+    scheduler.add_slots(pool, counsellor, DAY, datetime.time(start), datetime.time(end))
+    with pool.connection() as conn:
+        return [id_ for (id_,) in conn.execute("SELECT id FROM slots ORDER BY starts_at")]
+
+
+def _request(pool, slot_id=None, anon_id="anon"):
+    with pool.transaction() as conn:
+        return scheduler.request_booking(
+            conn, (anon_id, DAY.isoformat(), "09:00", "", None, "requested", NOW.isoformat()), slot_id)
+
+
+def _assert_no_double_booking(pool):
+    with pool.connection() as conn:
+        holders = conn.execute("SELECT id, booking_id FROM slots WHERE booking_id IS NOT NULL").fetchall()
+        assigned = conn.execute("SELECT slot_id, id FROM bookings WHERE slot_id IS NOT NULL").fetchall()
+    assert not [b for b, n in collections.Counter(b for _, b in holders).items() if n > 1]
+    assert sorted(holders) == sorted(assigned)  # both sides agree on who holds what
+
+
+def test_concurrent_claims_on_one_slot_have_one_winner(pool):
+    (slot,) = _slots(pool, 9, 10)
+    racers = 8
+    start = threading.Barrier(racers)
+    results = []
+
+    def race(i):
+        start.wait()
+        results.append(_request(pool, slot, anon_id=f"student-{i}")[1])
+    threads = [threading.Thread(target=race, args=(i,)) for i in range(racers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(results) == [False] * (racers - 1) + [True]
+    _assert_no_double_booking(pool)
+
+
+def test_allocate_never_double_books(pool, monkeypatch):
+    slots = _slots(pool)
+    for i in range(5):
+        _request(pool, anon_id=f"student-{i}")
+    walk_in = []
+    real_plan = scheduler.plan
+
+    def plan_then_lose_a_slot(backlog, free, now):
+        # a student books the first planned slot between the plan and the claims
+        assignments = real_plan(backlog, free, now)
+        walk_in.append(_request(pool, assignments[0][0], anon_id="walk-in"))
+        return assignments
+    monkeypatch.setattr(scheduler, "plan", plan_then_lose_a_slot)
+
+    assert scheduler.allocate(pool, NOW) == (len(slots) - 1, 5 - len(slots) + 1)
+    assert walk_in[0][1]
+    _assert_no_double_booking(pool)
+    monkeypatch.setattr(scheduler, "plan", real_plan)
+    assert scheduler.allocate(pool, NOW) == (0, 5 - len(slots) + 1)  # nothing free: the rest keep waiting
+    _assert_no_double_booking(pool)
@@ -0,0 +1,99 @@
+# tests/test_storage.py
+import sqlite3
+
+import pytest
+
+import storage
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = storage.ConnectionPool(str(tmp_path / "storage.db"), max_size=2)
+    with pool.transaction() as conn:
+        conn.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY, body TEXT NOT NULL)")
+    yield pool
+    pool.close()
+
+
+def _count_transactions(pool, monkeypatch):
+    opened = []
+    real = pool.transaction
+
+    def counting():
+        opened.append(1)
+        return real()
+    monkeypatch.setattr(pool, "transaction", counting)
+    return opened
+
+
+def _bodies(pool):
+    with pool.connection() as conn:
+        return [body for (body,) in conn.execute("SELECT body FROM notes ORDER BY id")]
+
+
+def test_writes_are_group_committed(pool, monkeypatch):
+    opened = _count_transactions(pool, monkeypatch)
+    writes = storage.WriteQueue(pool, batch_size=3, flush_interval=5)
+    futures = [writes.execute("INSERT INTO notes (body) VALUES (?)", (body,)) for body in "abc"]
+    assert [f.result(timeout=5) for f in futures] == [1, 2, 3]
+    writes.close()
+    assert len(opened) == 1
+    assert _bodies(pool) == ["a", "b", "c"]
+
+
+def test_failed_batch_is_replayed_one_by_one(pool, monkeypatch):
+    opened = _count_transactions(pool, monkeypatch)
+    writes = storage.WriteQueue(pool, batch_size=3, flush_interval=5)
+    good = writes.execute("INSERT INTO notes (body) VALUES (?)", ("a",))
+    bad = writes.execute("INSERT INTO notes (body) VALUES (?)", (None,))
+    also_good = writes.execute("INSERT INTO notes (body) VALUES (?)", ("c",))
+    assert good.result(timeout=5) and also_good.result(timeout=5)
+    with pytest.raises(sqlite3.IntegrityError):
+        bad.result(timeout=5)
+    writes.close()
+    assert len(opened) == 1 + 3  # the failed batch, then each write on its own
+    assert _bodies(pool) == ["a", "c"]
+
+
+def test_close_flushes_queued_writes(pool):
+    # a batch that would otherwise wait for more writes until the interval runs out
+    writes = storage.WriteQueue(pool, batch_size=100, flush_interval=60)
+    futures = [writes.execute("INSERT INTO notes (body) VALUES (?)", (body,)) for body in "ab"]
+    writes.close(timeout=5)
+    assert all(f.done() for f in futures)
+    assert _bodies(pool) == ["a", "b"]
+    with pytest.raises(RuntimeError):
+        writes.execute("INSERT INTO notes (body) VALUES (?)", ("late",))
+
+
+@pytest.fixture
+def migrated(tmp_path):
+    import migrations
+    pool = storage.ConnectionPool(str(tmp_path / "versions.db"), max_size=2)
+    with pool.connection() as conn:
+        migrations.migrate(conn)
+    yield pool
+    pool.close()
+
+
+def _screening_count(conn):
+    return conn.execute("SELECT count(*) FROM screenings").fetchone()[0]
+
+
+def test_versioned_cache_recomputes_after_a_write_to_a_listed_table(migrated):
+    cache = storage.VersionedCache(migrated)
+    assert cache.get("screenings", ("screenings",), _screening_count) == 0
+    with migrated.transaction() as conn:
+        conn.execute("INSERT INTO screenings (anon_id, phq9_score, gad7_score) VALUES ('a', 3, 4)")
+    assert cache.get("screenings", ("screenings",), _screening_count) == 1
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_versioned_cache_ignores_writes_to_other_tables(migrated):
+    cache = storage.VersionedCache(migrated)
+    cache.get("screenings", ("screenings",), _screening_count)
+    with migrated.transaction() as conn:
+        conn.execute("INSERT INTO resources (title) VALUES ('Sleep hygiene')")
+        conn.execute("INSERT INTO bookings (anon_id, status) VALUES ('a', 'requested')")
+    assert cache.get("screenings", ("screenings",), _screening_count) == 0
+    assert (cache.hits, cache.misses) == (1, 1)